@@ -1,9 +1,11 @@
 import secrets
+from typing import Optional
 
 import loguru
-from fastapi import Header, HTTPException, Depends
+from fastapi import Header, HTTPException, Depends, Query
 
 from app.core.config import settings
+from app.schemas.pagination import PaginationParams
 
 
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -17,3 +19,18 @@ def verify_api_key(credentials: HTTPAuthorizationCredentials = Depends(http_bear
         raise HTTPException(status_code=403, detail='Invalid API key')
 
     return True
+
+
+def get_pagination_params(
+        limit: int = Query(
+            default=settings.page_size_default,
+            ge=1,
+            le=settings.page_size_max,
+            description='Размер страницы',
+        ),
+        cursor: Optional[str] = Query(
+            default=None,
+            description='Курсор следующей страницы из предыдущего ответа',
+        ),
+) -> PaginationParams:
+    return PaginationParams(limit=limit, cursor=cursor)
@@ -0,0 +1,92 @@
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, Response
+from dependency_injector.wiring import inject, Provide
+from starlette import status
+
+from app.api.v1.deps import verify_api_key
+from app.core.container import Container
+from app.db.transaction import read_only
+from app.schemas.activity import ActivityChildrenSchema
+from app.services import ActivityService
+
+router = APIRouter(
+    prefix='/activities'
+)
+
+
+def get_tree_etag(version: int) -> str:
+    return f'W/"activities-{version}"'
+
+
+def is_etag_matched(etag: str, if_none_match: Optional[str]) -> bool:
+    if not if_none_match:
+        return False
+
+    etags = [value.strip() for value in if_none_match.split(',')]
+    return '*' in etags or etag in etags
+
+
+def get_not_modified_response(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={'ETag': etag, 'Cache-Control': 'no-cache'},
+    )
+
+
+@router.get(
+    '/tree',
+    summary='Дерево деятельностей',
+    description=(
+        'Возвращает все дерево деятельностей. '
+        'Ответ кэшируется клиентом по ETag'
+    ),
+)
+@inject
+@read_only
+async def get_activity_tree(
+        response: Response,
+        if_none_match: Optional[str] = Header(default=None),
+        activity_service: ActivityService = Depends(
+            Provide[Container.activity_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> List[ActivityChildrenSchema]:
+    etag = get_tree_etag(await activity_service.get_tree_version())
+    if is_etag_matched(etag, if_none_match):
+        return get_not_modified_response(etag)
+
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+
+    return await activity_service.get_tree()
+
+
+@router.get(
+    '/{activity_id}/tree',
+    summary='Поддерево деятельности',
+    description=(
+        'Возвращает деятельность со всеми потомками. '
+        'Ответ кэшируется клиентом по ETag'
+    ),
+)
+@inject
+@read_only
+async def get_activity_subtree(
+        activity_id: UUID,
+        response: Response,
+        if_none_match: Optional[str] = Header(default=None),
+        activity_service: ActivityService = Depends(
+            Provide[Container.activity_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> ActivityChildrenSchema:
+    etag = get_tree_etag(await activity_service.get_tree_version())
+    if is_etag_matched(etag, if_none_match):
+        return get_not_modified_response(etag)
+
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+
+    return await activity_service.get_subtree(activity_id)
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+from dependency_injector.wiring import inject, Provide
+
+from app.api.v1.deps import verify_api_key
+from app.core.container import Container
+from app.db import DataBaseManager
+from app.schemas.metrics import DataBasePoolSchema
+
+router = APIRouter(
+    prefix='/metrics'
+)
+
+
+@router.get(
+    '/db-pool',
+    summary='Состояние пула соединений БД',
+    description=(
+        'Возвращает размер пула и количество занятых, свободных '
+        'и сверхлимитных соединений'
+    ),
+)
+@inject
+async def get_db_pool_metrics(
+        db_manager: DataBaseManager = Depends(
+            Provide[Container.db_manager]
+        ),
+        api_key=Depends(verify_api_key),
+) -> DataBasePoolSchema:
+    return DataBasePoolSchema(**db_manager.get_pool_stats()._asdict())
@@ -4,19 +4,36 @@ from uuid import UUID
 
 import loguru
 from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 from dependency_injector.wiring import inject, Provide
 from sqlalchemy.orm import joinedload, selectinload
 
-from app.api.v1.deps import verify_api_key
+from app.api.v1.deps import get_pagination_params, verify_api_key
 from app.core.container import Container
 from app.db.models import Activity, Organization, Phone, Building
-from app.db.transaction import atomic
-from app.schemas.geo_search import RectangleSearch, RadiusSearch
+from app.db.transaction import atomic, read_only
+from app.schemas.geo_search import (
+    RectangleSearch,
+    RadiusSearch,
+    RadiusSortedSearch,
+    NearestSearch,
+    BatchSearch,
+    ClusterSearch,
+    OrganizationClusterSchema,
+    PolygonSearch,
+    CorridorSearch,
+    OrganizationSearch,
+    ActivityFacetSearch,
+)
 from app.schemas.organization import (
     OrganizationSchema,
     OrganizationCreateSchema,
     OrganizationShortSchema,
+    OrganizationDistanceSchema,
+    OrganizationSearchItemSchema,
 )
+from app.schemas.pagination import PageSchema, PaginationParams
+from app.schemas.serializer import get_serializer, serialize_many, serialize_page
 from app.schemas.building import (
     BuildingSchema,
     BuildingCreateSchema,
@@ -24,6 +41,7 @@ from app.schemas.building import (
 from app.schemas.activity import (
     ActivitySchema,
     ActivityCreateSchema,
+    ActivityFacetSchema,
 )
 from app.services import OrganizationService, ActivityService, BuildingService
 from app.services.geo_search import GeoService
@@ -34,68 +52,71 @@ router = APIRouter(
 
 @router.get('/by-activity')
 @inject
-@atomic
+@read_only
 async def get_organizations_by_activity(
         activity_id: Optional[UUID],
+        pagination: PaginationParams = Depends(get_pagination_params),
         organization_service: OrganizationService = Depends(
             Provide[Container.organization_service]
         ),
         api_key=Depends(verify_api_key),
-) -> List[OrganizationShortSchema]:
+) -> PageSchema[OrganizationShortSchema]:
 
-    organizations = await organization_service.get_organizations_by_activity_id(
-        activity_id=activity_id
+    organizations, next_cursor = await organization_service.get_organizations_by_activity_id(
+        activity_id=activity_id,
+        pagination=pagination,
     )
 
-    return organizations
+    return ORJSONResponse(
+        serialize_page(OrganizationShortSchema, organizations, next_cursor)
+    )
 
 
 @router.get('/by-building')
 @inject
-@atomic
+@read_only
 async def get_organizations_by_building(
         building_id: Optional[UUID] = None,
+        pagination: PaginationParams = Depends(get_pagination_params),
         organization_service: OrganizationService = Depends(
             Provide[Container.organization_service]
         ),
         api_key=Depends(verify_api_key),
-) -> List[OrganizationShortSchema]:
-    organizations = await organization_service.list(
-        building_id=building_id
+) -> PageSchema[OrganizationShortSchema]:
+    organizations, next_cursor = await organization_service.list_page(
+        pagination=pagination,
+        building_id=building_id,
     )
 
-    return organizations
+    return ORJSONResponse(
+        serialize_page(OrganizationShortSchema, organizations, next_cursor)
+    )
 
 
 @router.get('/by-activity-tree')
 @inject
+@read_only
 async def search_organizations_by_activity_tree(
         activity_id: UUID,
+        pagination: PaginationParams = Depends(get_pagination_params),
         organization_service: OrganizationService = Depends(
             Provide[Container.organization_service]
         ),
-        activity_service: ActivityService = Depends(
-            Provide[Container.activity_service]
-        ),
         api_key=Depends(verify_api_key),
 
-) -> List[OrganizationShortSchema]:
-    activity_ids = await activity_service.get_activity_tree(
-        activity_id=activity_id
+) -> PageSchema[OrganizationShortSchema]:
+    organizations, next_cursor = await organization_service.get_organizations_by_activity_tree(
+        activity_id=activity_id,
+        pagination=pagination,
     )
-    organizations = await organization_service.get_organizations_by_activity_ids(
-        activity_ids=activity_ids,
-        options=[
-            joinedload(Organization.building),
-            selectinload(Organization.activities),
-            selectinload(Organization.phones),
-        ]
+    return ORJSONResponse(
+        serialize_page(OrganizationShortSchema, organizations, next_cursor)
     )
-    return organizations
 
 
 @router.get('/{organization_id}')
 @inject
+@read_only
 async def get_organization(
         organization_id: UUID,
         organization_service: OrganizationService = Depends(
@@ -111,14 +132,13 @@ async def get_organization(
             selectinload(Organization.phones),
         ]
     )
-    organization_schema = organization.serialize(
-        schema_class=OrganizationSchema,
-        exclude_fields=('phones', )
-    )
-    phones = [phone.number for phone in organization.phones]
-    organization_schema.phones = phones
+    organization_data = get_serializer(
+        OrganizationSchema,
+        exclude_fields=('phones', ),
+    )(organization)
+    organization_data['phones'] = [phone.number for phone in organization.phones]
 
-    return organization_schema
+    return ORJSONResponse(organization_data)
 
 
 @router.post(
@@ -130,27 +150,89 @@ async def get_organization(
     )
 )
 @inject
+@read_only
 async def search_organizations_in_radius(
         search: RadiusSearch,
+        pagination: PaginationParams = Depends(get_pagination_params),
         geo_service: GeoService = Depends(
             Provide[Container.geo_service]
         ),
         api_key=Depends(verify_api_key),
-) -> List[OrganizationShortSchema]:
+) -> PageSchema[OrganizationShortSchema]:
     """
     Поиск организаций в радиусе от точки на карте
     """
 
-    organizations = await geo_service.search_in_radius(
+    organizations, next_cursor = await geo_service.search_in_radius_cached(
         search,
-        options=[
-            joinedload(Organization.building),
-            selectinload(Organization.activities),
-            selectinload(Organization.phones),
-        ]
+        pagination,
+    )
+
+    return ORJSONResponse(
+        serialize_page(OrganizationShortSchema, organizations, next_cursor)
+    )
+
+
+@router.post(
+    '/search/radius/sorted',
+    summary='Поиск ближайших организаций в радиусе',
+    description=(
+        'Находит ближайшие организации в заданном радиусе от указанной точки, '
+        'отсортированные по расстоянию. Количество ограничено полем limit'
     )
+)
+@inject
+@read_only
+async def search_organizations_in_radius_sorted(
+        search: RadiusSortedSearch,
+        geo_service: GeoService = Depends(
+            Provide[Container.geo_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> List[OrganizationDistanceSchema]:
+    """
+    Поиск ближайших организаций в радиусе от точки на карте
+    """
+
+    organizations = await geo_service.search_in_radius_sorted(search)
 
-    return organizations
+    serializer = get_serializer(OrganizationShortSchema)
+
+    return ORJSONResponse([
+        dict(serializer(organization), distance_km=distance)
+        for organization, distance in organizations
+    ])
+
+
+@router.post(
+    '/search/nearest',
+    summary='Поиск ближайших организаций',
+    description=(
+        'Находит k ближайших к указанной точке организаций '
+        'с необязательной фильтрацией по деятельности'
+    )
+)
+@inject
+@read_only
+async def search_nearest_organizations(
+        search: NearestSearch,
+        geo_service: GeoService = Depends(
+            Provide[Container.geo_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> List[OrganizationDistanceSchema]:
+    """
+    Поиск k ближайших к точке на карте организаций
+    """
+
+    organizations = await geo_service.search_nearest(search)
+
+    serializer = get_serializer(OrganizationShortSchema)
+
+    return ORJSONResponse([
+        dict(serializer(organization), distance_km=distance)
+        for organization, distance in organizations
+    ])
 
 
 @router.post(
@@ -162,27 +244,217 @@ async def search_organizations_in_radius(
     )
 )
 @inject
+@read_only
 async def search_organizations_in_rectangle(
         search: RectangleSearch,
+        pagination: PaginationParams = Depends(get_pagination_params),
         geo_service: GeoService = Depends(
             Provide[Container.geo_service]
         ),
         api_key=Depends(verify_api_key),
-) -> List[OrganizationShortSchema]:
+) -> PageSchema[OrganizationShortSchema]:
     """
     Поиск организаций в прямоугольной области на карте
     """
 
-    organizations = await geo_service.search_in_rectangle(
+    organizations, next_cursor = await geo_service.search_in_rectangle_cached(
         search,
-        options=[
-            joinedload(Organization.building),
-            selectinload(Organization.activities),
-            selectinload(Organization.phones),
-        ]
+        pagination,
     )
 
-    return organizations
+    return ORJSONResponse(
+        serialize_page(OrganizationShortSchema, organizations, next_cursor)
+    )
+
+
+@router.post(
+    '/search/polygon',
+    summary='Поиск организаций в многоугольнике',
+    description=(
+        'Находит все организации, находящиеся в заданном многоугольнике '
+        '(GeoJSON Polygon, допускаются отверстия)'
+    )
+)
+@inject
+@read_only
+async def search_organizations_in_polygon(
+        search: PolygonSearch,
+        pagination: PaginationParams = Depends(get_pagination_params),
+        geo_service: GeoService = Depends(
+            Provide[Container.geo_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> PageSchema[OrganizationShortSchema]:
+    """
+    Поиск организаций в многоугольнике на карте
+    """
+
+    organizations, next_cursor = await geo_service.search_in_polygon(
+        search,
+        pagination,
+    )
+
+    return ORJSONResponse(
+        serialize_page(OrganizationShortSchema, organizations, next_cursor)
+    )
+
+
+@router.post(
+    '/search/corridor',
+    summary='Поиск организаций вдоль маршрута',
+    description=(
+        'Находит все организации, находящиеся не дальше заданного '
+        'расстояния от маршрута (ломаной линии)'
+    )
+)
+@inject
+@read_only
+async def search_organizations_along_route(
+        search: CorridorSearch,
+        pagination: PaginationParams = Depends(get_pagination_params),
+        geo_service: GeoService = Depends(
+            Provide[Container.geo_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> PageSchema[OrganizationShortSchema]:
+    """
+    Поиск организаций вдоль маршрута на карте
+    """
+
+    organizations, next_cursor = await geo_service.search_along_route(
+        search,
+        pagination,
+    )
+
+    return ORJSONResponse(
+        serialize_page(OrganizationShortSchema, organizations, next_cursor)
+    )
+
+
+@router.post(
+    '/search/batch',
+    summary='Пакетный поиск организаций по областям',
+    description=(
+        'Выполняет несколько поисков в радиусе и в прямоугольной области '
+        'за один запрос. По каждой области в порядке областей возвращается '
+        'страница организаций и курсор ее следующей страницы'
+    )
+)
+@inject
+@read_only
+async def search_organizations_batch(
+        search: BatchSearch,
+        geo_service: GeoService = Depends(
+            Provide[Container.geo_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> List[PageSchema[OrganizationShortSchema]]:
+    """
+    Пакетный поиск организаций по нескольким областям на карте
+    """
+
+    pages = await geo_service.search_batch(
+        search.items,
+        search.get_pagination(),
+    )
+
+    return ORJSONResponse([
+        serialize_page(OrganizationShortSchema, organizations, next_cursor)
+        for organizations, next_cursor in pages
+    ])
+
+
+@router.post(
+    '/search',
+    summary='Поиск организаций по сочетанию фильтров',
+    description=(
+        'Находит организации по любому сочетанию фильтров: деятельность '
+        'с вложенными, радиус или прямоугольная область, здание и начало '
+        'названия. Фильтры применяются в одном запросе, результат '
+        'разбит на страницы'
+    )
+)
+@inject
+@read_only
+async def search_organizations(
+        search: OrganizationSearch,
+        pagination: PaginationParams = Depends(get_pagination_params),
+        geo_service: GeoService = Depends(
+            Provide[Container.geo_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> PageSchema[OrganizationSearchItemSchema]:
+    """
+    Поиск организаций по сочетанию фильтров
+    """
+
+    rows, next_cursor = await geo_service.search_organizations(
+        search,
+        pagination,
+    )
+
+    return ORJSONResponse({
+        'items': [
+            {'id': organization_id, 'name': name, 'distance_km': distance}
+            for organization_id, name, distance in rows
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+@router.post(
+    '/search/facets',
+    summary='Количество организаций по деятельностям',
+    description=(
+        'Возвращает количество организаций в области и/или здании '
+        'для каждой деятельности с учетом вложенных деятельностей'
+    )
+)
+@inject
+@read_only
+async def search_activity_facets(
+        search: ActivityFacetSearch,
+        geo_service: GeoService = Depends(
+            Provide[Container.geo_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> List[ActivityFacetSchema]:
+    """
+    Количество организаций по деятельностям для фильтров поиска
+    """
+
+    facets = await geo_service.get_activity_facets(search)
+
+    return ORJSONResponse([
+        {'id': activity_id, 'name': name, 'parent_id': parent_id, 'count': count}
+        for activity_id, name, parent_id, count in facets
+    ])
+
+
+@router.post(
+    '/search/clusters',
+    summary='Кластеры организаций в видимой области карты',
+    description=(
+        'Возвращает количество организаций и их центр масс по ячейкам '
+        'сетки для заданных области карты и масштаба'
+    )
+)
+@inject
+@read_only
+async def search_organization_clusters(
+        search: ClusterSearch,
+        geo_service: GeoService = Depends(
+            Provide[Container.geo_service]
+        ),
+        api_key=Depends(verify_api_key),
+) -> List[OrganizationClusterSchema]:
+    """
+    Кластеризация организаций для отображения на карте
+    """
+
+    clusters = await geo_service.get_clusters(search)
+
+    return ORJSONResponse(serialize_many(OrganizationClusterSchema, clusters))
 
 
 @router.post('')
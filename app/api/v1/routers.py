@@ -1,5 +1,11 @@
 from fastapi import APIRouter
 
+from app.api.v1.endpoints.activities import (
+    router as activities_router
+)
+from app.api.v1.endpoints.metrics import (
+    router as metrics_router
+)
 from app.api.v1.endpoints.organizations import (
     router as organizations_router
 )
@@ -9,6 +15,8 @@ def get_api_router():
     api_router = APIRouter()
 
     api_router.include_router(organizations_router)
+    api_router.include_router(activities_router)
+    api_router.include_router(metrics_router)
 
     return api_router
 
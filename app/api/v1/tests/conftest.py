@@ -1,4 +1,5 @@
-from typing import Dict, List, Any, AsyncGenerator
+import uuid
+from typing import Dict, List, Any, AsyncGenerator, Awaitable, Callable, Optional
 
 import pytest
 from fastapi import FastAPI
@@ -7,12 +8,15 @@ from sqlalchemy.exc import OperationalError
 
 from app.main import app
 from app.core.config import settings
-from app.db.manager import db_manager
-from app.db.models import Base
+from app.db.models import Base, Building, Organization
+from app.repositories import RepositoryBuilding, RepositoryOrganization
+
+HEADERS = {'Authorization': f'Bearer {settings.api_key}'}
 
 
 @pytest.fixture(scope='function', autouse=True)
 async def setup_db():
+    db_manager = app.container.db_manager()
     async with db_manager.engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
@@ -26,6 +30,26 @@ async def setup_db():
             pass
 
 
+@pytest.fixture(scope='function', autouse=True)
+def reset_caches():
+    """Индексы и кэши в памяти процесса не переживают тест"""
+    container = app.container
+    caches = (
+        container.building_index,
+        container.cluster_index,
+        container.geo_tile_cache,
+        container.activity_cache,
+        container.activity_index,
+    )
+    for cache in caches:
+        cache.reset()
+
+    yield
+
+    for cache in caches:
+        cache.reset()
+
+
 
 @pytest.fixture(scope='function')
 def fastapi_app() -> FastAPI:
@@ -39,3 +63,86 @@ async def async_client(fastapi_app) -> AsyncGenerator[AsyncClient, None]:
             base_url=f'{settings.base_url}{settings.api_v1_prefix}',
     ) as ac:
         yield ac
+
+
+@pytest.fixture(scope='function')
+def create_building(
+        async_client,
+) -> Callable[[float, float], Awaitable[uuid.UUID]]:
+    async def create(latitude: float, longitude: float) -> uuid.UUID:
+        response = await async_client.post(
+            '/organizations/buildings/',
+            json={
+                'address': f'address {uuid.uuid4()}',
+                'latitude': latitude,
+                'longitude': longitude,
+            },
+            headers=HEADERS,
+        )
+        assert response.status_code == 200, response.text
+        return uuid.UUID(response.json()['id'])
+
+    return create
+
+
+@pytest.fixture(scope='function')
+def create_activity(
+        async_client,
+) -> Callable[..., Awaitable[uuid.UUID]]:
+    async def create(
+            name: str = 'activity',
+            parent_id: Optional[uuid.UUID] = None,
+    ) -> uuid.UUID:
+        data: Dict[str, Any] = {'name': name}
+        if parent_id is not None:
+            data['parent_id'] = str(parent_id)
+
+        response = await async_client.post(
+            '/organizations/activities/',
+            json=data,
+            headers=HEADERS,
+        )
+        assert response.status_code == 200, response.text
+        return uuid.UUID(response.json()['id'])
+
+    return create
+
+
+@pytest.fixture(scope='function')
+def create_organization(
+        async_client,
+) -> Callable[..., Awaitable[uuid.UUID]]:
+    async def create(
+            building_id: uuid.UUID,
+            activity_ids: List[uuid.UUID] = (),
+            name: str = 'organization',
+    ) -> uuid.UUID:
+        response = await async_client.post(
+            '/organizations',
+            json={
+                'name': name,
+                'building_id': str(building_id),
+                'activity_ids': [str(activity_id) for activity_id in activity_ids],
+            },
+            headers=HEADERS,
+        )
+        assert response.status_code == 200, response.text
+        return uuid.UUID(response.json()['id'])
+
+    return create
+
+
+@pytest.fixture(scope='function')
+def load_geo_indexes() -> Callable[[], Awaitable[None]]:
+    """Загружает индексы зданий и кластеров, как при старте приложения"""
+    async def load() -> None:
+        container = app.container
+        async with container.db_manager().AsyncSessionLocal() as session:
+            await container.building_index().rebuild(
+                RepositoryBuilding(model=Building, session=session)
+            )
+            await container.cluster_index().rebuild(
+                RepositoryOrganization(model=Organization, session=session)
+            )
+
+    return load
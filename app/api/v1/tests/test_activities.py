@@ -0,0 +1,71 @@
+import uuid
+
+from app.core.config import settings
+
+HEADERS = {'Authorization': f'Bearer {settings.api_key}'}
+
+
+async def test_activity_tree(async_client, create_activity):
+    """Дерево собирается целиком с вложенными детьми"""
+    root_id = await create_activity('root')
+    child_id = await create_activity('child', parent_id=root_id)
+    grandchild_id = await create_activity('grandchild', parent_id=child_id)
+
+    response = await async_client.get('/activities/tree', headers=HEADERS)
+    assert response.status_code == 200, response.text
+    assert response.json() == [{
+        'id': str(root_id),
+        'name': 'root',
+        'parent_id': None,
+        'children': [{
+            'id': str(child_id),
+            'name': 'child',
+            'parent_id': str(root_id),
+            'children': [{
+                'id': str(grandchild_id),
+                'name': 'grandchild',
+                'parent_id': str(child_id),
+                'children': [],
+            }],
+        }],
+    }]
+
+    response = await async_client.get(
+        f'/activities/{child_id}/tree',
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()['children'][0]['id'] == str(grandchild_id)
+
+    response = await async_client.get(
+        f'/activities/{uuid.uuid4()}/tree',
+        headers=HEADERS,
+    )
+    assert response.status_code == 404
+
+
+async def test_activity_tree_etag(async_client, create_activity):
+    """Совпавший ETag - ответ 304, новая деятельность меняет ETag"""
+    root_id = await create_activity('root')
+
+    response = await async_client.get('/activities/tree', headers=HEADERS)
+    etag = response.headers['ETag']
+
+    for url in ('/activities/tree', f'/activities/{root_id}/tree'):
+        response = await async_client.get(
+            url,
+            headers={**HEADERS, 'If-None-Match': etag},
+        )
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert response.content == b''
+
+    await create_activity('child', parent_id=root_id)
+
+    response = await async_client.get(
+        '/activities/tree',
+        headers={**HEADERS, 'If-None-Match': etag},
+    )
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.json()[0]['children'][0]['name'] == 'child'
@@ -0,0 +1,126 @@
+import random
+import uuid
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.activity_bitmap import (
+    ARRAY_MAX_SIZE,
+    CHUNK_SIZE,
+    Bitmap,
+    OrganizationActivityIndex,
+)
+
+HEADERS = {'Authorization': f'Bearer {settings.api_key}'}
+
+
+def test_bitmap_add_union_and_rows():
+    """Разреженные и плотные контейнеры дают те же множества, что и set"""
+    generator = random.Random(3)
+    sparse = {generator.randrange(16 * CHUNK_SIZE) for _ in range(100)}
+    dense = {generator.randrange(CHUNK_SIZE) for _ in range(3 * ARRAY_MAX_SIZE)}
+
+    sparse_bitmap = Bitmap.from_rows(sparse)
+    dense_bitmap = Bitmap()
+    for row in dense:
+        dense_bitmap.add(row)
+    dense_bitmap.add(next(iter(dense)))
+
+    # Разреженные контейнеры - массивы, а не маски по 8 КБ
+    assert all(
+        isinstance(container, np.ndarray)
+        for container in sparse_bitmap._chunks.values()
+    )
+    assert isinstance(dense_bitmap._chunks[0], int)
+
+    assert list(sparse_bitmap) == sorted(sparse)
+    assert len(dense_bitmap) == len(dense)
+    assert list(dense_bitmap) == sorted(dense)
+
+    union = sparse_bitmap | dense_bitmap | Bitmap.from_rows([5, CHUNK_SIZE + 5])
+    expected = sparse | dense | {5, CHUNK_SIZE + 5}
+    assert list(union) == sorted(expected)
+    assert len(union) == len(expected)
+
+    start = sorted(expected)[len(expected) // 2]
+    assert np.concatenate(list(union.iter_rows(start))).tolist() == sorted(
+        row for row in expected if row >= start
+    )
+
+
+def test_index_pages_follow_id_order():
+    """Страницы индекса идут по порядку ID, в том числе для новых организаций"""
+    generator = random.Random(5)
+    activity_id = uuid.uuid4()
+    other_activity_id = uuid.uuid4()
+    organization_ids = [uuid.UUID(int=generator.getrandbits(128)) for _ in range(300)]
+
+    index = OrganizationActivityIndex()
+    index.load(
+        (organization_id, activity_id if number % 3 else other_activity_id)
+        for number, organization_id in enumerate(organization_ids)
+    )
+    # Созданные после загрузки получают номера вне порядка ID
+    new_ids = [uuid.UUID(int=generator.getrandbits(128)) for _ in range(20)]
+    for organization_id in new_ids:
+        index.add(organization_id, [activity_id])
+
+    expected = sorted(
+        [
+            organization_id
+            for number, organization_id in enumerate(organization_ids)
+            if number % 3
+        ]
+        + new_ids
+    )
+    bitmap = index.get_bitmap([activity_id])
+
+    pages = []
+    after_id = None
+    while True:
+        page = index.get_page_organization_ids(bitmap, limit=17, after_id=after_id)
+        if not page:
+            break
+        pages.extend(page)
+        after_id = page[-1]
+
+    assert pages == expected
+
+
+async def test_organizations_by_activity_pages(
+        async_client,
+        create_building,
+        create_activity,
+        create_organization,
+):
+    """Страницы по деятельности и ее дереву содержат организации поддерева"""
+    building_id = await create_building(55.75, 37.62)
+    root_id = await create_activity('root')
+    child_id = await create_activity('child', parent_id=root_id)
+    other_id = await create_activity('other')
+
+    root_organizations = [
+        str(await create_organization(building_id, [root_id])) for _ in range(4)
+    ]
+    child_organizations = [
+        str(await create_organization(building_id, [child_id])) for _ in range(4)
+    ]
+    await create_organization(building_id, [other_id])
+
+    for url, activity_id, expected in (
+            ('/organizations/by-activity', root_id, root_organizations),
+            ('/organizations/by-activity-tree', root_id,
+             root_organizations + child_organizations),
+    ):
+        ids = []
+        params = {'activity_id': str(activity_id), 'limit': 3}
+        while True:
+            response = await async_client.get(url, params=params, headers=HEADERS)
+            assert response.status_code == 200, response.text
+            page = response.json()
+            ids.extend(item['id'] for item in page['items'])
+            if page['next_cursor'] is None:
+                break
+            params['cursor'] = page['next_cursor']
+
+        assert ids == sorted(expected)
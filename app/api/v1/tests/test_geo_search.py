@@ -0,0 +1,313 @@
+import random
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.db import geohash
+from app.db.functions import haversine_km
+from app.services.spatial_index import BuildingGridIndex
+
+HEADERS = {'Authorization': f'Bearer {settings.api_key}'}
+CENTER = (55.75, 37.62)
+
+
+@pytest.fixture(scope='function')
+async def organization_points(create_building, create_organization):
+    """Организации в случайных точках вокруг CENTER: {id: (широта, долгота)}"""
+    generator = random.Random(42)
+    points = {}
+    for _ in range(30):
+        latitude = CENTER[0] + generator.uniform(-0.05, 0.05)
+        longitude = CENTER[1] + generator.uniform(-0.08, 0.08)
+        building_id = await create_building(latitude, longitude)
+        for _ in range(generator.randint(1, 2)):
+            points[await create_organization(building_id)] = (latitude, longitude)
+
+    return points
+
+
+async def collect_pages(async_client, url: str, json: dict) -> list:
+    """ID организаций всех страниц поиска, пройденных по курсорам"""
+    ids = []
+    params = {'limit': 7}
+    while True:
+        response = await async_client.post(
+            url,
+            json=json,
+            params=params,
+            headers=HEADERS,
+        )
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page['items']) <= 7
+        ids.extend(item['id'] for item in page['items'])
+
+        if page['next_cursor'] is None:
+            return ids
+        params['cursor'] = page['next_cursor']
+
+
+def test_covering_ranges_contain_points_of_rectangle():
+    """Геохеш любой точки прямоугольника попадает в один из диапазонов"""
+    generator = random.Random(1)
+    for _ in range(200):
+        min_lat = generator.uniform(-80, 79)
+        min_lon = generator.uniform(-179, 178)
+        max_lat = min_lat + generator.uniform(0.0001, 1)
+        max_lon = min_lon + generator.uniform(0.0001, 1)
+        ranges = geohash.get_covering_ranges(min_lat, max_lat, min_lon, max_lon)
+
+        for _ in range(20):
+            point_geohash = geohash.encode(
+                generator.uniform(min_lat, max_lat),
+                generator.uniform(min_lon, max_lon),
+            )
+            assert any(
+                start <= point_geohash and (end is None or point_geohash < end)
+                for start, end in ranges
+            )
+
+
+@pytest.mark.parametrize('index_loaded', [False, True])
+@pytest.mark.parametrize('bounds', [
+    # Покрывается тайлами кэша
+    (55.72, 55.77, 37.58, 37.66),
+    # Слишком велика для кэша: поиск по индексу или запросом к БД
+    (55.3, 55.76, 37.0, 37.63),
+])
+async def test_rectangle_search(
+        async_client,
+        organization_points,
+        load_geo_indexes,
+        index_loaded,
+        bounds,
+):
+    """Все страницы поиска в прямоугольнике - ровно организации внутри него"""
+    if index_loaded:
+        await load_geo_indexes()
+
+    min_lat, max_lat, min_lon, max_lon = bounds
+    expected = sorted(
+        str(organization_id)
+        for organization_id, (latitude, longitude) in organization_points.items()
+        if min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon
+    )
+    assert 0 < len(expected) < len(organization_points)
+
+    ids = await collect_pages(
+        async_client,
+        '/organizations/search/rectangle',
+        {
+            'min_lat': min_lat, 'max_lat': max_lat,
+            'min_lon': min_lon, 'max_lon': max_lon,
+        },
+    )
+    assert ids == expected
+
+
+@pytest.mark.parametrize('index_loaded', [False, True])
+@pytest.mark.parametrize('center, radius_km', [
+    # Покрывается тайлами кэша
+    ((55.76, 37.63), 3.0),
+    # Слишком велика для кэша: поиск по индексу или запросом к БД
+    ((55.38, 37.62), 40.0),
+])
+async def test_radius_search(
+        async_client,
+        organization_points,
+        load_geo_indexes,
+        index_loaded,
+        center,
+        radius_km,
+):
+    """Все страницы поиска в радиусе - ровно организации внутри круга"""
+    if index_loaded:
+        await load_geo_indexes()
+
+    expected = sorted(
+        str(organization_id)
+        for organization_id, point in organization_points.items()
+        if haversine_km(*center, *point) <= radius_km
+    )
+    assert 0 < len(expected) < len(organization_points)
+
+    ids = await collect_pages(
+        async_client,
+        '/organizations/search/radius',
+        {'latitude': center[0], 'longitude': center[1], 'radius_km': radius_km},
+    )
+    assert ids == expected
+
+
+@pytest.mark.parametrize('index_loaded', [False, True])
+async def test_nearest_matches_brute_force(
+        async_client,
+        organization_points,
+        load_geo_indexes,
+        index_loaded,
+):
+    """k ближайших из индекса и из БД совпадают с полным перебором"""
+    if index_loaded:
+        await load_geo_indexes()
+
+    latitude, longitude = CENTER[0] + 0.01, CENTER[1] - 0.02
+    expected = sorted(
+        (
+            (haversine_km(latitude, longitude, *point), str(organization_id))
+            for organization_id, point in organization_points.items()
+        ),
+    )[:7]
+
+    response = await async_client.post(
+        '/organizations/search/nearest',
+        json={'latitude': latitude, 'longitude': longitude, 'k': 7},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    items = response.json()
+
+    assert [item['id'] for item in items] == [
+        organization_id for _, organization_id in expected
+    ]
+    assert [item['distance_km'] for item in items] == pytest.approx(
+        [distance for distance, _ in expected]
+    )
+
+
+def test_iter_nearest_survives_rebuild():
+    """Начатый перебор дочитывает прежнюю раскладку после перестроения"""
+    generator = random.Random(7)
+    points = [
+        (uuid.uuid4(), generator.uniform(55.7, 55.8), generator.uniform(37.5, 37.7))
+        for _ in range(200)
+    ]
+    index = BuildingGridIndex(cell_size_deg=0.01)
+    index.load(points)
+
+    nearest = index.iter_nearest(*CENTER)
+    first = [next(nearest) for _ in range(5)]
+
+    index.load(points[:3])
+    rest = list(nearest)
+
+    expected = sorted(
+        (haversine_km(*CENTER, latitude, longitude), building_id)
+        for building_id, latitude, longitude in points
+    )
+    assert [building_id for building_id, _ in first + rest] == [
+        building_id for _, building_id in expected
+    ]
+
+
+@pytest.mark.parametrize('index_loaded', [False, True])
+async def test_polygon_search_excludes_holes(
+        async_client,
+        organization_points,
+        load_geo_indexes,
+        index_loaded,
+):
+    """Организации в отверстии многоугольника не попадают в результат"""
+    if index_loaded:
+        await load_geo_indexes()
+
+    outer = (55.71, 55.79, 37.56, 37.68)
+    hole = (55.73, 55.77, 37.58, 37.66)
+
+    def to_ring(min_lat, max_lat, min_lon, max_lon):
+        return [
+            [min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat],
+            [min_lon, max_lat], [min_lon, min_lat],
+        ]
+
+    def is_inside(point, bounds) -> bool:
+        min_lat, max_lat, min_lon, max_lon = bounds
+        return min_lat < point[0] < max_lat and min_lon < point[1] < max_lon
+
+    expected = sorted(
+        str(organization_id)
+        for organization_id, point in organization_points.items()
+        if is_inside(point, outer) and not is_inside(point, hole)
+    )
+    in_hole = [point for point in organization_points.values() if is_inside(point, hole)]
+    assert expected and in_hole
+
+    ids = await collect_pages(
+        async_client,
+        '/organizations/search/polygon',
+        {'type': 'Polygon', 'coordinates': [to_ring(*outer), to_ring(*hole)]},
+    )
+    assert ids == expected
+
+
+@pytest.mark.parametrize('index_loaded', [False, True])
+async def test_corridor_search(
+        async_client,
+        organization_points,
+        load_geo_indexes,
+        index_loaded,
+):
+    """Вдоль маршрута находятся организации не дальше buffer_km от него"""
+    if index_loaded:
+        await load_geo_indexes()
+
+    route = [(37.56, 55.71), (37.62, 55.76), (37.62, 55.79)]
+    buffer_km = 1.5
+
+    def get_route_distance(point) -> float:
+        # Расстояние до маршрута по частым точкам на его отрезках
+        return min(
+            haversine_km(
+                *point,
+                lat1 + (lat2 - lat1) * step / 1000,
+                lon1 + (lon2 - lon1) * step / 1000,
+            )
+            for (lon1, lat1), (lon2, lat2) in zip(route, route[1:])
+            for step in range(1001)
+        )
+
+    distances = {
+        str(organization_id): get_route_distance(point)
+        for organization_id, point in organization_points.items()
+    }
+    assert any(distance <= buffer_km for distance in distances.values())
+    assert any(distance > buffer_km for distance in distances.values())
+
+    ids = await collect_pages(
+        async_client,
+        '/organizations/search/corridor',
+        {'coordinates': route, 'buffer_km': buffer_km},
+    )
+    assert ids == sorted(ids)
+    # Точки у самой границы буфера не проверяются: расчеты расходятся в метрах
+    for organization_id, distance in distances.items():
+        if abs(distance - buffer_km) > 0.01:
+            assert (organization_id in ids) == (distance <= buffer_km)
+
+
+async def test_cached_tiles_are_invalidated_on_create(
+        async_client,
+        create_building,
+        create_organization,
+):
+    """Закэшированный тайл сбрасывается после COMMIT новой организации"""
+    rectangle = {'min_lat': 55.74, 'max_lat': 55.76, 'min_lon': 37.61, 'max_lon': 37.63}
+    first_id = await create_organization(await create_building(55.745, 37.615))
+
+    response = await async_client.post(
+        '/organizations/search/rectangle',
+        json=rectangle,
+        headers=HEADERS,
+    )
+    assert [item['id'] for item in response.json()['items']] == [str(first_id)]
+
+    second_id = await create_organization(await create_building(55.755, 37.625))
+
+    response = await async_client.post(
+        '/organizations/search/rectangle',
+        json=rectangle,
+        headers=HEADERS,
+    )
+    assert [item['id'] for item in response.json()['items']] == sorted(
+        [str(first_id), str(second_id)]
+    )
@@ -0,0 +1,193 @@
+import base64
+import uuid
+
+import orjson
+import pytest
+from sqlalchemy import event
+
+from app.main import app
+from app.core.config import settings
+from app.services.pagination import decode_cursor, encode_cursor
+
+HEADERS = {'Authorization': f'Bearer {settings.api_key}'}
+
+
+def make_cursor(value) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(value)).decode()
+
+
+@pytest.mark.parametrize('values', [
+    ['0f4c2a36-4b41-4d7a-9d3e-6b1f0a2c9e11'],
+    ['name', '0f4c2a36-4b41-4d7a-9d3e-6b1f0a2c9e11'],
+    [1.5, '0f4c2a36-4b41-4d7a-9d3e-6b1f0a2c9e11'],
+])
+def test_cursor_round_trip(values):
+    """Значения курсора восстанавливаются в исходных типах"""
+    types = [str] * (len(values) - 1) + [uuid.UUID]
+    if isinstance(values[0], float):
+        types[0] = float
+
+    decoded = decode_cursor(encode_cursor(values), *types)
+    assert decoded == [
+        value_type(value) for value_type, value in zip(types, values)
+    ]
+
+
+async def create_page_data(create_building, create_organization, count: int = 5):
+    building_id = await create_building(55.75, 37.62)
+    organization_ids = [
+        str(await create_organization(building_id, name=f'organization {number}'))
+        for number in range(count)
+    ]
+    return building_id, sorted(organization_ids)
+
+
+async def test_list_pages_follow_cursors(
+        async_client,
+        create_building,
+        create_organization,
+):
+    """Страницы по курсорам покрывают список без пропусков и повторов"""
+    building_id, organization_ids = await create_page_data(
+        create_building,
+        create_organization,
+    )
+
+    ids = []
+    params = {'building_id': str(building_id), 'limit': 2}
+    while True:
+        response = await async_client.get(
+            '/organizations/by-building',
+            params=params,
+            headers=HEADERS,
+        )
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page['items']) <= 2
+        ids.extend(item['id'] for item in page['items'])
+        if page['next_cursor'] is None:
+            break
+        params['cursor'] = page['next_cursor']
+
+    assert ids == organization_ids
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    make_cursor('string'),
+    make_cursor([]),
+    make_cursor([5]),
+    make_cursor([None]),
+    make_cursor(['not uuid']),
+    make_cursor({'id': 5}),
+])
+async def test_bad_id_cursor(async_client, cursor):
+    """Поврежденный курсор - ошибка 400, а не 500"""
+    response = await async_client.get(
+        '/organizations/by-building',
+        params={'cursor': cursor},
+        headers=HEADERS,
+    )
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.parametrize('cursor', [
+    make_cursor([5, '0f4c2a36-4b41-4d7a-9d3e-6b1f0a2c9e11']),
+    make_cursor(['name', 5]),
+    make_cursor(['name']),
+])
+async def test_bad_search_cursor(async_client, cursor):
+    """Курсор с ключом (название, ID) проверяет типы значений"""
+    response = await async_client.post(
+        '/organizations/search',
+        params={'cursor': cursor},
+        json={},
+        headers=HEADERS,
+    )
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.parametrize('index_loaded', [False, True])
+async def test_batch_search_pages_in_one_query(
+        async_client,
+        create_building,
+        create_organization,
+        load_geo_indexes,
+        index_loaded,
+):
+    """
+    Пакетный поиск возвращает страницу и курсор каждой области,
+    а организации всех областей загружаются одним запросом
+    """
+    areas = []
+    expected = []
+    for number in range(4):
+        latitude = 55.70 + number * 0.02
+        building_id = await create_building(latitude, 37.62)
+        organization_ids = [
+            str(await create_organization(building_id)) for _ in range(number + 1)
+        ]
+        expected.append(sorted(organization_ids))
+        areas.append({
+            'min_lat': latitude - 0.005, 'max_lat': latitude + 0.005,
+            'min_lon': 37.615, 'max_lon': 37.625,
+        })
+    areas.append({'latitude': 55.70, 'longitude': 37.62, 'radius_km': 0.3})
+    expected.append(expected[0])
+
+    if index_loaded:
+        await load_geo_indexes()
+
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'organizations' in statement:
+            statements.append(statement)
+
+    engine = app.container.db_manager().engine.sync_engine
+    event.listen(engine, 'before_cursor_execute', on_execute)
+    try:
+        response = await async_client.post(
+            '/organizations/search/batch',
+            json={'items': areas, 'limit': 2},
+            headers=HEADERS,
+        )
+    finally:
+        event.remove(engine, 'before_cursor_execute', on_execute)
+
+    assert response.status_code == 200, response.text
+    assert len(statements) == 1
+    pages = response.json()
+    assert [
+        [item['id'] for item in page['items']] for page in pages
+    ] == [ids[:2] for ids in expected]
+
+    response = await async_client.post(
+        '/organizations/search/batch',
+        json={
+            'items': areas,
+            'limit': 2,
+            'cursors': [page['next_cursor'] for page in pages],
+        },
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    # Без курсора область снова отдает первую страницу
+    assert [
+        [item['id'] for item in page['items']] for page in response.json()
+    ] == [
+        ids[2:4] if page['next_cursor'] else ids[:2]
+        for ids, page in zip(expected, pages)
+    ]
+
+
+async def test_batch_search_bad_cursor(async_client):
+    response = await async_client.post(
+        '/organizations/search/batch',
+        json={
+            'items': [{'latitude': 55.70, 'longitude': 37.62, 'radius_km': 1}],
+            'cursors': [make_cursor([5])],
+        },
+        headers=HEADERS,
+    )
+    assert response.status_code == 400, response.text
@@ -0,0 +1,286 @@
+import time
+import uuid
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.main import app
+from app.core.config import settings
+from app.db import DataBaseManager
+from app.db.middleware import PRIMARY_UNTIL_COOKIE
+from app.db.models import Activity, Base, Building, Organization
+
+HEADERS = {'Authorization': f'Bearer {settings.api_key}'}
+RECTANGLE = {'min_lat': 55.7, 'max_lat': 55.8, 'min_lon': 37.6, 'max_lon': 37.7}
+
+
+@pytest.fixture(scope='function')
+async def replica_db_manager(tmp_path):
+    """
+    Основная БД из настроек и реплика в отдельном файле SQLite
+    со схемой, но без данных: реплика, отставшая от всех записей теста
+    """
+    replica_url = f'sqlite+aiosqlite:///{tmp_path / "replica.sqlite3"}'
+    replica_engine = create_async_engine(replica_url)
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await replica_engine.dispose()
+
+    db_manager = DataBaseManager(
+        db_url=settings.db_url,
+        replica_urls=[replica_url],
+    )
+    app.container.db_manager.override(db_manager)
+
+    yield db_manager
+
+    app.container.db_manager.reset_override()
+    await db_manager.dispose()
+
+
+async def create_organization(async_client) -> dict:
+    response = await async_client.post(
+        '/organizations/buildings/',
+        json={'address': 'address', 'latitude': 55.75, 'longitude': 37.65},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    building_id = response.json()['id']
+
+    response = await async_client.post(
+        '/organizations/activities/',
+        json={'name': 'activity'},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    activity_id = response.json()['id']
+
+    response = await async_client.post(
+        '/organizations',
+        json={
+            'name': 'organization',
+            'building_id': building_id,
+            'activity_ids': [activity_id],
+        },
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+
+    return {
+        'building_id': building_id,
+        'activity_id': activity_id,
+        'organization_id': response.json()['id'],
+    }
+
+
+async def test_reads_go_to_primary_after_own_write(
+        async_client,
+        replica_db_manager,
+):
+    """Чтения идут к реплике, кроме чтений клиента сразу после его записи"""
+    ids = await create_organization(async_client)
+    params = {'building_id': ids['building_id']}
+
+    response = await async_client.get(
+        '/organizations/by-building',
+        params=params,
+        headers=HEADERS,
+    )
+    assert [item['id'] for item in response.json()['items']] == [
+        ids['organization_id']
+    ]
+
+    async_client.cookies.clear()
+    response = await async_client.get(
+        '/organizations/by-building',
+        params=params,
+        headers=HEADERS,
+    )
+    assert response.json()['items'] == []
+
+
+async def test_caches_are_filled_from_primary(async_client, replica_db_manager):
+    """
+    Кэш тайлов и кэш дерева деятельностей заполняются из основной БД,
+    даже когда запрос читает с отстающей реплики
+    """
+    response = await async_client.post(
+        '/organizations/search/rectangle',
+        json=RECTANGLE,
+        headers=HEADERS,
+    )
+    assert response.json()['items'] == []
+
+    ids = await create_organization(async_client)
+    async_client.cookies.clear()
+
+    response = await async_client.post(
+        '/organizations/search/rectangle',
+        json=RECTANGLE,
+        headers=HEADERS,
+    )
+    assert [item['id'] for item in response.json()['items']] == [
+        ids['organization_id']
+    ]
+
+    response = await async_client.get('/activities/tree', headers=HEADERS)
+    assert [activity['id'] for activity in response.json()] == [
+        ids['activity_id']
+    ]
+    assert response.headers['ETag'] == 'W/"activities-1"'
+
+
+async def test_cache_hits_do_not_check_out_connections(
+        async_client,
+        replica_db_manager,
+):
+    """Ответ из кэша тайлов и ответ 304 не берут соединение ни из одного пула"""
+    await create_organization(async_client)
+    async_client.cookies.clear()
+
+    response = await async_client.post(
+        '/organizations/search/rectangle',
+        json=RECTANGLE,
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    response = await async_client.get('/activities/tree', headers=HEADERS)
+    etag = response.headers['ETag']
+
+    checkouts = []
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.append(connection_record)
+
+    pools = [
+        engine.sync_engine.pool
+        for engine in [replica_db_manager.engine, *replica_db_manager.replica_engines]
+    ]
+    for pool in pools:
+        event.listen(pool, 'checkout', on_checkout)
+    try:
+        response = await async_client.post(
+            '/organizations/search/rectangle',
+            json=RECTANGLE,
+            headers=HEADERS,
+        )
+        assert response.status_code == 200, response.text
+
+        response = await async_client.get(
+            '/activities/tree',
+            headers={**HEADERS, 'If-None-Match': etag},
+        )
+        assert response.status_code == 304
+    finally:
+        for pool in pools:
+            event.remove(pool, 'checkout', on_checkout)
+
+    assert checkouts == []
+
+
+async def test_unavailable_replica_falls_back_to_primary(
+        async_client,
+        tmp_path,
+):
+    """Если к реплике не подключиться, чтение идет к основной БД"""
+    db_manager = DataBaseManager(
+        db_url=settings.db_url,
+        replica_urls=[f'sqlite+aiosqlite:///{tmp_path / "missing" / "replica.sqlite3"}'],
+    )
+    app.container.db_manager.override(db_manager)
+    try:
+        ids = await create_organization(async_client)
+        async_client.cookies.clear()
+
+        response = await async_client.get(
+            '/organizations/by-building',
+            params={'building_id': ids['building_id']},
+            headers=HEADERS,
+        )
+        assert [item['id'] for item in response.json()['items']] == [
+            ids['organization_id']
+        ]
+        assert db_manager._replica_unhealthy_until[0] > time.monotonic()
+    finally:
+        app.container.db_manager.reset_override()
+        await db_manager.dispose()
+
+
+async def test_cached_endpoints_show_own_write_from_other_process(
+        async_client,
+        replica_db_manager,
+):
+    """
+    Запись, прошедшая через другой процесс, не сбрасывает кэши этого
+    процесса; клиент сразу после записи все равно видит ее в ответах
+    кэшируемых эндпоинтов
+    """
+    ids = await create_organization(async_client)
+    async_client.cookies.clear()
+
+    response = await async_client.post(
+        '/organizations/search/rectangle',
+        json=RECTANGLE,
+        headers=HEADERS,
+    )
+    assert [item['id'] for item in response.json()['items']] == [
+        ids['organization_id']
+    ]
+    await async_client.get('/activities/tree', headers=HEADERS)
+    await async_client.get(
+        '/organizations/by-activity',
+        params={'activity_id': ids['activity_id']},
+        headers=HEADERS,
+    )
+
+    # Запись другого процесса: сразу в основную БД, без сброса кэшей
+    activity_id = uuid.uuid4()
+    async with replica_db_manager.AsyncSessionLocal() as session:
+        organization = Organization(
+            name='other organization',
+            building=Building(address='other address', latitude=55.76, longitude=37.66),
+            activities=[await session.get(Activity, uuid.UUID(ids['activity_id']))],
+        )
+        session.add_all([
+            organization,
+            Activity(
+                id=activity_id,
+                name='other activity',
+                path=Activity.build_path(activity_id),
+                depth=1,
+            ),
+        ])
+        await session.commit()
+
+    # Без недавней записи клиента ответы идут из кэшей
+    response = await async_client.post(
+        '/organizations/search/rectangle',
+        json=RECTANGLE,
+        headers=HEADERS,
+    )
+    assert [item['id'] for item in response.json()['items']] == [
+        ids['organization_id']
+    ]
+
+    async_client.cookies.set(PRIMARY_UNTIL_COOKIE, str(time.time() + 60))
+    expected = sorted([ids['organization_id'], str(organization.id)])
+
+    response = await async_client.post(
+        '/organizations/search/rectangle',
+        json=RECTANGLE,
+        headers=HEADERS,
+    )
+    assert [item['id'] for item in response.json()['items']] == expected
+
+    response = await async_client.get(
+        '/organizations/by-activity',
+        params={'activity_id': ids['activity_id']},
+        headers=HEADERS,
+    )
+    assert [item['id'] for item in response.json()['items']] == expected
+
+    response = await async_client.get('/activities/tree', headers=HEADERS)
+    assert sorted(activity['id'] for activity in response.json()) == sorted(
+        [ids['activity_id'], str(activity_id)]
+    )
@@ -0,0 +1,119 @@
+import uuid
+from types import SimpleNamespace
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.main import app
+from app.core.config import settings
+from app.db.models import Organization
+from app.schemas.activity import ActivityChildrenSchema
+from app.schemas.organization import OrganizationSchema, OrganizationShortSchema
+from app.schemas.pagination import PageSchema
+from app.schemas.serializer import get_serializer, serialize_page
+
+HEADERS = {'Authorization': f'Bearer {settings.api_key}'}
+
+
+def to_json(data) -> dict:
+    return orjson.loads(orjson.dumps(data))
+
+
+async def test_serializer_matches_model_dump(
+        async_client,
+        create_building,
+        create_activity,
+        create_organization,
+):
+    """Скомпилированный сериализатор дает те же данные, что и pydantic"""
+    building_id = await create_building(55.75, 37.62)
+    root_id = await create_activity('root')
+    child_id = await create_activity('child', parent_id=root_id)
+    for number in range(3):
+        await create_organization(building_id, [root_id], f'organization {number}')
+
+    response = await async_client.post(
+        '/organizations',
+        json={
+            'name': 'with relations',
+            'building_id': str(building_id),
+            'activity_ids': [str(root_id), str(child_id)],
+            'phones': ['8-800-000-00-00', '8-800-000-00-01'],
+        },
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    organization_id = uuid.UUID(response.json()['id'])
+
+    async with app.container.db_manager().AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Organization)
+            .options(
+                joinedload(Organization.building),
+                selectinload(Organization.activities),
+                selectinload(Organization.phones),
+            )
+            .order_by(Organization.id)
+        )
+        organizations = list(result.scalars().all())
+
+    organization = next(
+        organization for organization in organizations
+        if organization.id == organization_id
+    )
+    schema = organization.serialize(OrganizationSchema, exclude_fields=('phones', ))
+    schema.phones = [phone.number for phone in organization.phones]
+    expected = schema.model_dump(mode='json')
+    assert len(expected['activities']) == 2 and len(expected['phones']) == 2
+
+    data = get_serializer(OrganizationSchema, ('phones', ))(organization)
+    assert to_json(data) == {
+        key: value for key, value in expected.items() if key != 'phones'
+    }
+
+    response = await async_client.get(
+        f'/organizations/{organization_id}',
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == expected
+
+    page_adapter = TypeAdapter(PageSchema[OrganizationShortSchema])
+    page = page_adapter.validate_python(
+        PageSchema(items=organizations, next_cursor='cursor'),
+        from_attributes=True,
+    )
+    assert to_json(
+        serialize_page(OrganizationShortSchema, organizations, 'cursor')
+    ) == page_adapter.dump_python(page, mode='json')
+
+
+def test_serializer_matches_model_dump_for_recursive_schema():
+    """Схема, ссылающаяся на себя, сериализуется на всю глубину"""
+    root_id, child_id = uuid.uuid4(), uuid.uuid4()
+    tree = SimpleNamespace(
+        id=root_id,
+        name='root',
+        parent_id=None,
+        children=[
+            SimpleNamespace(
+                id=child_id,
+                name='child',
+                parent_id=root_id,
+                children=[
+                    SimpleNamespace(
+                        id=uuid.uuid4(),
+                        name='grandchild',
+                        parent_id=child_id,
+                        children=[],
+                    ),
+                ],
+            ),
+        ],
+    )
+
+    assert to_json(get_serializer(ActivityChildrenSchema)(tree)) == (
+        ActivityChildrenSchema.model_validate(tree).model_dump(mode='json')
+    )
@@ -0,0 +1,82 @@
+import asyncio
+from collections import defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.main import app
+from app.core.config import settings
+
+REQUESTS_COUNT = 300
+HEADERS = {'Authorization': f'Bearer {settings.api_key}'}
+
+
+async def test_parallel_requests_use_own_sessions(async_client):
+    """
+    Параллельные атомарные (POST) и неатомарные (GET) запросы
+    не делят сессии, не падают и возвращают все соединения в пул
+    """
+    response = await async_client.post(
+        '/organizations/buildings/',
+        json={'address': 'address', 'latitude': 55.75, 'longitude': 37.62},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    building_id = response.json()['id']
+
+    response = await async_client.post(
+        '/organizations/activities/',
+        json={'name': 'activity'},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200, response.text
+    activity_id = response.json()['id']
+
+    # Сессии хранятся до конца теста, чтобы их id не переиспользовались
+    task_sessions = defaultdict(list)
+
+    def on_begin(session, transaction, connection) -> None:
+        task_sessions[asyncio.current_task()].append(session)
+
+    def create_organization(number: int):
+        return async_client.post(
+            '/organizations',
+            json={
+                'name': f'organization {number}',
+                'building_id': building_id,
+                'activity_ids': [activity_id],
+                'phones': [str(number)],
+            },
+            headers=HEADERS,
+        )
+
+    def get_organizations(number: int):
+        return async_client.get(
+            '/organizations/by-building',
+            params={'building_id': building_id},
+            headers=HEADERS,
+        )
+
+    event.listen(Session, 'after_begin', on_begin)
+    try:
+        responses = await asyncio.gather(*(
+            (create_organization if number % 2 else get_organizations)(number)
+            for number in range(REQUESTS_COUNT)
+        ))
+    finally:
+        event.remove(Session, 'after_begin', on_begin)
+
+    failed = [
+        (response.status_code, response.text)
+        for response in responses
+        if response.status_code != 200
+    ]
+    assert not failed
+
+    assert len(task_sessions) == REQUESTS_COUNT
+    session_tasks = {}
+    for task, sessions in task_sessions.items():
+        for session in sessions:
+            assert session_tasks.setdefault(id(session), task) is task
+
+    assert app.container.db_manager().get_pool_stats().checked_out == 0
@@ -30,10 +30,134 @@ class Settings(BaseSettings):
     )
     use_sqlite: bool = Field(default=False)
 
+    db_pool_size: int = Field(
+        title='Количество постоянных соединений в пуле',
+        default=5,
+        ge=1,
+    )
+    db_max_overflow: int = Field(
+        title='Количество соединений сверх размера пула',
+        default=10,
+        ge=0,
+    )
+    db_pool_timeout: float = Field(
+        title='Время ожидания свободного соединения из пула (в секундах)',
+        default=30.0,
+        gt=0,
+    )
+    db_pool_recycle: int = Field(
+        title='Время жизни соединения в пуле (в секундах, -1 - без ограничения)',
+        default=1800,
+        ge=-1,
+    )
+    db_pool_pre_ping: bool = Field(
+        title='Проверка соединения перед выдачей из пула',
+        default=True,
+    )
+    db_statement_cache_size: int = Field(
+        title=(
+            'Размер кэша подготовленных выражений asyncpg '
+            '(0 - для pgbouncer в режиме транзакций)'
+        ),
+        default=100,
+        ge=0,
+    )
+
+    db_replica_urls: list[str] = Field(
+        title='URL реплик БД только для чтения',
+        default=[],
+    )
+    db_replica_retry_interval_seconds: float = Field(
+        title='Время исключения недоступной реплики из чтения (в секундах)',
+        default=10.0,
+        gt=0,
+    )
+    db_read_your_writes_seconds: float = Field(
+        title='Время чтения из основной БД после записи клиента (в секундах)',
+        default=5.0,
+        ge=0,
+    )
+
+    # endregion
+
+    # region Гео-поиск
+    geo_index_cell_size_deg: float = Field(
+        title='Размер ячейки пространственного индекса зданий (в градусах)',
+        default=0.01,
+        gt=0,
+    )
+    geo_index_check_interval_seconds: float = Field(
+        title='Интервал сверки пространственного индекса зданий с БД (в секундах)',
+        default=30.0,
+        gt=0,
+    )
+    cluster_max_zoom: int = Field(
+        title='Максимальный масштаб карты с предрасчитанными кластерами',
+        default=16,
+        ge=0,
+    )
+    cluster_grid_subdivision: int = Field(
+        title='Степень двойки, на которую делится тайл карты при кластеризации',
+        default=3,
+        ge=0,
+    )
+    cluster_index_check_interval_seconds: float = Field(
+        title='Интервал сверки предрасчитанных кластеров с БД (в секундах)',
+        default=30.0,
+        gt=0,
+    )
+    geo_cache_tile_size_deg: float = Field(
+        title='Размер тайла кэша гео-поиска (в градусах)',
+        default=0.02,
+        gt=0,
+    )
+    geo_cache_max_tiles: int = Field(
+        title='Максимальное количество тайлов в кэше гео-поиска',
+        default=20000,
+        ge=0,
+    )
+    geo_cache_max_tiles_per_search: int = Field(
+        title='Максимальное количество тайлов в одном кэшируемом поиске',
+        default=256,
+        ge=1,
+    )
+    geo_cache_ttl_seconds: float = Field(
+        title='Время жизни тайла в кэше гео-поиска (в секундах)',
+        default=60.0,
+        gt=0,
+    )
+    # endregion
+
+    # region Пагинация
+    page_size_default: int = Field(
+        title='Размер страницы списков по умолчанию',
+        default=50,
+        ge=1,
+    )
+    page_size_max: int = Field(
+        title='Максимальный размер страницы списков',
+        default=500,
+        ge=1,
+    )
+    # endregion
+
+    # region Деятельности
+    activity_cache_check_interval_seconds: float = Field(
+        title='Интервал сверки кэша дерева деятельностей с БД (в секундах)',
+        default=30.0,
+        gt=0,
+    )
+    activity_index_check_interval_seconds: float = Field(
+        title='Интервал сверки битового индекса организаций по деятельностям с БД (в секундах)',
+        default=30.0,
+        gt=0,
+    )
     # endregion
 
     container_wiring_modules: list = [
         'app.api.v1.endpoints.organizations',
+        'app.api.v1.endpoints.activities',
+        'app.api.v1.endpoints.metrics',
     ]
 
     @property
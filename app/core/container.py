@@ -20,12 +20,67 @@ from app.db.models import (
     Building,
     Activity,
 )
+from app.services.activity_bitmap import OrganizationActivityIndex
+from app.services.activity_cache import ActivityTreeCache
+from app.services.clustering import OrganizationClusterIndex
+from app.services.geo_cache import GeoTileCache
 from app.services.geo_search import GeoService
+from app.services.spatial_index import BuildingGridIndex
 
 
 class Container(containers.DeclarativeContainer):
-    db_manager = providers.Singleton(DataBaseManager, db_url=settings.db_url)
-    session = providers.Resource(db_manager().get_async_session)
+    db_manager = providers.Singleton(
+        DataBaseManager,
+        db_url=settings.db_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        statement_cache_size=settings.db_statement_cache_size,
+        replica_urls=settings.db_replica_urls,
+        replica_retry_interval_seconds=settings.db_replica_retry_interval_seconds,
+    )
+    # Своя сессия на каждый запрос (контекст), закрывается SessionMiddleware
+    session = providers.ContextLocalResource(
+        DataBaseManager.get_async_session,
+        db_manager,
+    )
+    read_session = providers.ContextLocalResource(
+        DataBaseManager.get_async_read_session,
+        db_manager,
+    )
+    # Кэши заполняются и сверяются только с основной БД
+    cache_session = providers.ContextLocalResource(
+        DataBaseManager.get_async_primary_read_session,
+        db_manager,
+    )
+    building_index = providers.Singleton(
+        BuildingGridIndex,
+        cell_size_deg=settings.geo_index_cell_size_deg,
+        check_interval_seconds=settings.geo_index_check_interval_seconds,
+    )
+    cluster_index = providers.Singleton(
+        OrganizationClusterIndex,
+        max_zoom=settings.cluster_max_zoom,
+        grid_subdivision=settings.cluster_grid_subdivision,
+        check_interval_seconds=settings.cluster_index_check_interval_seconds,
+    )
+    geo_tile_cache = providers.Singleton(
+        GeoTileCache,
+        tile_size_deg=settings.geo_cache_tile_size_deg,
+        max_tiles=settings.geo_cache_max_tiles,
+        max_tiles_per_search=settings.geo_cache_max_tiles_per_search,
+        ttl_seconds=settings.geo_cache_ttl_seconds,
+    )
+    activity_cache = providers.Singleton(
+        ActivityTreeCache,
+        check_interval_seconds=settings.activity_cache_check_interval_seconds,
+    )
+    activity_index = providers.Singleton(
+        OrganizationActivityIndex,
+        check_interval_seconds=settings.activity_index_check_interval_seconds,
+    )
 
     # region repository
     repository_phone = providers.Factory(
@@ -48,6 +103,21 @@ class Container(containers.DeclarativeContainer):
         model=Building,
         session=session,
     )
+    cache_repository_building = providers.Factory(
+        RepositoryBuilding,
+        model=Building,
+        session=cache_session,
+    )
+    cache_repository_organization = providers.Factory(
+        RepositoryOrganization,
+        model=Organization,
+        session=cache_session,
+    )
+    cache_repository_activity = providers.Factory(
+        RepositoryActivity,
+        model=Activity,
+        session=cache_session,
+    )
     # endregion
 
     # region services
@@ -60,20 +130,36 @@ class Container(containers.DeclarativeContainer):
         repository_organization=repository_organization,
         repository_phone=repository_phone,
         repository_activity=repository_activity,
-        repository_building=repository_building
+        repository_building=repository_building,
+        cache_repository_organization=cache_repository_organization,
+        cache_repository_activity=cache_repository_activity,
+        cluster_index=cluster_index,
+        geo_tile_cache=geo_tile_cache,
+        activity_cache=activity_cache,
+        activity_index=activity_index,
     )
     activity_service = providers.Factory(
         ActivityService,
         repository=repository_activity,
+        cache_repository=cache_repository_activity,
+        activity_cache=activity_cache,
     )
     building_service = providers.Factory(
         BuildingService,
         repository=repository_building,
+        building_index=building_index,
+        geo_tile_cache=geo_tile_cache,
         unique_fields=('address', )
     )
     geo_service = providers.Factory(
         GeoService,
-        session=session
+        session=read_session,
+        cache_session=cache_session,
+        cache_repository_building=cache_repository_building,
+        cache_repository_organization=cache_repository_organization,
+        building_index=building_index,
+        cluster_index=cluster_index,
+        geo_tile_cache=geo_tile_cache,
     )
     # endregion
 
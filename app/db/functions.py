@@ -0,0 +1,61 @@
+from math import radians, sin, cos, sqrt, asin
+
+from sqlalchemy import Float, func, literal
+from sqlalchemy.sql.elements import ColumnElement
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(
+        lat1: float,
+        lon1: float,
+        lat2: float,
+        lon2: float,
+) -> float:
+    """Расстояние между двумя точками по формуле гаверсинуса (в км)"""
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+
+    a = (
+        sin(dlat / 2) ** 2
+        + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(min(1.0, a)))
+
+
+def register_sqlite_functions(dbapi_connection, connection_record) -> None:
+    """Регистрирует пользовательские функции в соединении SQLite"""
+    dbapi_connection.create_function(
+        'haversine_km', 4, haversine_km, deterministic=True
+    )
+
+
+def distance_km(
+        dialect_name: str,
+        latitude: float,
+        longitude: float,
+        latitude_column: ColumnElement,
+        longitude_column: ColumnElement,
+) -> ColumnElement[float]:
+    """
+    SQL-выражение расстояния от точки до координат в колонках (в км).
+    В SQLite используется зарегистрированная функция haversine_km,
+    в остальных СУБД формула собирается из встроенных функций
+    """
+    if dialect_name == 'sqlite':
+        return func.haversine_km(
+            latitude, longitude, latitude_column, longitude_column
+        )
+
+    dlat = func.radians(latitude_column - latitude, type_=Float)
+    dlon = func.radians(longitude_column - longitude, type_=Float)
+    a = (
+        func.power(func.sin(dlat * 0.5, type_=Float), 2, type_=Float)
+        + func.cos(func.radians(literal(latitude, Float)), type_=Float)
+        * func.cos(func.radians(latitude_column, type_=Float), type_=Float)
+        * func.power(func.sin(dlon * 0.5, type_=Float), 2, type_=Float)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(
+        func.sqrt(func.least(1.0, a, type_=Float), type_=Float),
+        type_=Float,
+    )
@@ -0,0 +1,137 @@
+from typing import List, Optional, Tuple
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+
+def _get_bits(precision: int) -> Tuple[int, int]:
+    """Количество бит долготы и широты в геохеше заданной длины"""
+    bits = precision * 5
+    return (bits + 1) // 2, bits // 2
+
+
+def _interleave(lon_index: int, lat_index: int, precision: int) -> int:
+    lon_bits, lat_bits = _get_bits(precision)
+    value = 0
+
+    # Биты долготы стоят на четных позициях (считая со старшего бита)
+    for position in range(precision * 5):
+        if position % 2 == 0:
+            lon_bits -= 1
+            bit = (lon_index >> lon_bits) & 1
+        else:
+            lat_bits -= 1
+            bit = (lat_index >> lat_bits) & 1
+        value = (value << 1) | bit
+
+    return value
+
+
+def _to_string(value: int, precision: int) -> str:
+    chars = []
+    for _ in range(precision):
+        chars.append(BASE32[value & 31])
+        value >>= 5
+
+    return ''.join(reversed(chars))
+
+
+def _get_cell_index(
+        latitude: float,
+        longitude: float,
+        precision: int,
+) -> Tuple[int, int]:
+    lon_bits, lat_bits = _get_bits(precision)
+    lon_cells = 1 << lon_bits
+    lat_cells = 1 << lat_bits
+
+    lon_index = int((longitude + 180.0) / 360.0 * lon_cells)
+    lat_index = int((latitude + 90.0) / 180.0 * lat_cells)
+
+    return (
+        min(max(lon_index, 0), lon_cells - 1),
+        min(max(lat_index, 0), lat_cells - 1),
+    )
+
+
+def encode(
+        latitude: float,
+        longitude: float,
+        precision: int = GEOHASH_PRECISION,
+) -> str:
+    """Геохеш точки заданной длины"""
+    lon_index, lat_index = _get_cell_index(latitude, longitude, precision)
+    return _to_string(_interleave(lon_index, lat_index, precision), precision)
+
+
+def get_successor(geohash: str) -> Optional[str]:
+    """
+    Наименьшая строка, большая любого геохеша с префиксом geohash.
+    None, если такой строки нет (префикс состоит из 'z')
+    """
+    geohash = geohash.rstrip(BASE32[-1])
+    if not geohash:
+        return None
+
+    return geohash[:-1] + BASE32[BASE32.index(geohash[-1]) + 1]
+
+
+def get_covering_ranges(
+        min_lat: float,
+        max_lat: float,
+        min_lon: float,
+        max_lon: float,
+        max_cells: int = 16,
+) -> List[Tuple[str, Optional[str]]]:
+    """
+    Покрывает прямоугольник ячейками геохеша максимальной длины,
+    при которой ячеек не больше max_cells, и склеивает соседние
+    по порядку ячейки в диапазоны [начало, конец).
+    Любой геохеш точки прямоугольника попадает в один из диапазонов
+    """
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+
+    precision = 0
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        min_lon_index, min_lat_index = _get_cell_index(
+            min_lat, min_lon, candidate
+        )
+        max_lon_index, max_lat_index = _get_cell_index(
+            max_lat, max_lon, candidate
+        )
+        cells_count = (
+            (max_lon_index - min_lon_index + 1)
+            * (max_lat_index - min_lat_index + 1)
+        )
+        if cells_count > max_cells:
+            break
+        precision = candidate
+
+    if not precision:
+        return [('', None)]
+
+    min_lon_index, min_lat_index = _get_cell_index(min_lat, min_lon, precision)
+    max_lon_index, max_lat_index = _get_cell_index(max_lat, max_lon, precision)
+    cells = sorted(
+        _interleave(lon_index, lat_index, precision)
+        for lon_index in range(min_lon_index, max_lon_index + 1)
+        for lat_index in range(min_lat_index, max_lat_index + 1)
+    )
+
+    ranges = []
+    start = end = cells[0]
+    for cell in cells[1:]:
+        if cell != end + 1:
+            ranges.append((start, end))
+            start = cell
+        end = cell
+    ranges.append((start, end))
+
+    return [
+        (
+            _to_string(start, precision),
+            get_successor(_to_string(end, precision)),
+        )
+        for start, end in ranges
+    ]
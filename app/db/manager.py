@@ -1,34 +1,307 @@
-from asyncio import current_task
-from typing import AsyncGenerator
+import itertools
+import time
+from typing import AsyncGenerator, List, NamedTuple, Optional, Sequence
 
+import loguru
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
+    AsyncEngine,
     AsyncSession
 )
 
-from app.core.config import settings
+from app.db.functions import register_sqlite_functions
+from app.db.routing import (
+    ReadRoutingSession,
+    WriteTrackingSession,
+    request_routing,
+)
+
+# Транзакция только на чтение (в PostgreSQL; DEFERRABLE действует только
+# вместе с SERIALIZABLE, недоступным на репликах). Другие диалекты
+# эти параметры игнорируют
+READ_ONLY_EXECUTION_OPTIONS = {
+    'postgresql_readonly': True,
+    'postgresql_deferrable': True,
+}
+
+
+class PoolStats(NamedTuple):
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
 
 
 class DataBaseManager:
-    """Менеджер для работы с базой данных"""
+    """
+    Менеджер для работы с базой данных.
+
+    Движок и фабрика сессий создаются при первом обращении,
+    поэтому на процесс приходится один движок с одним пулом соединений.
+
+    Сессии только для чтения выбирают реплику по кругу при первом
+    запросе, поэтому запрос, не обратившийся к БД (например, ответ
+    из кэша), не берет соединение. Реплика, к которой не удалось
+    подключиться, пропускается replica_retry_interval_seconds,
+    а без доступных реплик чтение идет к основной БД.
+
+    Кэши в памяти процесса заполняются и сверяются с БД через сессии
+    только для чтения к основной БД: заполненный с отстающей реплики
+    кэш раздавал бы устаревшие данные и тем, кто только что записал
+    """
+
+    def __init__(
+            self,
+            db_url: str,
+            pool_size: int = 5,
+            max_overflow: int = 10,
+            pool_timeout: float = 30.0,
+            pool_recycle: int = -1,
+            pool_pre_ping: bool = False,
+            statement_cache_size: Optional[int] = None,
+            replica_urls: Sequence[str] = (),
+            replica_retry_interval_seconds: float = 10.0,
+    ):
+        self.db_url = db_url
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+        self.statement_cache_size = statement_cache_size
+        self.replica_urls = list(replica_urls)
+        self.replica_retry_interval_seconds = replica_retry_interval_seconds
+        self._engine: Optional[AsyncEngine] = None
+        self._session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self._read_session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self._primary_read_session_factory: Optional[
+            async_sessionmaker[AsyncSession]
+        ] = None
+        self._primary_read_engine: Optional[AsyncEngine] = None
+        self._replica_engines: Optional[List[AsyncEngine]] = None
+        self._replica_read_engines: List[AsyncEngine] = []
+        self._replica_unhealthy_until = [0.0] * len(self.replica_urls)
+        self._replica_counter = itertools.count()
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            self._engine = self._create_engine(self.db_url)
+
+        return self._engine
+
+    @property
+    def AsyncSessionLocal(self) -> async_sessionmaker[AsyncSession]:
+        if self._session_factory is None:
+            self._session_factory = self._create_session_factory(
+                self.engine,
+                sync_session_class=WriteTrackingSession,
+            )
 
-    def __init__(self, db_url: str):
-        self.engine = create_async_engine(url=db_url)
-        self.AsyncSessionLocal = async_sessionmaker(
-            bind=self.engine,
+        return self._session_factory
+
+    @property
+    def ReadSessionLocal(self) -> async_sessionmaker[AsyncSession]:
+        """
+        Фабрика сессий только для чтения: реплика или основная БД
+        выбирается при первом запросе сессии (см. _select_read_engine)
+        """
+        if self._read_session_factory is None:
+            self._read_session_factory = self._create_session_factory(
+                self.engine,
+                sync_session_class=ReadRoutingSession,
+                select_bind=self._select_read_engine,
+            )
+
+        return self._read_session_factory
+
+    @property
+    def PrimaryReadSessionLocal(self) -> async_sessionmaker[AsyncSession]:
+        """
+        Фабрика сессий основной БД, соединения которых открывают
+        транзакции только для чтения. Соединение берется из общего пула
+        только при первом запросе сессии
+        """
+        if self._primary_read_session_factory is None:
+            self._primary_read_session_factory = self._create_session_factory(
+                self.primary_read_engine,
+            )
+
+        return self._primary_read_session_factory
+
+    @property
+    def primary_read_engine(self) -> AsyncEngine:
+        """Движок основной БД с транзакциями только для чтения (общий пул)"""
+        if self._primary_read_engine is None:
+            self._primary_read_engine = self.engine.execution_options(
+                **READ_ONLY_EXECUTION_OPTIONS
+            )
+
+        return self._primary_read_engine
+
+    @property
+    def replica_engines(self) -> List[AsyncEngine]:
+        if self._replica_engines is None:
+            self._replica_engines = [
+                self._create_engine(replica_url)
+                for replica_url in self.replica_urls
+            ]
+            self._replica_read_engines = [
+                engine.execution_options(**READ_ONLY_EXECUTION_OPTIONS)
+                for engine in self._replica_engines
+            ]
+
+        return self._replica_engines
+
+    @staticmethod
+    def _create_session_factory(
+            engine: AsyncEngine,
+            **kwargs,
+    ) -> async_sessionmaker[AsyncSession]:
+        return async_sessionmaker(
+            bind=engine,
             class_=AsyncSession,
             autoflush=False,
             autocommit=False,
             expire_on_commit=False,
+            **kwargs
         )
 
+    def _create_engine(self, db_url: str) -> AsyncEngine:
+        connect_args = {}
+        if (
+            self.statement_cache_size is not None
+            and make_url(db_url).get_driver_name() == 'asyncpg'
+        ):
+            connect_args['statement_cache_size'] = self.statement_cache_size
+
+        engine = create_async_engine(
+            url=db_url,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_timeout=self.pool_timeout,
+            pool_recycle=self.pool_recycle,
+            pool_pre_ping=self.pool_pre_ping,
+            connect_args=connect_args,
+        )
+        if engine.dialect.name == 'sqlite':
+            event.listen(
+                engine.sync_engine,
+                'connect',
+                register_sqlite_functions,
+            )
+
+        return engine
+
     async def get_async_session(self) -> AsyncGenerator[AsyncSession, None]:
-        async with self.AsyncSessionLocal() as session:
+        """
+        Сессия запроса: для запросов только на чтение - к реплике,
+        иначе - к основной БД
+        """
+        routing = request_routing.get()
+        if routing is not None and routing.read_only:
+            session = self.ReadSessionLocal()
+        else:
+            session = self.AsyncSessionLocal()
+
+        async with session:
             yield session
 
-    async def dispose(self):
-        await self.engine.dispose()
+    async def get_async_read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """Сессия только для чтения: к реплике, если она доступна"""
+        async with self.ReadSessionLocal() as session:
+            yield session
+
+    async def get_async_primary_read_session(
+            self,
+    ) -> AsyncGenerator[AsyncSession, None]:
+        """Сессия только для чтения к основной БД (для кэшей)"""
+        async with self.PrimaryReadSessionLocal() as session:
+            yield session
+
+    def _select_read_engine(self) -> Engine:
+        """
+        Движок для первого запроса сессии только для чтения: следующая
+        по кругу доступная реплика. Подключение к ней проверяется,
+        при ошибке берется следующая реплика, а если клиент только что
+        писал или реплик нет - основная БД.
+        Вызывается из сессии внутри greenlet, поэтому подключается
+        синхронным API движка
+        """
+        routing = request_routing.get()
+        if routing is None or routing.replicas_allowed:
+            for index in self._get_replica_order():
+                engine = self._replica_read_engines[index].sync_engine
+                try:
+                    # Соединение возвращается в пул и тут же берется сессией
+                    engine.connect().close()
+                except (DBAPIError, OSError) as error:
+                    self._mark_replica_unhealthy(index, error)
+                    continue
+
+                return engine
+
+        return self.primary_read_engine.sync_engine
+
+    def _get_replica_order(self) -> List[int]:
+        """Номера доступных реплик, начиная со следующей по кругу"""
+        now = time.monotonic()
+        healthy = [
+            index
+            for index in range(len(self.replica_engines))
+            if self._replica_unhealthy_until[index] <= now
+        ]
+        if not healthy:
+            return []
 
+        start = next(self._replica_counter) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def _mark_replica_unhealthy(self, index: int, error: Exception) -> None:
+        self._replica_unhealthy_until[index] = (
+            time.monotonic() + self.replica_retry_interval_seconds
+        )
+        loguru.logger.warning(
+            f'Реплика БД №{index} недоступна, чтение переключено: {error}'
+        )
+
+    async def check_replicas(self) -> List[bool]:
+        """Проверяет подключение ко всем репликам и возвращает их доступность"""
+        healthy = []
+        for index, engine in enumerate(self.replica_engines):
+            try:
+                async with engine.connect() as connection:
+                    await connection.exec_driver_sql('SELECT 1')
+            except (DBAPIError, OSError) as error:
+                self._mark_replica_unhealthy(index, error)
+                healthy.append(False)
+            else:
+                self._replica_unhealthy_until[index] = 0.0
+                healthy.append(True)
+
+        return healthy
+
+    def get_pool_stats(self) -> PoolStats:
+        """Размер пула, занятые, свободные и сверхлимитные соединения"""
+        if self._engine is None:
+            return PoolStats(size=self.pool_size, checked_out=0, idle=0, overflow=0)
+
+        pool = self._engine.pool
+        return PoolStats(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # Отрицательное значение - еще не открытые соединения пула
+            overflow=max(pool.overflow(), 0),
+        )
+
+    async def dispose(self):
+        if self._engine is not None:
+            await self._engine.dispose()
 
-db_manager = DataBaseManager(db_url=settings.db_url)
\ No newline at end of file
+        for engine in self._replica_engines or []:
+            await engine.dispose()
@@ -0,0 +1,86 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.container import Container
+from app.db.routing import RequestRouting, request_routing
+
+READ_ONLY_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+# Время (unix), до которого чтения клиента идут к основной БД
+PRIMARY_UNTIL_COOKIE = 'db_primary_until'
+
+
+class SessionMiddleware:
+    """
+    Управляет сессиями БД запроса.
+
+    Сессии в контейнере - ContextLocalResource: они создаются при первом
+    обращении внутри запроса и видны только его контексту, поэтому
+    параллельные запросы получают разные сессии и соединения из пула.
+    Middleware выполняется в той же задаче, что и обработчик: задает
+    маршрутизацию сессий (GET - к репликам) и по завершении запроса
+    возвращает соединения в пул.
+
+    После записи клиенту ставится cookie, и следующие
+    read_your_writes_seconds его чтения идут к основной БД
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            container: Container,
+            read_your_writes_seconds: float = 5.0,
+    ) -> None:
+        self.app = app
+        self.container = container
+        self.read_your_writes_seconds = read_your_writes_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        routing = RequestRouting(
+            read_only=scope['method'] in READ_ONLY_METHODS,
+            replicas_allowed=not self._has_recent_write(scope),
+        )
+        token = request_routing.set(routing)
+
+        async def send_with_cookie(message: Message) -> None:
+            if (
+                message['type'] == 'http.response.start'
+                and routing.has_writes
+                and self.read_your_writes_seconds
+            ):
+                MutableHeaders(scope=message).append(
+                    'set-cookie',
+                    f'{PRIMARY_UNTIL_COOKIE}='
+                    f'{time.time() + self.read_your_writes_seconds:.3f}; '
+                    f'Max-Age={int(self.read_your_writes_seconds) + 1}; '
+                    f'Path=/; HttpOnly; SameSite=lax',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            # До первого обращения к сессии закрывать нечего
+            for provider in (
+                    self.container.session,
+                    self.container.read_session,
+                    self.container.cache_session,
+            ):
+                shutdown = provider.shutdown()
+                if shutdown is not None:
+                    await shutdown
+            request_routing.reset(token)
+
+    @staticmethod
+    def _has_recent_write(scope: Scope) -> bool:
+        primary_until = HTTPConnection(scope).cookies.get(PRIMARY_UNTIL_COOKIE)
+        try:
+            return primary_until is not None and float(primary_until) > time.time()
+        except ValueError:
+            return False
@@ -1,21 +1,46 @@
 import uuid
 from typing import List, Optional
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    Table,
+    CheckConstraint,
+)
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.db.models import Base
 from app.db.models.mixins import UUIDMixin
 
+# Побайтовое сравнение строк нужно для диапазонных запросов по пути
+PathString = String().with_variant(String(collation='C'), 'postgresql')
+
 
 class Activity(Base, UUIDMixin):
     __tablename__ = 'activities'
 
+    # Максимальная глубина дерева деятельностей
+    max_depth = 3
+    __table_args__ = (
+        CheckConstraint(
+            f'depth BETWEEN 1 AND {max_depth}',
+            name='depth',
+        ),
+    )
+
+    # Длина сегмента пути: 32 символа UUID в hex и разделитель
+    path_segment_length = 33
+
     name: Mapped[str] = mapped_column(String, nullable=False)
     parent_id: Mapped[Optional[uuid.UUID]] = mapped_column(
         ForeignKey('activities.id'),
-        nullable=True
+        nullable=True,
+        index=True,
     )
+    path: Mapped[str] = mapped_column(PathString, nullable=False, index=True)
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
 
     parent = relationship(
         'Activity',
@@ -31,3 +56,14 @@ class Activity(Base, UUIDMixin):
         secondary='organization_activity',
         back_populates='activities'
     )
+
+    @staticmethod
+    def build_path(
+            activity_id: uuid.UUID,
+            parent_path: Optional[str] = None,
+    ) -> str:
+        """
+        Материализованный путь: ID всех предков и самой деятельности
+        в hex, каждый с завершающим '/'
+        """
+        return f'{parent_path or ""}{activity_id.hex}/'
@@ -1,16 +1,33 @@
 from typing import List, Optional
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Table, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Float, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
+from app.db import geohash
 from app.db.models import Base
 from app.db.models.mixins import UUIDMixin
 
 
+def get_building_geohash(context) -> str:
+    """Значение по умолчанию для геохеша из координат вставляемой строки"""
+    parameters = context.get_current_parameters()
+    return geohash.encode(parameters['latitude'], parameters['longitude'])
+
+
 class Building(Base, UUIDMixin):
+    __table_args__ = (
+        Index('ix_buildings_latitude_longitude', 'latitude', 'longitude'),
+    )
+
     address: Mapped[str] = mapped_column(String, nullable=False, unique=True)
     latitude: Mapped[float] = mapped_column(Float, nullable=False)
     longitude: Mapped[float] = mapped_column(Float, nullable=False)
+    geohash: Mapped[str] = mapped_column(
+        String(geohash.GEOHASH_PRECISION),
+        nullable=False,
+        index=True,
+        default=get_building_geohash,
+    )
 
     organizations = relationship(
         'Organization',
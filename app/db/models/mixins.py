@@ -11,7 +11,6 @@ class UUIDMixin:
     id: Mapped[uuid.UUID] = mapped_column(
         primary_key=True,
         default=uuid.uuid4,
-        index=True,
     )
 
 
@@ -1,22 +1,46 @@
 import uuid
 from typing import List, Optional
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.db.models import Base
 from app.db.models.mixins import UUIDMixin
 
 
-class OrganizationActivity(Base, UUIDMixin):
+class OrganizationActivity(Base):
     __tablename__ = 'organization_activity'
-    organization_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('organizations.id'))
-    activity_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('activities.id'))
+    __table_args__ = (
+        # Первичный ключ покрывает поиск по организации,
+        # этот индекс - поиск организаций по деятельности
+        Index(
+            'ix_organization_activity_activity_id_organization_id',
+            'activity_id',
+            'organization_id',
+        ),
+    )
+
+    organization_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey('organizations.id'),
+        primary_key=True,
+    )
+    activity_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey('activities.id'),
+        primary_key=True,
+    )
 
 
 class Organization(Base, UUIDMixin):
+    __table_args__ = (
+        # Сортировка и пагинация по названию
+        Index('ix_organizations_name_id', 'name', 'id'),
+    )
+
     name: Mapped[str] = mapped_column(String, nullable=False)
-    building_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('buildings.id'))
+    building_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey('buildings.id'),
+        index=True,
+    )
 
     building = relationship(
         'Building',
@@ -32,6 +56,9 @@ class Organization(Base, UUIDMixin):
 
 class Phone(Base, UUIDMixin):
     number: Mapped[str] = mapped_column(String, nullable=False)
-    organization_id: Mapped[uuid.UUID] = mapped_column(ForeignKey('organizations.id'))
+    organization_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey('organizations.id'),
+        index=True,
+    )
 
     organization = relationship('Organization', back_populates='phones')
@@ -0,0 +1,108 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+@dataclass
+class RequestRouting:
+    """
+    Маршрутизация сессий текущего запроса между основной БД и репликами
+    """
+    # Запрос только читает: его сессия может идти к реплике
+    read_only: bool = False
+    # Клиент недавно писал: чтения идут к основной БД (read-your-writes)
+    replicas_allowed: bool = True
+    # Запрос что-то записал в основную БД
+    has_writes: bool = False
+
+
+request_routing: ContextVar[Optional[RequestRouting]] = ContextVar(
+    'request_routing',
+    default=None,
+)
+
+
+# Ключ session.info со списком действий после COMMIT
+AFTER_COMMIT_KEY = 'after_commit_callbacks'
+
+
+def mark_request_write() -> None:
+    routing = request_routing.get()
+    if routing is not None:
+        routing.has_writes = True
+
+
+def is_primary_pinned() -> bool:
+    """
+    Клиент недавно писал, и чтения текущего запроса идут к основной БД.
+    Кэшам в памяти процесса такой запрос не доверяет: запись могла
+    пройти через другой процесс
+    """
+    routing = request_routing.get()
+    return routing is not None and not routing.replicas_allowed
+
+
+def add_after_commit(session: Session, callback: Callable[[], None]) -> None:
+    """
+    Выполняет callback после успешного COMMIT транзакции сессии.
+    Если транзакция откатывается или закрывается без COMMIT,
+    callback отбрасывается
+    """
+    session.info.setdefault(AFTER_COMMIT_KEY, []).append(callback)
+
+
+class WriteTrackingSession(Session):
+    """
+    Сессия основной БД, отмечающая запись в текущем запросе
+    и выполняющая действия после COMMIT (см. add_after_commit)
+    """
+
+
+class ReadRoutingSession(Session):
+    """
+    Сессия только для чтения, выбирающая БД (реплику или основную)
+    при первом запросе через select_bind. До него соединение
+    из пула не берется и транзакция не начинается
+    """
+
+    def __init__(self, *args, select_bind: Callable[[], Engine], **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._select_bind = select_bind
+        self._selected_bind: Optional[Engine] = None
+
+    def get_bind(self, mapper=None, **kwargs) -> Engine:
+        if self._selected_bind is None:
+            self._selected_bind = self._select_bind()
+
+        return self._selected_bind
+
+
+@event.listens_for(WriteTrackingSession, 'after_flush')
+def _after_flush(session, flush_context) -> None:
+    mark_request_write()
+
+
+@event.listens_for(WriteTrackingSession, 'do_orm_execute')
+def _on_execute(orm_execute_state) -> None:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        mark_request_write()
+
+
+@event.listens_for(WriteTrackingSession, 'after_commit')
+def _after_commit(session) -> None:
+    for callback in session.info.pop(AFTER_COMMIT_KEY, []):
+        callback()
+
+
+@event.listens_for(WriteTrackingSession, 'after_transaction_end')
+def _after_transaction_end(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(AFTER_COMMIT_KEY, None)
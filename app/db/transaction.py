@@ -1,6 +1,7 @@
 from functools import wraps
 
-from dependency_injector.wiring import inject, Provide
+from dependency_injector.providers import BaseResource
+from dependency_injector.wiring import inject, Provide, Provider
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -26,4 +27,39 @@ def atomic(func):
         finally:
             await session.close()
 
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+def read_only(func):
+    """
+    Обработчик только на чтение: сессии запроса открыты в транзакции
+    только для чтения (см. DataBaseManager), COMMIT не выполняется,
+    а соединения возвращаются в пул сразу после обработчика,
+    не дожидаясь отправки ответа
+    """
+    @wraps(func)
+    @inject
+    async def wrapper(
+            session_provider: BaseResource = Depends(Provider[Container.session]),
+            read_session_provider: BaseResource = Depends(
+                Provider[Container.read_session]
+            ),
+            cache_session_provider: BaseResource = Depends(
+                Provider[Container.cache_session]
+            ),
+            *args,
+            **kwargs
+    ):
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            for provider in (
+                    session_provider,
+                    read_session_provider,
+                    cache_session_provider,
+            ):
+                shutdown = provider.shutdown()
+                if shutdown is not None:
+                    await shutdown
+
+    return wrapper
@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 import loguru
 import uvicorn
 from fastapi import FastAPI
@@ -6,16 +8,61 @@ from fastapi.responses import ORJSONResponse
 from app.api.v1 import routers
 from app.core.config import settings
 from app.core.container import Container
+from app.db.middleware import SessionMiddleware
+from app.db.models import Activity, Building, Organization
+from app.repositories import (
+    RepositoryActivity,
+    RepositoryBuilding,
+    RepositoryOrganization,
+)
+
+
+@asynccontextmanager
+async def lifespan(fastapi_app: FastAPI):
+    container: Container = fastapi_app.container
+    db_manager = container.db_manager()
+    if db_manager.replica_urls:
+        loguru.logger.info(
+            f'Доступность реплик БД: {await db_manager.check_replicas()}'
+        )
+
+    async with db_manager.AsyncSessionLocal() as session:
+        building_index = container.building_index()
+        await building_index.rebuild(
+            RepositoryBuilding(model=Building, session=session)
+        )
+        loguru.logger.info(
+            f'Пространственный индекс загружен: {len(building_index)} зданий'
+        )
+        repository_organization = RepositoryOrganization(
+            model=Organization,
+            session=session,
+        )
+        await container.cluster_index().rebuild(repository_organization)
+        await container.activity_index().rebuild(repository_organization)
+        await container.activity_cache().rebuild(
+            RepositoryActivity(model=Activity, session=session)
+        )
+
+    yield
+
+    await db_manager.dispose()
 
 
 def create_app() -> FastAPI:
     fastapi_app = FastAPI(
         title=settings.project_name,
         default_response_class=ORJSONResponse,
+        lifespan=lifespan,
     )
     container = Container()
     container.wire(modules=settings.container_wiring_modules)
     fastapi_app.container = container
+    fastapi_app.add_middleware(
+        SessionMiddleware,
+        container=container,
+        read_your_writes_seconds=settings.db_read_your_writes_seconds,
+    )
 
     api_router = routers.get_api_router()
     fastapi_app.include_router(api_router, prefix=settings.api_v1_prefix)
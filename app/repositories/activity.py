@@ -1,8 +1,10 @@
 import uuid
-from typing import Type, List
+from typing import Type, List, Optional, Tuple
 
-from sqlalchemy import insert, select
+from sqlalchemy import insert, select, func, and_, literal
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.elements import ColumnElement
 
 from app.db.models import Organization, Phone
 from app.db.models.organization import OrganizationActivity
@@ -12,32 +14,99 @@ from app.db.models import Activity
 from app.repositories.base import RepositoryBase
 
 
+def get_path_prefix_condition(path, root_path) -> ColumnElement[bool]:
+    """
+    Условие, что путь path начинается с пути root_path.
+    Это диапазон по индексу материализованного пути:
+    [root_path, root_path с заменой завершающего '/' на '0')
+    """
+    return and_(
+        path >= root_path,
+        path < func.substr(root_path, 1, func.length(root_path) - 1).concat('0'),
+    )
+
+
+def get_activity_subtree_condition(
+        activity_id: uuid.UUID,
+        max_depth: Optional[int] = None,
+        activity=Activity,
+) -> ColumnElement[bool]:
+    """
+    Условие принадлежности activity поддереву деятельности activity_id
+    (включая ее саму) не глубже max_depth уровней
+    """
+    root = aliased(Activity)
+    root_path = select(root.path).where(root.id == activity_id).scalar_subquery()
+
+    conditions = [get_path_prefix_condition(activity.path, root_path)]
+    if max_depth is not None:
+        conditions.append(
+            func.length(activity.path)
+            <= func.length(root_path) + max_depth * Activity.path_segment_length
+        )
+
+    return and_(*conditions)
+
+
 class RepositoryActivity(RepositoryBase[Activity]):
     """Репозиторий модели Activity"""
 
     def __init__(self, model: Type[ModelType], session: AsyncSession):
         super().__init__(model, session)
 
-    async def get_activity_depth(self, activity_id: uuid.UUID) -> int:
-        """Рекурсивно вычисляет глубину"""
-        depth = 0
-        current_id = activity_id
-
-        while current_id:
-            statement = select(Activity).where(Activity.id == current_id)
-            result = await self._session.execute(statement)
-            activity: Activity = result.scalar_one_or_none()
+    async def get_tree_rows(self) -> List[Tuple[uuid.UUID, str, Optional[uuid.UUID], int]]:
+        """Получает все деятельности без загрузки объектов модели"""
+        statement = select(
+            Activity.id,
+            Activity.name,
+            Activity.parent_id,
+            Activity.depth,
+        )
+        result = await self._session.execute(statement)
+        return [tuple(row) for row in result.all()]
 
-            if not activity:
-                break
+    async def get_version(self) -> int:
+        """Версия дерева деятельностей: их количество (деятельности не удаляются)"""
+        statement = select(func.count()).select_from(Activity)
+        result = await self._session.execute(statement)
+        return result.scalar_one()
 
-            depth += 1
-            if not activity.parent_id:
-                break
-
-            current_id = activity.parent_id
+    async def get_activity_depth(self, activity_id: uuid.UUID) -> int:
+        """Получает сохраненную глубину деятельности"""
+        statement = select(Activity.depth).where(Activity.id == activity_id)
+        result = await self._session.execute(statement)
+        return result.scalar_one_or_none() or 0
 
-            if depth > 10:
-                break
+    async def create_child(
+            self,
+            insert_data: dict,
+            parent_id: uuid.UUID,
+            max_depth: int = Activity.max_depth,
+    ) -> Optional[Activity]:
+        """
+        Создает дочернюю деятельность одним INSERT ... SELECT из строки
+        родителя: путь и глубина берутся из нее же, а проверка глубины
+        выполняется в том же запросе.
+        Возвращает None, если родителя нет или глубина превышена
+        """
+        activity_id = insert_data['id']
+        parent = aliased(Activity)
+        select_parent = (
+            select(
+                literal(activity_id, Activity.id.type),
+                literal(insert_data['name'], Activity.name.type),
+                parent.id,
+                parent.path.concat(Activity.build_path(activity_id)),
+                parent.depth + 1,
+            )
+            .where(parent.id == parent_id, parent.depth < max_depth)
+        )
+        statement = insert(Activity).from_select(
+            ['id', 'name', 'parent_id', 'path', 'depth'],
+            select_parent,
+        )
+        result = await self._session.execute(statement)
+        if not result.rowcount:
+            return None
 
-        return depth
\ No newline at end of file
+        return await self._session.get(Activity, activity_id)
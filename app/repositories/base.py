@@ -1,5 +1,6 @@
 from uuid import UUID
 from typing import (
+    Callable,
     Generic,
     Optional,
     Type,
@@ -12,6 +13,8 @@ from sqlalchemy import select, update, delete, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.base import ExecutableOption
 
+from app.db.routing import add_after_commit
+
 ModelType = TypeVar("ModelType")
 
 
@@ -26,6 +29,13 @@ class RepositoryBase(Generic[ModelType,]):
         self.model = model
         self._session = session
 
+    def run_after_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Выполняет callback после COMMIT транзакции сессии репозитория
+        (при откате - не выполняет)
+        """
+        add_after_commit(self._session.sync_session, callback)
+
     async def create(
             self,
             insert_data: dict,
@@ -80,6 +90,29 @@ class RepositoryBase(Generic[ModelType,]):
         result = await self._session.execute(statement)
         return result.scalars().all()
 
+    async def list_after(
+            self,
+            *args,
+            limit: int,
+            after_id: Optional[UUID] = None,
+            options: List[ExecutableOption] = [],
+            **kwargs
+    ) -> List[ModelType]:
+        """Страница в порядке ID, начиная после after_id (keyset-пагинация)"""
+        statement = (
+            select(self.model)
+            .options(*options)
+            .filter(*args)
+            .filter_by(**kwargs)
+            .order_by(self.model.id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            statement = statement.filter(self.model.id > after_id)
+
+        result = await self._session.execute(statement)
+        return result.scalars().all()
+
     async def delete(self, *args, **kwargs) -> None:
         statement = delete(self.model).filter(*args).filter_by(**kwargs)
         await self._session.execute(statement)
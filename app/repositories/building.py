@@ -1,7 +1,27 @@
+import uuid
+from typing import List, Tuple
+
+from sqlalchemy import func, select
+
 from app.db.models import Building
 from app.repositories.base import RepositoryBase
 
 
 class RepositoryBuilding(RepositoryBase[Building]):
     """Репозиторий модели Building"""
-    pass
\ No newline at end of file
+
+    async def get_coordinates(self) -> List[Tuple[uuid.UUID, float, float]]:
+        """Получает ID и координаты всех зданий без загрузки моделей"""
+        statement = select(
+            Building.id,
+            Building.latitude,
+            Building.longitude,
+        )
+        result = await self._session.execute(statement)
+        return [tuple(row) for row in result.all()]
+
+    async def get_version(self) -> int:
+        """Версия зданий: их количество (здания не удаляются)"""
+        statement = select(func.count()).select_from(Building)
+        result = await self._session.execute(statement)
+        return result.scalar_one()
@@ -1,18 +1,22 @@
 import uuid
-from typing import Type, List
+from typing import Type, List, Optional, Tuple
 
-from sqlalchemy import insert, select
+from sqlalchemy import insert, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.base import ExecutableOption
 
-from app.db.models import Organization, Phone, Activity
+from app.db.models import Organization, Phone, Activity, Building
 from app.db.models.organization import OrganizationActivity
+from app.repositories.activity import get_activity_subtree_condition
 from app.repositories.base import RepositoryBase, ModelType
 
 
 class RepositoryOrganization(RepositoryBase[Organization]):
     """Репозиторий модели Organization"""
 
+    # Ограничение числа параметров в одном запросе IN
+    ids_chunk_size = 5000
+
     def __init__(self, model: Type[ModelType], session: AsyncSession):
         super().__init__(model, session)
 
@@ -21,54 +25,116 @@ class RepositoryOrganization(RepositoryBase[Organization]):
             organization_id: uuid.UUID,
             activity_ids: List[uuid.UUID],
     ):
+        # Повтор связи нарушил бы составной первичный ключ
         organization_activities_data = [
             {'organization_id': organization_id, 'activity_id': activity_id}
-            for activity_id in activity_ids
+            for activity_id in dict.fromkeys(activity_ids)
         ]
 
         statement = insert(OrganizationActivity)
         await self._session.execute(statement, organization_activities_data)
 
 
-    async def get_organizations_by_activity_id(
+    async def get_organizations_by_activity_tree(
             self,
             activity_id: uuid.UUID,
+            max_depth: int = 3,
+            limit: Optional[int] = None,
+            after_id: Optional[uuid.UUID] = None,
             options: List[ExecutableOption] = [],
             **kwargs,
-
     ) -> List[Organization]:
-        """Получает организации по ID деятельности"""
+        """
+        Получает организации деятельности и всех ее потомков одним запросом:
+        поддерево отбирается диапазоном по материализованному пути,
+        организации - через EXISTS. С limit возвращается страница
+        в порядке ID после after_id
+        """
         statement = (
             select(Organization)
             .options(*options)
-            .join(Organization.activities)
-            .where(Activity.id == activity_id)
+            .where(
+                select(OrganizationActivity.organization_id)
+                .join(
+                    Activity,
+                    OrganizationActivity.activity_id == Activity.id,
+                )
+                .where(
+                    OrganizationActivity.organization_id == Organization.id,
+                    get_activity_subtree_condition(
+                        activity_id,
+                        max_depth=max_depth,
+                    ),
+                )
+                .exists()
+            )
             .filter_by(**kwargs)
         )
+        if limit is not None:
+            statement = statement.order_by(Organization.id).limit(limit)
+        if after_id is not None:
+            statement = statement.where(Organization.id > after_id)
+
         result = await self._session.execute(statement)
-        organizations = result.scalars().all()
-        return organizations
+        return result.scalars().all()
+
+    async def get_counts_by_building(self) -> List[Tuple[float, float, int]]:
+        """Получает координаты зданий и количество организаций в них"""
+        statement = (
+            select(
+                Building.latitude,
+                Building.longitude,
+                func.count(Organization.id),
+            )
+            .join(Organization.building)
+            .group_by(Building.id, Building.latitude, Building.longitude)
+        )
+        result = await self._session.execute(statement)
+        return [tuple(row) for row in result.all()]
+
+    async def get_version(self) -> int:
+        """Версия организаций: их количество (организации не удаляются)"""
+        statement = select(func.count()).select_from(Organization)
+        result = await self._session.execute(statement)
+        return result.scalar_one()
+
+    async def get_activity_links(self) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        """Получает все пары (организация, деятельность)"""
+        statement = select(
+            OrganizationActivity.organization_id,
+            OrganizationActivity.activity_id,
+        )
+        result = await self._session.execute(statement)
+        return [tuple(row) for row in result.all()]
 
+    async def get_activity_links_count(self) -> int:
+        statement = select(func.count()).select_from(OrganizationActivity)
+        result = await self._session.execute(statement)
+        return result.scalar_one()
 
-    async def get_organizations_by_activity_ids(
+    async def get_by_ids(
             self,
-            activity_ids: List[uuid.UUID],
+            organization_ids: List[uuid.UUID],
             options: List[ExecutableOption] = [],
             **kwargs,
-
     ) -> List[Organization]:
-        """Получает организации по ID деятельности"""
-        statement = (
-            select(Organization)
-            .options(*options)
-            .join(Organization.activities)
-            .where(Activity.id.in_(activity_ids))
-            .filter_by(**kwargs)
-        )
-        result = await self._session.execute(statement)
-        organizations = result.scalars().all()
-        return organizations
+        """Получает организации по списку ID запросами по ids_chunk_size"""
+        organizations = []
+        for start in range(0, len(organization_ids), self.ids_chunk_size):
+            statement = (
+                select(Organization)
+                .options(*options)
+                .where(
+                    Organization.id.in_(
+                        organization_ids[start:start + self.ids_chunk_size]
+                    )
+                )
+                .filter_by(**kwargs)
+            )
+            result = await self._session.execute(statement)
+            organizations.extend(result.scalars().all())
 
+        return organizations
 
 
 class RepositoryPhone(RepositoryBase[Phone]):
@@ -28,4 +28,6 @@ class ActivityChildrenSchema(ActivityBaseSchema, UUIDSchemaMixin):
         from_attributes = True
 
 
-
+class ActivityFacetSchema(ActivityBaseSchema, UUIDSchemaMixin):
+    parent_id: Optional[uuid.UUID]
+    count: int
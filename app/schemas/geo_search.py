@@ -1,5 +1,10 @@
-from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional
+import uuid
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Literal, Optional, Tuple, Union
+
+from app.core.config import settings
+from app.schemas.pagination import PaginationParams
 
 class RadiusSearch(BaseModel):
     """Схема для поиска в радиусе"""
@@ -29,6 +34,45 @@ class RadiusSearch(BaseModel):
             raise ValueError('Максимальный радиус поиска - 100 км')
         return v
 
+
+class RadiusSortedSearch(RadiusSearch):
+    """Схема для поиска ближайших организаций в радиусе"""
+    limit: int = Field(
+        default=20,
+        ge=1,
+        le=1000,
+        description="Максимальное количество организаций в ответе",
+        examples=[20]
+    )
+
+
+class NearestSearch(BaseModel):
+    """Схема для поиска k ближайших организаций"""
+    latitude: float = Field(
+        ge=-90,
+        le=90,
+        description="Широта точки поиска",
+        examples=[55.7520]
+    )
+    longitude: float = Field(
+        ge=-180,
+        le=180,
+        description="Долгота точки поиска",
+        examples=[37.6175]
+    )
+    k: int = Field(
+        default=10,
+        ge=1,
+        le=100,
+        description="Количество ближайших организаций",
+        examples=[10]
+    )
+    activity_id: Optional[uuid.UUID] = Field(
+        default=None,
+        description="ID деятельности для фильтрации организаций",
+    )
+
+
 class RectangleSearch(BaseModel):
     """Схема для поиска в прямоугольной области"""
     min_lat: float = Field(
@@ -68,4 +112,172 @@ class RectangleSearch(BaseModel):
     def validate_lon_bounds(cls, v, info):
         if 'min_lon' in info.data and info.data['min_lon'] >= v:
             raise ValueError("min_lon должен быть меньше max_lon")
-        return v
\ No newline at end of file
+        return v
+
+
+class BatchSearch(BaseModel):
+    """
+    Схема для поиска сразу в нескольких областях.
+    По каждой области возвращается страница из не более limit организаций
+    """
+    items: List[Union[RadiusSearch, RectangleSearch]] = Field(
+        min_length=1,
+        max_length=500,
+        description="Области поиска: радиусы и прямоугольники",
+    )
+    limit: int = Field(
+        default=settings.page_size_default,
+        ge=1,
+        le=settings.page_size_max,
+        description="Размер страницы каждой области",
+    )
+    cursors: Optional[List[Optional[str]]] = Field(
+        default=None,
+        description=(
+            "Курсоры следующих страниц областей из предыдущего ответа "
+            "в порядке областей"
+        ),
+    )
+
+    @model_validator(mode='after')
+    def validate_cursors(self):
+        if self.cursors is not None and len(self.cursors) != len(self.items):
+            raise ValueError("Количество cursors должно совпадать с количеством items")
+        return self
+
+    def get_pagination(self) -> List[PaginationParams]:
+        """Параметры пагинации каждой области"""
+        cursors = self.cursors or [None] * len(self.items)
+        return [
+            PaginationParams(limit=self.limit, cursor=cursor)
+            for cursor in cursors
+        ]
+
+
+class PolygonSearch(BaseModel):
+    """
+    Схема для поиска в многоугольнике в формате GeoJSON Polygon:
+    первое кольцо - внешняя граница, остальные - отверстия.
+    Точки задаются парами [долгота, широта]
+    """
+    type: Literal['Polygon'] = 'Polygon'
+    coordinates: List[List[Tuple[float, float]]] = Field(
+        min_length=1,
+        description="Кольца многоугольника из пар [долгота, широта]",
+        examples=[[[
+            [37.60, 55.74],
+            [37.64, 55.74],
+            [37.64, 55.76],
+            [37.60, 55.76],
+            [37.60, 55.74],
+        ]]]
+    )
+
+    @field_validator('coordinates')
+    @classmethod
+    def validate_rings(cls, v):
+        for ring in v:
+            if len(ring) < 4:
+                raise ValueError("Кольцо многоугольника должно содержать минимум 4 точки")
+            if ring[0] != ring[-1]:
+                raise ValueError("Кольцо многоугольника должно быть замкнуто")
+            for longitude, latitude in ring:
+                if not (-180 <= longitude <= 180 and -90 <= latitude <= 90):
+                    raise ValueError("Координаты многоугольника вне допустимого диапазона")
+        return v
+
+
+class CorridorSearch(BaseModel):
+    """
+    Схема для поиска вдоль маршрута: ломаная из пар [долгота, широта]
+    и ширина буфера вокруг нее
+    """
+    coordinates: List[Tuple[float, float]] = Field(
+        min_length=2,
+        max_length=1000,
+        description="Точки маршрута в виде пар [долгота, широта]",
+        examples=[[[37.58, 55.74], [37.62, 55.75], [37.66, 55.78]]]
+    )
+    buffer_km: float = Field(
+        gt=0,
+        le=50,
+        description="Максимальное расстояние от маршрута в километрах",
+        examples=[0.5]
+    )
+
+    @field_validator('coordinates')
+    @classmethod
+    def validate_coordinates(cls, v):
+        for longitude, latitude in v:
+            if not (-180 <= longitude <= 180 and -90 <= latitude <= 90):
+                raise ValueError("Координаты маршрута вне допустимого диапазона")
+        return v
+
+
+class AreaFilter(BaseModel):
+    """Фильтр по области (радиус или прямоугольник) и зданию"""
+    radius: Optional[RadiusSearch] = Field(
+        default=None,
+        description="Область поиска в радиусе от точки",
+    )
+    rectangle: Optional[RectangleSearch] = Field(
+        default=None,
+        description="Прямоугольная область поиска",
+    )
+    building_id: Optional[uuid.UUID] = Field(
+        default=None,
+        description="ID здания",
+    )
+
+    @model_validator(mode='after')
+    def validate_area(self):
+        if self.radius is not None and self.rectangle is not None:
+            raise ValueError("Укажите либо radius, либо rectangle")
+        return self
+
+
+class OrganizationSearch(AreaFilter):
+    """
+    Схема для поиска организаций по любому сочетанию фильтров:
+    деятельность (с поддеревом), радиус или прямоугольник,
+    здание и начало названия
+    """
+    activity_id: Optional[uuid.UUID] = Field(
+        default=None,
+        description="ID деятельности",
+    )
+    include_subtree: bool = Field(
+        default=True,
+        description="Учитывать вложенные деятельности",
+    )
+    name_prefix: Optional[str] = Field(
+        default=None,
+        min_length=1,
+        max_length=255,
+        description="Начало названия организации",
+        examples=["Рога"]
+    )
+
+
+class ActivityFacetSearch(AreaFilter):
+    """
+    Схема для подсчета организаций по деятельностям
+    в области и/или здании
+    """
+
+
+class ClusterSearch(RectangleSearch):
+    """Схема для кластеризации организаций в видимой области карты"""
+    zoom: int = Field(
+        ge=0,
+        le=settings.cluster_max_zoom,
+        description="Масштаб карты",
+        examples=[12]
+    )
+
+
+class OrganizationClusterSchema(BaseModel):
+    """Кластер организаций в ячейке сетки"""
+    latitude: float = Field(description="Широта центра масс организаций")
+    longitude: float = Field(description="Долгота центра масс организаций")
+    count: int = Field(description="Количество организаций в ячейке")
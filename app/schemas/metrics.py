@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class DataBasePoolSchema(BaseModel):
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
@@ -48,6 +48,14 @@ class OrganizationShortSchema(OrganizationBaseSchema, UUIDSchemaMixin):
         from_attributes = True
 
 
+class OrganizationDistanceSchema(OrganizationShortSchema):
+    distance_km: float
+
+
+class OrganizationSearchItemSchema(OrganizationShortSchema):
+    distance_km: Optional[float] = None
+
+
 class BuildingWithOrganizationsSchema(BuildingSchema):
     organizations: List[OrganizationShortSchema] = []
 
@@ -0,0 +1,27 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+ItemType = TypeVar('ItemType')
+
+
+class PaginationParams(BaseModel):
+    """Параметры курсорной пагинации"""
+    limit: int = Field(
+        default=settings.page_size_default,
+        ge=1,
+        le=settings.page_size_max,
+        description="Размер страницы",
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="Курсор следующей страницы из предыдущего ответа",
+    )
+
+
+class PageSchema(BaseModel, Generic[ItemType]):
+    """Страница списка и курсор следующей страницы"""
+    items: List[ItemType] = []
+    next_cursor: Optional[str] = None
@@ -0,0 +1,107 @@
+import types
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel
+
+Serializer = Callable[[Any], Dict[str, Any]]
+
+_serializers: Dict[Tuple[Type[BaseModel], Tuple[str, ...]], Serializer] = {}
+
+
+def get_serializer(
+        schema_class: Type[BaseModel],
+        exclude_fields: Sequence[str] = (),
+) -> Serializer:
+    """
+    Сериализатор объектов в словарь по полям схемы, скомпилированный
+    один раз на схему: читает только объявленные поля атрибутами объекта,
+    вложенные схемы и списки схем сериализует так же, без копирования
+    и без валидации. Связи ORM-объектов должны быть загружены заранее
+    """
+    key = (schema_class, tuple(exclude_fields))
+    serializer = _serializers.get(key)
+    if serializer is not None:
+        return serializer
+
+    fields: List[Tuple[str, Optional[Callable[[Any], Any]]]] = []
+
+    def serialize(obj: Any) -> Dict[str, Any]:
+        data = {}
+        for name, convert in fields:
+            value = getattr(obj, name)
+            data[name] = (
+                value if convert is None or value is None else convert(value)
+            )
+
+        return data
+
+    # Сериализатор регистрируется до разбора полей: схема может ссылаться на себя
+    _serializers[key] = serialize
+    fields.extend(
+        (name, _get_converter(field.annotation))
+        for name, field in schema_class.model_fields.items()
+        if name not in key[1]
+    )
+
+    return serialize
+
+
+def serialize_many(
+        schema_class: Type[BaseModel],
+        objects: Sequence[Any],
+) -> List[Dict[str, Any]]:
+    serializer = get_serializer(schema_class)
+    return [serializer(obj) for obj in objects]
+
+
+def serialize_page(
+        schema_class: Type[BaseModel],
+        objects: Sequence[Any],
+        next_cursor: Optional[str],
+) -> Dict[str, Any]:
+    """Страница в формате PageSchema"""
+    return {
+        'items': serialize_many(schema_class, objects),
+        'next_cursor': next_cursor,
+    }
+
+
+def _get_converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """
+    Преобразование значения поля с аннотацией annotation:
+    None - значение передается как есть
+    """
+    origin = get_origin(annotation)
+
+    if origin in (Union, types.UnionType):
+        converters = [
+            _get_converter(arg)
+            for arg in get_args(annotation)
+            if arg is not type(None)
+        ]
+        return converters[0] if len(converters) == 1 else None
+
+    if origin in (list, tuple, set, frozenset):
+        args = get_args(annotation)
+        item_converter = _get_converter(args[0]) if args else None
+        if item_converter is None:
+            return None
+
+        return lambda values: [item_converter(value) for value in values]
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return get_serializer(annotation)
+
+    return None
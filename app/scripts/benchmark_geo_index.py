@@ -0,0 +1,132 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from math import cos, radians
+
+import loguru
+from sqlalchemy import insert, select
+
+from app.db.manager import DataBaseManager
+from app.db.models import Base, Building
+from app.services.geo_search import GeoService
+from app.services.spatial_index import BuildingGridIndex
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+QUERIES_COUNT = 200
+INSERT_BATCH_SIZE = 50_000
+
+# Область вокруг Москвы
+MIN_LAT, MAX_LAT = 55.50, 56.00
+MIN_LON, MAX_LON = 37.30, 37.90
+
+
+def get_bbox(latitude: float, longitude: float, radius_km: float):
+    lat_offset = radius_km / 111.0
+    lon_offset = radius_km / (111.0 * cos(radians(latitude)))
+
+    return (
+        latitude - lat_offset,
+        latitude + lat_offset,
+        longitude - lon_offset,
+        longitude + lon_offset,
+    )
+
+
+async def benchmark(size: int) -> None:
+    """
+    Сравнивает SQL-фильтр по области из GeoService
+    с поиском по BuildingGridIndex на size зданиях
+    """
+    db_path = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+    db_manager = DataBaseManager(db_url=f'sqlite+aiosqlite:///{db_path}')
+
+    async with db_manager.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    points = [
+        (
+            uuid.uuid4(),
+            random.uniform(MIN_LAT, MAX_LAT),
+            random.uniform(MIN_LON, MAX_LON),
+        )
+        for _ in range(size)
+    ]
+    async with db_manager.engine.begin() as conn:
+        for start in range(0, size, INSERT_BATCH_SIZE):
+            await conn.execute(
+                insert(Building),
+                [
+                    {
+                        'id': building_id,
+                        'address': str(building_id),
+                        'latitude': latitude,
+                        'longitude': longitude,
+                    }
+                    for building_id, latitude, longitude
+                    in points[start:start + INSERT_BATCH_SIZE]
+                ]
+            )
+
+    searches = [
+        get_bbox(
+            random.uniform(MIN_LAT, MAX_LAT),
+            random.uniform(MIN_LON, MAX_LON),
+            random.uniform(0.5, 5.0),
+        )
+        for _ in range(QUERIES_COUNT)
+    ]
+
+    sql_found = 0
+    async with db_manager.AsyncSessionLocal() as session:
+        started_at = time.perf_counter()
+        for min_lat, max_lat, min_lon, max_lon in searches:
+            statement = select(Building.id).where(
+                *GeoService._get_area_conditions(
+                    min_lat, max_lat, min_lon, max_lon
+                )
+            )
+            result = await session.execute(statement)
+            sql_found += len(result.all())
+        sql_elapsed = time.perf_counter() - started_at
+
+    building_index = BuildingGridIndex()
+    started_at = time.perf_counter()
+    building_index.load(points)
+    load_elapsed = time.perf_counter() - started_at
+
+    index_found = 0
+    started_at = time.perf_counter()
+    for min_lat, max_lat, min_lon, max_lon in searches:
+        index_found += len(
+            building_index.search_in_rectangle(
+                min_lat, max_lat, min_lon, max_lon
+            ).ids
+        )
+    index_elapsed = time.perf_counter() - started_at
+
+    assert sql_found == index_found, (sql_found, index_found)
+
+    loguru.logger.info(
+        f'{size} зданий: '
+        f'SQL {sql_elapsed / QUERIES_COUNT * 1000:.3f} мс/запрос, '
+        f'индекс {index_elapsed / QUERIES_COUNT * 1000:.3f} мс/запрос, '
+        f'построение индекса {load_elapsed:.2f} с, '
+        f'в среднем найдено {sql_found / QUERIES_COUNT:.0f} зданий'
+    )
+
+    await db_manager.dispose()
+    os.remove(db_path)
+
+
+async def main(sizes) -> None:
+    for size in sizes:
+        await benchmark(size)
+
+
+if __name__ == '__main__':
+    sizes = [int(size) for size in sys.argv[1:]] or DEFAULT_SIZES
+    asyncio.run(main(sizes))
@@ -0,0 +1,304 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+import loguru
+import sqlalchemy as sa
+
+from app.db import geohash
+from app.db.manager import DataBaseManager
+
+DEFAULT_ORGANIZATIONS_COUNT = 100_000
+QUERIES_COUNT = 200
+# Ограничение времени на запросы одного вида (без индексов они медленные)
+QUERIES_TIME_LIMIT_SECONDS = 10.0
+INSERT_BATCH_SIZE = 20_000
+
+# Ревизии до и после пересмотра индексов
+REVISION_BEFORE = '5b2f0c7a14d3'
+REVISION_AFTER = 'c81f4e2a9d06'
+
+# Область вокруг Москвы
+MIN_LAT, MAX_LAT = 55.50, 56.00
+MIN_LON, MAX_LON = 37.30, 37.90
+
+activities = sa.table(
+    'activities',
+    sa.column('id', sa.Uuid()),
+    sa.column('name', sa.String()),
+    sa.column('parent_id', sa.Uuid()),
+    sa.column('path', sa.String()),
+    sa.column('depth', sa.Integer()),
+)
+buildings = sa.table(
+    'buildings',
+    sa.column('id', sa.Uuid()),
+    sa.column('address', sa.String()),
+    sa.column('latitude', sa.Float()),
+    sa.column('longitude', sa.Float()),
+    sa.column('geohash', sa.String()),
+)
+organizations = sa.table(
+    'organizations',
+    sa.column('id', sa.Uuid()),
+    sa.column('name', sa.String()),
+    sa.column('building_id', sa.Uuid()),
+)
+organization_activity = sa.table(
+    'organization_activity',
+    sa.column('organization_id', sa.Uuid()),
+    sa.column('activity_id', sa.Uuid()),
+)
+phones = sa.table(
+    'phones',
+    sa.column('id', sa.Uuid()),
+    sa.column('number', sa.String()),
+    sa.column('organization_id', sa.Uuid()),
+)
+
+
+def migrate(db_url: str, revision: str) -> None:
+    """Применяет миграции alembic к базе db_url до ревизии revision"""
+    subprocess.run(
+        ['alembic', 'upgrade', revision],
+        env={**os.environ, 'USE_SQLITE': '1', 'SQLITE_DEFAULT_URL': db_url},
+        check=True,
+        capture_output=True,
+    )
+
+
+def generate_data(organizations_count: int) -> Dict[str, List[dict]]:
+    """
+    Синтетические данные: по 10 детей на каждом из трех уровней
+    деятельностей, по 10 организаций на здание, 1-3 деятельности
+    и 1-2 телефона на организацию
+    """
+    data = {'activities': [], 'buildings': [], 'organizations': [],
+            'organization_activity': [], 'phones': []}
+
+    parents = [None]
+    for depth in range(1, 4):
+        level = []
+        for parent in parents:
+            for number in range(10):
+                activity_id = uuid.uuid4()
+                activity = {
+                    'id': activity_id,
+                    'name': f'activity {depth}.{number}',
+                    'parent_id': parent['id'] if parent else None,
+                    'path': f'{parent["path"] if parent else ""}{activity_id.hex}/',
+                    'depth': depth,
+                }
+                level.append(activity)
+        data['activities'].extend(level)
+        parents = level
+
+    for number in range(max(organizations_count // 10, 1)):
+        latitude = random.uniform(MIN_LAT, MAX_LAT)
+        longitude = random.uniform(MIN_LON, MAX_LON)
+        data['buildings'].append({
+            'id': uuid.uuid4(),
+            'address': f'address {number}',
+            'latitude': latitude,
+            'longitude': longitude,
+            'geohash': geohash.encode(latitude, longitude),
+        })
+
+    activity_ids = [activity['id'] for activity in data['activities']]
+    for number in range(organizations_count):
+        organization_id = uuid.uuid4()
+        data['organizations'].append({
+            'id': organization_id,
+            'name': f'organization {random.randrange(organizations_count)} {number}',
+            'building_id': random.choice(data['buildings'])['id'],
+        })
+        for activity_id in random.sample(activity_ids, random.randint(1, 3)):
+            data['organization_activity'].append({
+                'organization_id': organization_id,
+                'activity_id': activity_id,
+            })
+        for _ in range(random.randint(1, 2)):
+            data['phones'].append({
+                'id': uuid.uuid4(),
+                'number': str(random.randrange(10 ** 10)),
+                'organization_id': organization_id,
+            })
+
+    return data
+
+
+async def load_data(
+        db_manager: DataBaseManager,
+        data: Dict[str, List[dict]],
+        with_link_ids: bool,
+) -> None:
+    links = data['organization_activity']
+    links_table = organization_activity
+    if with_link_ids:
+        # До миграции у связей есть суррогатный ключ
+        links = [{**link, 'id': uuid.uuid4()} for link in links]
+        links_table = sa.table(
+            'organization_activity',
+            sa.column('organization_id', sa.Uuid()),
+            sa.column('activity_id', sa.Uuid()),
+            sa.column('id', sa.Uuid()),
+        )
+
+    async with db_manager.engine.begin() as conn:
+        for table, rows in (
+                (activities, data['activities']),
+                (buildings, data['buildings']),
+                (organizations, data['organizations']),
+                (links_table, links),
+                (phones, data['phones']),
+        ):
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                await conn.execute(
+                    sa.insert(table),
+                    rows[start:start + INSERT_BATCH_SIZE],
+                )
+        await conn.exec_driver_sql('ANALYZE')
+
+
+def get_queries(data: Dict[str, List[dict]]) -> Dict[str, List[sa.Select]]:
+    """Запросы, которые выполняют репозитории, со случайными параметрами"""
+    queries = {
+        'организации здания': [],
+        'организации деятельности': [],
+        'телефоны организаций': [],
+        'дочерние деятельности': [],
+        'здания в прямоугольнике': [],
+        'страница по названию': [],
+    }
+    for _ in range(QUERIES_COUNT):
+        queries['организации здания'].append(
+            sa.select(organizations.c.id).where(
+                organizations.c.building_id
+                == random.choice(data['buildings'])['id']
+            )
+        )
+        queries['организации деятельности'].append(
+            sa.select(organizations.c.id)
+            .join(
+                organization_activity,
+                organization_activity.c.organization_id == organizations.c.id,
+            )
+            .where(
+                organization_activity.c.activity_id
+                == random.choice(data['activities'])['id']
+            )
+        )
+        queries['телефоны организаций'].append(
+            sa.select(phones.c.number).where(
+                phones.c.organization_id.in_([
+                    organization['id']
+                    for organization in random.sample(data['organizations'], 50)
+                ])
+            )
+        )
+        queries['дочерние деятельности'].append(
+            sa.select(activities.c.id).where(
+                activities.c.parent_id == random.choice(data['activities'])['id']
+            )
+        )
+        latitude = random.uniform(MIN_LAT, MAX_LAT)
+        longitude = random.uniform(MIN_LON, MAX_LON)
+        queries['здания в прямоугольнике'].append(
+            sa.select(buildings.c.id).where(
+                buildings.c.latitude.between(latitude, latitude + 0.01),
+                buildings.c.longitude.between(longitude, longitude + 0.02),
+            )
+        )
+        queries['страница по названию'].append(
+            sa.select(organizations.c.id, organizations.c.name)
+            .where(
+                organizations.c.name
+                > random.choice(data['organizations'])['name']
+            )
+            .order_by(organizations.c.name, organizations.c.id)
+            .limit(50)
+        )
+
+    return queries
+
+
+async def measure(
+        db_manager: DataBaseManager,
+        queries: Dict[str, List[sa.Select]],
+) -> Dict[str, Tuple[float, str]]:
+    """Среднее время запроса в мс и план первого запроса каждого вида"""
+    results = {}
+    async with db_manager.engine.connect() as conn:
+        for name, statements in queries.items():
+            compiled = statements[0].compile(
+                dialect=conn.dialect,
+                compile_kwargs={'literal_binds': True},
+            )
+            plan = await conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}')
+            plan = '; '.join(row[-1] for row in plan.all())
+
+            executed = 0
+            started_at = time.perf_counter()
+            for statement in statements:
+                await conn.execute(statement)
+                executed += 1
+                if time.perf_counter() - started_at > QUERIES_TIME_LIMIT_SECONDS:
+                    break
+            elapsed = time.perf_counter() - started_at
+
+            results[name] = (elapsed / executed * 1000, plan)
+
+    return results
+
+
+async def benchmark(organizations_count: int) -> None:
+    """
+    Сравнивает запросы репозиториев до и после миграции индексов
+    на синтетической базе из organizations_count организаций
+    """
+    db_path = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+    db_url = f'sqlite+aiosqlite:///{db_path}'
+    migrate(db_url, REVISION_BEFORE)
+
+    data = generate_data(organizations_count)
+    db_manager = DataBaseManager(db_url=db_url)
+    await load_data(db_manager, data, with_link_ids=True)
+    queries = get_queries(data)
+    before = await measure(db_manager, queries)
+    await db_manager.dispose()
+
+    started_at = time.perf_counter()
+    migrate(db_url, REVISION_AFTER)
+    loguru.logger.info(
+        f'Миграция индексов: {time.perf_counter() - started_at:.1f} с'
+    )
+
+    db_manager = DataBaseManager(db_url=db_url)
+    async with db_manager.engine.begin() as conn:
+        await conn.exec_driver_sql('ANALYZE')
+    after = await measure(db_manager, queries)
+    await db_manager.dispose()
+
+    for name in queries:
+        before_ms, before_plan = before[name]
+        after_ms, after_plan = after[name]
+        loguru.logger.info(
+            f'{name}: {before_ms:.3f} -> {after_ms:.3f} мс/запрос\n'
+            f'    до:    {before_plan}\n'
+            f'    после: {after_plan}'
+        )
+
+    os.remove(db_path)
+
+
+if __name__ == '__main__':
+    organizations_count = (
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ORGANIZATIONS_COUNT
+    )
+    asyncio.run(benchmark(organizations_count))
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from typing import Callable
+
+import loguru
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.db.manager import DataBaseManager
+from app.db.models import Activity, Base, Building, Organization, Phone
+from app.schemas.organization import OrganizationSchema, OrganizationShortSchema
+from app.schemas.pagination import PageSchema
+from app.schemas.serializer import get_serializer, serialize_page
+
+DEFAULT_ITERATIONS = 2000
+PAGE_SIZE = 500
+ACTIVITIES_COUNT = 5
+PHONES_COUNT = 3
+
+
+def measure(iterations: int, func: Callable[[], bytes]) -> float:
+    """Среднее время вызова func в мкс"""
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        func()
+
+    return (time.perf_counter() - started_at) / iterations * 1_000_000
+
+
+async def load_objects(db_manager: DataBaseManager) -> tuple:
+    """Организация со связями, как в get_organization, и страница организаций"""
+    async with db_manager.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with db_manager.AsyncSessionLocal() as session:
+        building = Building(
+            id=uuid.uuid4(),
+            address='address',
+            latitude=55.75,
+            longitude=37.62,
+        )
+        session.add(building)
+        activities = []
+        for number in range(ACTIVITIES_COUNT):
+            activity_id = uuid.uuid4()
+            activities.append(Activity(
+                id=activity_id,
+                name=f'activity {number}',
+                path=Activity.build_path(activity_id),
+                depth=1,
+            ))
+        session.add_all(activities)
+
+        organization_ids = [uuid.uuid4() for _ in range(PAGE_SIZE)]
+        for number, organization_id in enumerate(organization_ids):
+            session.add(Organization(
+                id=organization_id,
+                name=f'organization {number}',
+                building=building,
+                activities=activities if number == 0 else [],
+                phones=[
+                    Phone(id=uuid.uuid4(), number=f'+7-900-000-00-0{phone}')
+                    for phone in range(PHONES_COUNT if number == 0 else 0)
+                ],
+            ))
+        await session.commit()
+
+    async with db_manager.AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Organization)
+            .where(Organization.id == organization_ids[0])
+            .options(
+                joinedload(Organization.building),
+                selectinload(Organization.activities),
+                selectinload(Organization.phones),
+            )
+        )
+        organization = result.scalars().one()
+        result = await session.execute(
+            select(Organization).order_by(Organization.id)
+        )
+        organizations = list(result.scalars().all())
+
+    return organization, organizations
+
+
+async def benchmark(iterations: int) -> None:
+    """
+    Сравнивает путь ответа через Base.serialize (глубокая копия
+    __dict__, сборка схемы и повторная валидация FastAPI по модели
+    ответа) со скомпилированным сериализатором схемы и передачей
+    словаря сразу в orjson
+    """
+    db_path = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')
+    db_manager = DataBaseManager(db_url=f'sqlite+aiosqlite:///{db_path}')
+    organization, organizations = await load_objects(db_manager)
+
+    # FastAPI валидирует возвращенный объект моделью ответа
+    # и сериализует ее в JSON-совместимые данные
+    organization_adapter = TypeAdapter(OrganizationSchema)
+    page_adapter = TypeAdapter(PageSchema[OrganizationShortSchema])
+
+    def organization_before() -> bytes:
+        schema = organization.serialize(
+            OrganizationSchema,
+            exclude_fields=('phones', ),
+        )
+        schema.phones = [phone.number for phone in organization.phones]
+        validated = organization_adapter.validate_python(
+            schema,
+            from_attributes=True,
+        )
+        return orjson.dumps(organization_adapter.dump_python(validated, mode='json'))
+
+    def organization_after() -> bytes:
+        data = get_serializer(
+            OrganizationSchema,
+            exclude_fields=('phones', ),
+        )(organization)
+        data['phones'] = [phone.number for phone in organization.phones]
+        return orjson.dumps(data)
+
+    def page_before() -> bytes:
+        page = PageSchema(items=organizations, next_cursor=None)
+        validated = page_adapter.validate_python(page, from_attributes=True)
+        return orjson.dumps(page_adapter.dump_python(validated, mode='json'))
+
+    def page_after() -> bytes:
+        return orjson.dumps(
+            serialize_page(OrganizationShortSchema, organizations, None)
+        )
+
+    for name, before, after, count in (
+            ('организация со связями', organization_before, organization_after, iterations),
+            (f'страница из {PAGE_SIZE} организаций', page_before, page_after, max(iterations // 50, 1)),
+    ):
+        assert orjson.loads(before()) == orjson.loads(after()), name
+        before_us = measure(count, before)
+        after_us = measure(count, after)
+        loguru.logger.info(
+            f'{name}: {before_us:.1f} -> {after_us:.1f} мкс/ответ '
+            f'(в {before_us / after_us:.1f} раза быстрее)'
+        )
+
+    await db_manager.dispose()
+    os.remove(db_path)
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ITERATIONS
+    asyncio.run(benchmark(iterations))
@@ -9,7 +9,6 @@ from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.container import Container
-from app.db.manager import db_manager
 from app.db.models import Building, Activity, Organization, Phone
 
 
@@ -17,6 +16,7 @@ async def seed_from_json():
     """
     Заполняет базу данных из JSON
     """
+    db_manager = Container.db_manager()
     async with db_manager.AsyncSessionLocal() as session:
         session = session
 
@@ -38,10 +38,16 @@ async def seed_from_json():
         # 4. Создаем активности
         activities_map = {}
         for activity_data in db_data["activities"]:
+            parent = activities_map.get(activity_data["parent_id"])
             activity = Activity(
                 id=activity_data["id"],
                 name=activity_data["name"],
-                parent_id=activity_data["parent_id"]
+                parent_id=activity_data["parent_id"],
+                path=Activity.build_path(
+                    uuid.UUID(activity_data["id"]),
+                    parent.path if parent else None,
+                ),
+                depth=parent.depth + 1 if parent else 1,
             )
             session.add(activity)
             activities_map[activity_data["id"]] = activity
@@ -1,60 +1,143 @@
 import uuid
+from functools import partial
+from typing import List, Optional
 
 from fastapi import HTTPException
-from sqlalchemy.orm import selectinload
 from starlette import status
 
 from .base import CRUDBaseService
 from app.repositories import RepositoryActivity
+from ..db.routing import is_primary_pinned
 from ..db.models import Activity
 from ..repositories.base import ModelType
-from ..schemas.activity import ActivityCreateSchema
+from ..schemas.activity import ActivityCreateSchema, ActivityChildrenSchema
+from .activity_cache import ActivityTreeCache, CachedActivity
 
 
 class ActivityService(CRUDBaseService[RepositoryActivity]):
     """Сервис для RepositoryActivity"""
 
+    def __init__(
+            self,
+            repository: RepositoryActivity,
+            cache_repository: RepositoryActivity,
+            activity_cache: ActivityTreeCache,
+    ):
+        super().__init__(repository)
+        # Кэш сверяется с основной БД, а не с репликой
+        self._cache_repository = cache_repository
+        self._activity_cache = activity_cache
+
     async def create(self, obj_in: ActivityCreateSchema) -> ModelType:
+        insert_data = await self.validate_object_insertion(obj_in)
+        activity_id = uuid.uuid4()
+        insert_data['id'] = activity_id
 
         if not obj_in.parent_id:
-            return await super().create(obj_in)
+            insert_data['path'] = Activity.build_path(activity_id)
+            insert_data['depth'] = 1
+            activity = await self._repository.create(insert_data=insert_data)
+        else:
+            activity = await self._create_child(obj_in, insert_data)
+
+        # Кэш дополняется только после COMMIT создания
+        self._repository.run_after_commit(
+            partial(
+                self._activity_cache.add,
+                CachedActivity(
+                    activity.id,
+                    activity.name,
+                    activity.parent_id,
+                    activity.depth,
+                ),
+            )
+        )
+        return activity
+
+    async def _create_child(
+            self,
+            obj_in: ActivityCreateSchema,
+            insert_data: dict,
+    ) -> Activity:
+        parent = self._activity_cache.get(obj_in.parent_id)
+        if parent is not None and parent.depth >= Activity.max_depth:
+            self._raise_max_depth_exceeded()
 
-        depth = await self._repository.get_activity_depth(
-            activity_id=obj_in.parent_id
+        activity = await self._repository.create_child(
+            insert_data=insert_data,
+            parent_id=obj_in.parent_id,
         )
-        if depth == 3:
+        if activity is not None:
+            return activity
+
+        if not await self._repository.get_activity_depth(obj_in.parent_id):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f'Max depth exceeded',
+                detail=f'Activity with id {obj_in.parent_id} do not exist',
             )
-        return await super().create(obj_in)
 
-    async def get_activity_tree(
-            self,
-            activity_id: uuid.UUID,
-            max_depth: int = 3,
-            current_depth: int = 0
-    ):
+        self._raise_max_depth_exceeded()
 
-        if current_depth > max_depth:
-            return []
+    @staticmethod
+    def _raise_max_depth_exceeded():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Max depth exceeded',
+        )
 
-        activity = await self._repository.get(
-            id=activity_id,
-            options=[selectinload(Activity.children)]
+    async def _refresh_cache(self) -> None:
+        """
+        Сверяет кэш с БД. Сразу после записи клиента версия сверяется
+        без ожидания интервала: деятельность могла быть создана
+        в другом процессе
+        """
+        await self._activity_cache.refresh(
+            self._cache_repository,
+            force=is_primary_pinned(),
         )
 
-        if not activity:
-            return []
+    async def get_tree_version(self) -> int:
+        """Версия дерева деятельностей для ETag"""
+        await self._refresh_cache()
+        return self._activity_cache.version
 
-        child_activities = []
-        for child in activity.children:
-            child_activities.extend(
-            await self.get_activity_tree(
-                activity_id=child.id,
-                max_depth=max_depth,
-                current_depth=current_depth + 1
-            )
+    async def get_tree(self) -> List[ActivityChildrenSchema]:
+        """
+        Вложенное дерево деятельностей, собранное в памяти из кэша,
+        загруженного одним плоским запросом
+        """
+        await self._refresh_cache()
+        return self._build_tree(None)
+
+    async def get_subtree(self, activity_id: uuid.UUID) -> ActivityChildrenSchema:
+        """Вложенное поддерево деятельности activity_id"""
+        await self._refresh_cache()
+        if activity_id not in self._activity_cache:
+            if not await self._cache_repository.get_activity_depth(activity_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+            # Деятельность создана в другом процессе
+            await self._activity_cache.rebuild(self._cache_repository)
+
+        activity = self._activity_cache.get(activity_id)
+
+        return ActivityChildrenSchema(
+            id=activity.id,
+            name=activity.name,
+            parent_id=activity.parent_id,
+            children=self._build_tree(activity.id),
         )
 
-        return [activity.id] + child_activities
+    def _build_tree(
+            self,
+            parent_id: Optional[uuid.UUID],
+    ) -> List[ActivityChildrenSchema]:
+        return [
+            ActivityChildrenSchema(
+                id=child.id,
+                name=child.name,
+                parent_id=child.parent_id,
+                children=self._build_tree(child.id),
+            )
+            for child in self._activity_cache.get_children(parent_id)
+        ]
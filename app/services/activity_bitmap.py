@@ -0,0 +1,330 @@
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.repositories import RepositoryOrganization
+
+# Младшие биты номера - позиция в контейнере, старшие - ключ контейнера
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+CHUNK_BYTES = CHUNK_SIZE // 8
+# Контейнер до стольких чисел хранится массивом (2 байта на число),
+# больше - битовой маской (CHUNK_BYTES байт)
+ARRAY_MAX_SIZE = CHUNK_SIZE // 16
+
+# Отсортированный массив uint16 или битовая маска в int
+Container = Union[np.ndarray, int]
+
+
+def _to_mask(values: np.ndarray) -> int:
+    """Битовая маска контейнера из его чисел"""
+    mask = np.zeros(CHUNK_SIZE, dtype=bool)
+    mask[values] = True
+    return int.from_bytes(
+        np.packbits(mask, bitorder='little').tobytes(),
+        'little',
+    )
+
+
+def _to_container(values: np.ndarray) -> Container:
+    """Контейнер из отсортированных уникальных младших битов чисел"""
+    if len(values) <= ARRAY_MAX_SIZE:
+        return values.astype(np.uint16)
+
+    return _to_mask(values)
+
+
+def _get_values(container: Container) -> np.ndarray:
+    """Младшие биты чисел контейнера в порядке возрастания"""
+    if isinstance(container, np.ndarray):
+        return container
+
+    return np.flatnonzero(
+        np.unpackbits(
+            np.frombuffer(
+                container.to_bytes(CHUNK_BYTES, 'little'),
+                dtype=np.uint8,
+            ),
+            bitorder='little',
+        )
+    )
+
+
+class Bitmap:
+    """
+    Сжатое множество неотрицательных чисел в духе roaring bitmap:
+    числа делятся на контейнеры по старшим битам. Контейнер из не более
+    ARRAY_MAX_SIZE чисел - отсортированный массив младших битов,
+    плотный - битовая маска из CHUNK_SIZE бит в int. Пустые контейнеры
+    не хранятся, объединение выполняется поконтейнерно.
+    """
+
+    __slots__ = ('_chunks',)
+
+    def __init__(self, chunks: Optional[Dict[int, Container]] = None) -> None:
+        self._chunks: Dict[int, Container] = chunks or {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[int]) -> 'Bitmap':
+        rows = np.unique(np.fromiter(rows, dtype=np.int64))
+        keys, starts = np.unique(rows >> CHUNK_BITS, return_index=True)
+
+        return cls({
+            int(key): _to_container(chunk_rows & (CHUNK_SIZE - 1))
+            for key, chunk_rows in zip(keys, np.split(rows, starts[1:]))
+        })
+
+    def add(self, row: int) -> None:
+        key = row >> CHUNK_BITS
+        value = row & (CHUNK_SIZE - 1)
+        container = self._chunks.get(key)
+
+        if container is None:
+            self._chunks[key] = np.array([value], dtype=np.uint16)
+        elif isinstance(container, np.ndarray):
+            position = int(np.searchsorted(container, value))
+            if position < len(container) and container[position] == value:
+                return
+            self._chunks[key] = _to_container(
+                np.insert(container, position, value)
+            )
+        else:
+            self._chunks[key] = container | 1 << value
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        chunks = dict(self._chunks)
+        for key, container in other._chunks.items():
+            current = chunks.get(key)
+            if current is None:
+                chunks[key] = container
+            elif isinstance(current, int) and isinstance(container, int):
+                chunks[key] = current | container
+            elif isinstance(current, int) or isinstance(container, int):
+                array, mask = (
+                    (current, container) if isinstance(container, int)
+                    else (container, current)
+                )
+                chunks[key] = mask | _to_mask(array)
+            else:
+                chunks[key] = _to_container(np.union1d(current, container))
+
+        return Bitmap(chunks)
+
+    def __len__(self) -> int:
+        return sum(
+            len(container) if isinstance(container, np.ndarray)
+            else container.bit_count()
+            for container in self._chunks.values()
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self._chunks)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_rows().tolist())
+
+    def iter_rows(self, start: int = 0) -> Iterator[np.ndarray]:
+        """
+        Номера не меньше start по возрастанию, массивом на контейнер.
+        Контейнеры до контейнера start не распаковываются
+        """
+        start_key = start >> CHUNK_BITS
+        for key in sorted(self._chunks):
+            if key < start_key:
+                continue
+
+            rows = _get_values(self._chunks[key]).astype(np.int64) + (
+                key << CHUNK_BITS
+            )
+            if key == start_key:
+                rows = rows[rows >= start]
+            if len(rows):
+                yield rows
+
+    def to_rows(self) -> np.ndarray:
+        """Номера в порядке возрастания"""
+        rows = list(self.iter_rows())
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+
+        return np.concatenate(rows)
+
+
+class OrganizationActivityIndex:
+    """
+    Битовый индекс организаций по деятельностям.
+
+    Организациям присваиваются порядковые номера в порядке их ID,
+    для каждой деятельности хранится Bitmap номеров ее организаций.
+    Поиск по дереву деятельностей сводится к объединению битовых карт
+    без соединения с organization_activity в БД, а страница после
+    курсора читается с контейнера курсора.
+    Организации, созданные после загрузки, получают номера в конце,
+    вне порядка ID; когда их больше max_unsorted_rows, индекс
+    перестраивается. Не чаще раза в check_interval_seconds версия
+    (количество связей) сверяется с БД, при расхождении индекс
+    перестраивается.
+
+    Пересечение с фильтрами по области и зданию индекс не выполняет:
+    такие сочетания ищутся одним запросом в GeoService.search_organizations.
+    """
+
+    # Сколько организаций вне порядка ID допускается до перестроения
+    max_unsorted_rows = 10000
+
+    def __init__(self, check_interval_seconds: float = 30.0) -> None:
+        self.check_interval_seconds = check_interval_seconds
+        self.is_loaded = False
+        self.version = 0
+        self._checked_at = 0.0
+        self._organization_ids: List[uuid.UUID] = []
+        # Байты UUID организаций подряд по номерам: сортировка в NumPy
+        # совпадает с порядком UUID в БД
+        self._organization_keys = bytearray()
+        # Номера меньше _sorted_count идут в порядке ID организаций
+        self._sorted_count = 0
+        self._row_numbers: Dict[uuid.UUID, int] = {}
+        self._bitmaps: Dict[uuid.UUID, Bitmap] = {}
+
+    def __len__(self) -> int:
+        return len(self._organization_ids)
+
+    def clear(self) -> None:
+        self.is_loaded = False
+        self.version = 0
+        self._organization_ids.clear()
+        self._organization_keys.clear()
+        self._sorted_count = 0
+        self._row_numbers.clear()
+        self._bitmaps.clear()
+
+    def get_row_number(self, organization_id: uuid.UUID) -> int:
+        row = self._row_numbers.get(organization_id)
+        if row is None:
+            row = len(self._organization_ids)
+            self._organization_ids.append(organization_id)
+            self._organization_keys.extend(organization_id.bytes)
+            self._row_numbers[organization_id] = row
+
+        return row
+
+    def load(self, links: Iterable[Tuple[uuid.UUID, uuid.UUID]]) -> None:
+        """Полностью перестраивает индекс по парам (организация, деятельность)"""
+        self.clear()
+        links = list(links)
+        for organization_id in sorted(
+                {organization_id for organization_id, _ in links},
+                key=lambda organization_id: organization_id.bytes,
+        ):
+            self.get_row_number(organization_id)
+        self._sorted_count = len(self._organization_ids)
+
+        activity_rows = defaultdict(list)
+        for organization_id, activity_id in links:
+            activity_rows[activity_id].append(self._row_numbers[organization_id])
+
+        for activity_id, rows in activity_rows.items():
+            self._bitmaps[activity_id] = Bitmap.from_rows(rows)
+
+        self.version = len(links)
+        self._checked_at = time.monotonic()
+        self.is_loaded = True
+
+    def add(
+            self,
+            organization_id: uuid.UUID,
+            activity_ids: Iterable[uuid.UUID],
+    ) -> None:
+        """Учитывает связи новой организации с деятельностями"""
+        row = self.get_row_number(organization_id)
+        for activity_id in activity_ids:
+            self._bitmaps.setdefault(activity_id, Bitmap()).add(row)
+            self.version += 1
+
+    async def rebuild(self, repository: RepositoryOrganization) -> None:
+        self.load(await repository.get_activity_links())
+
+    async def refresh(
+            self,
+            repository: RepositoryOrganization,
+            force: bool = False,
+    ) -> None:
+        """
+        Перестраивает индекс, если версия в БД разошлась с индексом
+        (с force - без ожидания check_interval_seconds)
+        или накопилось много организаций вне порядка ID
+        """
+        if self.is_loaded and len(self) - self._sorted_count > self.max_unsorted_rows:
+            await self.rebuild(repository)
+            return
+
+        if (
+            self.is_loaded
+            and not force
+            and time.monotonic() - self._checked_at < self.check_interval_seconds
+        ):
+            return
+
+        self._checked_at = time.monotonic()
+        if (
+            not self.is_loaded
+            or await repository.get_activity_links_count() != self.version
+        ):
+            await self.rebuild(repository)
+
+    def get_bitmap(self, activity_ids: Iterable[uuid.UUID]) -> Bitmap:
+        """Объединение битовых карт деятельностей"""
+        bitmap = Bitmap()
+        for activity_id in activity_ids:
+            activity_bitmap = self._bitmaps.get(activity_id)
+            if activity_bitmap is not None:
+                bitmap = bitmap | activity_bitmap
+
+        return bitmap
+
+    def get_page_organization_ids(
+            self,
+            bitmap: Bitmap,
+            limit: int,
+            after_id: Optional[uuid.UUID] = None,
+    ) -> List[uuid.UUID]:
+        """
+        До limit ID организаций из битовой карты, следующих по порядку
+        UUID после after_id (keyset-пагинация без сортировки всего списка).
+        Номера в порядке ID читаются с первого номера после after_id
+        до набора limit, номера вне порядка проверяются все
+        """
+        keys = np.frombuffer(self._organization_keys, dtype='S16')
+        start = 0
+        if after_id is not None:
+            start = int(np.searchsorted(
+                keys[:self._sorted_count],
+                np.bytes_(after_id.bytes),
+                side='right',
+            ))
+
+        sorted_rows = []
+        count = 0
+        for rows in bitmap.iter_rows(start):
+            in_order = rows[rows < self._sorted_count]
+            sorted_rows.append(in_order[:limit - count])
+            count += len(sorted_rows[-1])
+            if count >= limit or len(in_order) < len(rows):
+                break
+
+        unsorted_rows = np.concatenate(
+            [np.empty(0, dtype=np.int64)]
+            + list(bitmap.iter_rows(self._sorted_count))
+        )
+        if after_id is not None:
+            unsorted_rows = unsorted_rows[keys[unsorted_rows] > after_id.bytes]
+
+        rows = np.concatenate(
+            [np.empty(0, dtype=np.int64)] + sorted_rows + [unsorted_rows]
+        )
+        rows = rows[np.argsort(keys[rows], kind='stable')][:limit]
+
+        return [self._organization_ids[row] for row in rows.tolist()]
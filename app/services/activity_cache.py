@@ -0,0 +1,148 @@
+import time
+import uuid
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+from app.repositories import RepositoryActivity
+
+
+class CachedActivity(NamedTuple):
+    id: uuid.UUID
+    name: str
+    parent_id: Optional[uuid.UUID]
+    depth: int
+
+
+class ActivityTreeCache:
+    """
+    Кэш всего дерева деятельностей в памяти процесса.
+
+    Хранит деятельности по ID, списки детей и предрасчитанные множества
+    ID поддеревьев. Обновляется на месте при создании деятельности,
+    а не чаще раза в check_interval_seconds сверяет версию (количество
+    деятельностей) с БД и перезагружается при расхождении, чтобы
+    изменения из других процессов тоже доходили до кэша.
+    """
+
+    def __init__(self, check_interval_seconds: float = 30.0) -> None:
+        self.check_interval_seconds = check_interval_seconds
+        self.is_loaded = False
+        self.version = 0
+        self._checked_at = 0.0
+        self._activities: Dict[uuid.UUID, CachedActivity] = {}
+        self._children: Dict[Optional[uuid.UUID], List[uuid.UUID]] = {}
+        self._subtrees: Dict[uuid.UUID, FrozenSet[uuid.UUID]] = {}
+
+    def __len__(self) -> int:
+        return len(self._activities)
+
+    def __contains__(self, activity_id: uuid.UUID) -> bool:
+        return activity_id in self._activities
+
+    def clear(self) -> None:
+        self.is_loaded = False
+        self.version = 0
+        self._activities.clear()
+        self._children.clear()
+        self._subtrees.clear()
+
+    def load(self, activities: Iterable[CachedActivity]) -> None:
+        """Полностью перестраивает кэш по списку деятельностей"""
+        self.clear()
+        for activity in activities:
+            self._activities[activity.id] = activity
+            self._children.setdefault(activity.parent_id, []).append(activity.id)
+
+        # Поддеревья считаются от листьев к корням
+        for activity in sorted(
+                self._activities.values(),
+                key=lambda activity: activity.depth,
+                reverse=True,
+        ):
+            subtree = {activity.id}
+            for child_id in self._children.get(activity.id, []):
+                subtree.update(self._subtrees[child_id])
+            self._subtrees[activity.id] = frozenset(subtree)
+
+        self.version = len(self._activities)
+        self._checked_at = time.monotonic()
+        self.is_loaded = True
+
+    def add(self, activity: CachedActivity) -> None:
+        """Добавляет новую деятельность в кэш и поддеревья ее предков"""
+        if activity.parent_id is not None and activity.parent_id not in self:
+            # Родитель создан в другом процессе: кэш устарел целиком
+            self._checked_at = 0.0
+            return
+
+        self._activities[activity.id] = activity
+        self._children.setdefault(activity.parent_id, []).append(activity.id)
+        self._subtrees[activity.id] = frozenset((activity.id,))
+
+        for ancestor_id in self.get_ancestor_ids(activity.id):
+            self._subtrees[ancestor_id] = self._subtrees[ancestor_id] | {activity.id}
+
+        self.version += 1
+
+    async def rebuild(self, repository: RepositoryActivity) -> None:
+        self.load(
+            CachedActivity(*row) for row in await repository.get_tree_rows()
+        )
+
+    async def refresh(
+            self,
+            repository: RepositoryActivity,
+            force: bool = False,
+    ) -> None:
+        """
+        Перезагружает кэш, если версия в БД разошлась с закэшированной
+        (с force - без ожидания check_interval_seconds)
+        """
+        if (
+            self.is_loaded
+            and not force
+            and time.monotonic() - self._checked_at < self.check_interval_seconds
+        ):
+            return
+
+        # Отметка ставится до запроса, чтобы параллельные запросы не сверяли версию повторно
+        self._checked_at = time.monotonic()
+        if not self.is_loaded or await repository.get_version() != self.version:
+            await self.rebuild(repository)
+
+    def get(self, activity_id: uuid.UUID) -> Optional[CachedActivity]:
+        return self._activities.get(activity_id)
+
+    def get_children(self, activity_id: Optional[uuid.UUID]) -> List[CachedActivity]:
+        return [
+            self._activities[child_id]
+            for child_id in self._children.get(activity_id, [])
+        ]
+
+    def get_ancestor_ids(self, activity_id: uuid.UUID) -> List[uuid.UUID]:
+        ancestor_ids = []
+        parent_id = self._activities[activity_id].parent_id
+        while parent_id is not None:
+            ancestor_ids.append(parent_id)
+            parent_id = self._activities[parent_id].parent_id
+
+        return ancestor_ids
+
+    def get_subtree_ids(
+            self,
+            activity_id: uuid.UUID,
+            max_depth: Optional[int] = None,
+    ) -> Optional[FrozenSet[uuid.UUID]]:
+        """
+        ID деятельности и ее потомков не глубже max_depth уровней
+        или None, если деятельности нет в кэше
+        """
+        subtree = self._subtrees.get(activity_id)
+        if subtree is None or max_depth is None:
+            return subtree
+
+        max_activity_depth = self._activities[activity_id].depth + max_depth
+        return frozenset(
+            subtree_id
+            for subtree_id in subtree
+            if self._activities[subtree_id].depth <= max_activity_depth
+        )
@@ -14,6 +14,8 @@ from sqlalchemy.sql.base import ExecutableOption
 from starlette import status
 
 from app.repositories.base import ModelType
+from app.schemas.pagination import PaginationParams
+from app.services.pagination import decode_id_cursor, get_page
 
 RepositoryType = TypeVar('RepositoryType')
 
@@ -69,6 +71,23 @@ class CRUDBaseService(Generic[RepositoryType, ]):
             **kwargs
         )
 
+    async def list_page(
+            self,
+            *args,
+            pagination: PaginationParams,
+            options: List[ExecutableOption] = [],
+            **kwargs
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Страница списка в порядке ID и курсор следующей страницы"""
+        objects = await self._repository.list_after(
+            *args,
+            limit=pagination.limit + 1,
+            after_id=decode_id_cursor(pagination.cursor),
+            options=options,
+            **kwargs
+        )
+        return get_page(objects, pagination.limit, lambda obj: (obj.id, ))
+
     async def delete(self, obj_id: UUID) -> None:
         await self.get_object_or_404(id=obj_id)
         return await self._repository.delete(id=obj_id)
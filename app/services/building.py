@@ -1,9 +1,48 @@
+import uuid
+from functools import partial
+from typing import Optional, Sequence
+
 from .base import CRUDBaseService
+from app.db.models import Building
 from app.repositories import (
     RepositoryBuilding,
 )
+from app.services.geo_cache import GeoTileCache
+from app.services.spatial_index import BuildingGridIndex
 
 
 class BuildingService(CRUDBaseService[RepositoryBuilding]):
     """Сервис для RepositoryBuilding"""
-    pass
\ No newline at end of file
+
+    def __init__(
+            self,
+            repository: RepositoryBuilding,
+            building_index: BuildingGridIndex,
+            geo_tile_cache: GeoTileCache,
+            unique_fields: Optional[Sequence[str]] = None,
+    ):
+        super().__init__(repository, unique_fields=unique_fields)
+        self._building_index = building_index
+        self._geo_tile_cache = geo_tile_cache
+
+    async def create(self, obj_in) -> Building:
+        building = await super().create(obj_in)
+        self._repository.run_after_commit(
+            partial(
+                self._on_building_created,
+                building.id,
+                building.latitude,
+                building.longitude,
+            )
+        )
+        return building
+
+    def _on_building_created(
+            self,
+            building_id: uuid.UUID,
+            latitude: float,
+            longitude: float,
+    ) -> None:
+        """Учитывает здание в индексе и кэше после COMMIT его создания"""
+        self._building_index.add(building_id, latitude, longitude)
+        self._geo_tile_cache.invalidate(latitude, longitude)
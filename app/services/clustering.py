@@ -0,0 +1,205 @@
+import math
+import time
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from app.repositories import RepositoryOrganization
+
+# Предел широты проекции Web Mercator
+MAX_MERCATOR_LAT = 85.05112878
+
+
+class Cluster(NamedTuple):
+    count: int
+    latitude: float
+    longitude: float
+
+
+def get_tile(latitude: float, longitude: float, level: int) -> Tuple[int, int]:
+    """Координаты тайла Web Mercator, содержащего точку"""
+    tiles_count = 1 << level
+    latitude = min(max(latitude, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT)
+    lat_rad = math.radians(latitude)
+
+    x = int((longitude + 180.0) / 360.0 * tiles_count)
+    y = int(
+        (1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * tiles_count
+    )
+
+    return (
+        min(max(x, 0), tiles_count - 1),
+        min(max(y, 0), tiles_count - 1),
+    )
+
+
+def get_tile_bounds(
+        x: int,
+        y: int,
+        level: int,
+) -> Tuple[float, float, float, float]:
+    """Границы тайла: min_lat, max_lat, min_lon, max_lon"""
+    tiles_count = 1 << level
+
+    def get_latitude(tile_y: int) -> float:
+        return math.degrees(
+            math.atan(math.sinh(math.pi * (1 - 2 * tile_y / tiles_count)))
+        )
+
+    return (
+        get_latitude(y + 1),
+        get_latitude(y),
+        x / tiles_count * 360.0 - 180.0,
+        (x + 1) / tiles_count * 360.0 - 180.0,
+    )
+
+
+def add_to_cells(
+        cells: Dict[Tuple[int, int], List[float]],
+        latitude: float,
+        longitude: float,
+        count: int,
+        level: int,
+) -> None:
+    """Добавляет count организаций в точке к агрегату ее ячейки"""
+    tile = get_tile(latitude, longitude, level)
+    aggregate = cells.get(tile)
+
+    if aggregate is None:
+        cells[tile] = [count, latitude * count, longitude * count]
+    else:
+        aggregate[0] += count
+        aggregate[1] += latitude * count
+        aggregate[2] += longitude * count
+
+
+class OrganizationClusterIndex:
+    """
+    Предрасчитанные агрегаты организаций для кластеризации на карте.
+
+    Для каждого масштаба 0..max_zoom хранятся количество организаций
+    и сумма их координат по ячейкам сетки. Ячейка масштаба zoom -
+    тайл Web Mercator уровня zoom + grid_subdivision, то есть каждый
+    тайл карты делится на 2^grid_subdivision x 2^grid_subdivision кластеров.
+
+    Агрегаты дополняются после COMMIT создания организации, а не чаще
+    раза в check_interval_seconds версия (количество организаций)
+    сверяется с БД, при расхождении агрегаты перестраиваются.
+    """
+
+    def __init__(
+            self,
+            max_zoom: int = 16,
+            grid_subdivision: int = 3,
+            check_interval_seconds: float = 30.0,
+    ) -> None:
+        self.max_zoom = max_zoom
+        self.grid_subdivision = grid_subdivision
+        self.check_interval_seconds = check_interval_seconds
+        self.is_loaded = False
+        self.version = 0
+        self._checked_at = 0.0
+        self._levels: List[Dict[Tuple[int, int], List[float]]] = [
+            {} for _ in range(max_zoom + 1)
+        ]
+
+    def clear(self) -> None:
+        self.is_loaded = False
+        self.version = 0
+        for cells in self._levels:
+            cells.clear()
+
+    def add(self, latitude: float, longitude: float, count: int = 1) -> None:
+        """Учитывает count организаций в точке на всех масштабах"""
+        for zoom, cells in enumerate(self._levels):
+            add_to_cells(
+                cells,
+                latitude,
+                longitude,
+                count,
+                zoom + self.grid_subdivision,
+            )
+
+        self.version += count
+
+    def load(self, points: Iterable[Tuple[float, float, int]]) -> None:
+        """Полностью перестраивает агрегаты по количеству организаций в точках"""
+        self.clear()
+        for latitude, longitude, count in points:
+            self.add(latitude, longitude, count)
+
+        self._checked_at = time.monotonic()
+        self.is_loaded = True
+
+    async def rebuild(self, repository: RepositoryOrganization) -> None:
+        self.load(await repository.get_counts_by_building())
+
+    async def refresh(
+            self,
+            repository: RepositoryOrganization,
+            force: bool = False,
+    ) -> None:
+        """
+        Перестраивает агрегаты, если версия в БД разошлась с индексом
+        (с force - без ожидания check_interval_seconds).
+        Не загруженные агрегаты не загружаются: без них кластеры считаются по БД
+        """
+        if not self.is_loaded or (
+            not force
+            and time.monotonic() - self._checked_at < self.check_interval_seconds
+        ):
+            return
+
+        self._checked_at = time.monotonic()
+        if await repository.get_version() != self.version:
+            await self.rebuild(repository)
+
+    def get_clusters(
+            self,
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+            zoom: int,
+    ) -> List[Cluster]:
+        """Кластеры ячеек, пересекающихся с прямоугольником"""
+        return self.get_cells_clusters(
+            self._levels[zoom],
+            min_lat, max_lat, min_lon, max_lon,
+            zoom + self.grid_subdivision,
+        )
+
+    @staticmethod
+    def get_cells_clusters(
+            cells: Dict[Tuple[int, int], List[float]],
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+            level: int,
+    ) -> List[Cluster]:
+        min_x, min_y = get_tile(max_lat, min_lon, level)
+        max_x, max_y = get_tile(min_lat, max_lon, level)
+        tiles_count = (max_x - min_x + 1) * (max_y - min_y + 1)
+
+        # Для больших областей дешевле обойти только непустые ячейки
+        if tiles_count > len(cells):
+            aggregates = [
+                aggregate for (x, y), aggregate in cells.items()
+                if min_x <= x <= max_x and min_y <= y <= max_y
+            ]
+        else:
+            aggregates = [
+                cells[(x, y)]
+                for x in range(min_x, max_x + 1)
+                for y in range(min_y, max_y + 1)
+                if (x, y) in cells
+            ]
+
+        return [
+            Cluster(
+                count=int(count),
+                latitude=sum_lat / count,
+                longitude=sum_lon / count,
+            )
+            for count, sum_lat, sum_lon in aggregates
+            if count
+        ]
@@ -0,0 +1,139 @@
+import math
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+Tile = Tuple[int, int]
+
+
+class CachedOrganization(NamedTuple):
+    id: uuid.UUID
+    name: str
+    building_id: uuid.UUID
+    latitude: float
+    longitude: float
+
+
+class GeoTileCache:
+    """
+    Кэш организаций по тайлам сетки с шагом tile_size_deg градусов.
+
+    Поиск разбивается на тайлы, закэшированные тайлы берутся из памяти,
+    недостающие загружаются одним запросом. Число тайлов ограничено
+    max_tiles с вытеснением давно не использованных (LRU). Тайл
+    сбрасывается после COMMIT создания здания или организации в нем, а ttl_seconds
+    ограничивает устаревание данных, измененных в других процессах.
+    """
+
+    def __init__(
+            self,
+            tile_size_deg: float = 0.02,
+            max_tiles: int = 20000,
+            max_tiles_per_search: int = 256,
+            ttl_seconds: float = 60.0,
+    ) -> None:
+        self.tile_size_deg = tile_size_deg
+        self.max_tiles = max_tiles
+        self.max_tiles_per_search = max_tiles_per_search
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self._tiles: OrderedDict[
+            Tile, Tuple[float, List[CachedOrganization]]
+        ] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    def get_tile(self, latitude: float, longitude: float) -> Tile:
+        return (
+            math.floor(latitude / self.tile_size_deg),
+            math.floor(longitude / self.tile_size_deg),
+        )
+
+    def get_tiles_count(
+            self,
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+    ) -> int:
+        """Количество тайлов, покрывающих прямоугольник"""
+        min_row, min_col = self.get_tile(min_lat, min_lon)
+        max_row, max_col = self.get_tile(max_lat, max_lon)
+
+        return (max_row - min_row + 1) * (max_col - min_col + 1)
+
+    def get_tiles(
+            self,
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+    ) -> List[Tile]:
+        """Тайлы, покрывающие прямоугольник"""
+        min_row, min_col = self.get_tile(min_lat, min_lon)
+        max_row, max_col = self.get_tile(max_lat, max_lon)
+
+        return [
+            (row, col)
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+        ]
+
+    def get_tiles_bounds(
+            self,
+            tiles: List[Tile],
+    ) -> Tuple[float, float, float, float]:
+        """Прямоугольник, описанный вокруг тайлов"""
+        rows = [row for row, _ in tiles]
+        cols = [col for _, col in tiles]
+
+        return (
+            min(rows) * self.tile_size_deg,
+            (max(rows) + 1) * self.tile_size_deg,
+            min(cols) * self.tile_size_deg,
+            (max(cols) + 1) * self.tile_size_deg,
+        )
+
+    def get(self, tile: Tile) -> Optional[List[CachedOrganization]]:
+        cached = self._tiles.get(tile)
+        if cached is None:
+            return None
+
+        cached_at, organizations = cached
+        if time.monotonic() - cached_at > self.ttl_seconds:
+            del self._tiles[tile]
+            return None
+
+        self._tiles.move_to_end(tile)
+        return organizations
+
+    def set_many(
+            self,
+            tiles: Dict[Tile, List[CachedOrganization]],
+            generation: int,
+    ) -> None:
+        """
+        Сохраняет загруженные тайлы, если с момента начала загрузки
+        (generation) кэш не сбрасывался
+        """
+        if generation != self.generation:
+            return
+
+        cached_at = time.monotonic()
+        for tile, organizations in tiles.items():
+            self._tiles[tile] = (cached_at, organizations)
+            self._tiles.move_to_end(tile)
+
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+
+    def invalidate(self, latitude: float, longitude: float) -> None:
+        """Сбрасывает тайл, содержащий точку"""
+        self.generation += 1
+        self._tiles.pop(self.get_tile(latitude, longitude), None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._tiles.clear()
@@ -1,103 +1,1150 @@
 # services/geo_service.py
-from math import radians, sin, cos, sqrt, atan2
-from typing import List
+import heapq
+import itertools
+import uuid
+from math import radians, cos
+from typing import List, Optional, Tuple, Union
 
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+import numpy as np
+from sqlalchemy import select, and_, or_, func, null, values, column
+from sqlalchemy import Integer, Uuid
+from sqlalchemy.orm import aliased, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql.base import ExecutableOption
+from sqlalchemy.sql.elements import ColumnElement
 
-from app.db.models import Organization, Building
-from app.schemas.geo_search import RectangleSearch, RadiusSearch
+from app.db import geohash
+from app.db.functions import distance_km, EARTH_RADIUS_KM
+from app.db.routing import is_primary_pinned
+from app.db.models import Organization, Building, Activity
+from app.db.models.organization import OrganizationActivity
+from app.repositories import RepositoryBuilding, RepositoryOrganization
+from app.repositories.activity import (
+    get_activity_subtree_condition,
+    get_path_prefix_condition,
+)
+from app.schemas.geo_search import (
+    RectangleSearch,
+    RadiusSearch,
+    RadiusSortedSearch,
+    NearestSearch,
+    ClusterSearch,
+    PolygonSearch,
+    CorridorSearch,
+    OrganizationSearch,
+    ActivityFacetSearch,
+    AreaFilter,
+)
+from app.services.clustering import (
+    Cluster,
+    OrganizationClusterIndex,
+    add_to_cells,
+    get_tile,
+    get_tile_bounds,
+)
+from app.schemas.pagination import PaginationParams
+from app.services.geo_cache import CachedOrganization, GeoTileCache
+from app.services.pagination import (
+    decode_cursor,
+    decode_id_cursor,
+    get_id_page,
+    get_page,
+)
+from app.services.spatial_index import BuildingGridIndex, BuildingPoints
 
 
 class GeoService:
+    # Ограничение на количество ID в одном IN (лимит параметров asyncpg)
+    building_ids_chunk_size = 5000
+    # Минимальное число зданий, запрашиваемых за раз при поиске ближайших
+    nearest_batch_size = 16
+
     def __init__(
             self,
             session: AsyncSession,
+            cache_session: AsyncSession,
+            cache_repository_building: RepositoryBuilding,
+            cache_repository_organization: RepositoryOrganization,
+            building_index: BuildingGridIndex,
+            cluster_index: OrganizationClusterIndex,
+            geo_tile_cache: GeoTileCache,
     ) -> None:
         self._session = session
+        # Кэш тайлов и индексы заполняются и сверяются только
+        # с основной БД, иначе отставание реплики закрепилось бы в них
+        self._cache_session = cache_session
+        self._cache_repository_building = cache_repository_building
+        self._cache_repository_organization = cache_repository_organization
+        self._building_index = building_index
+        self._cluster_index = cluster_index
+        self._geo_tile_cache = geo_tile_cache
+
+    async def _refresh_building_index(self) -> None:
+        """
+        Сверяет индекс зданий с БД. Сразу после записи клиента
+        версия сверяется без ожидания интервала: здание могло быть
+        создано в другом процессе
+        """
+        await self._building_index.refresh(
+            self._cache_repository_building,
+            force=is_primary_pinned(),
+        )
 
     @staticmethod
-    def _calculate_distance(
-            lat1: float,
-            lon1: float,
-            lat2: float,
-            lon2: float
-    ) -> float:
-        """Расчет расстояния между двумя точками по формуле гаверсинуса (в км)"""
+    def _calculate_distances(
+            latitude: float,
+            longitude: float,
+            latitudes: np.ndarray,
+            longitudes: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Расчет расстояний от точки до массива точек
+        по формуле гаверсинуса (в км)
+        """
         R = 6371.0  # Радиус Земли в км
 
-        lat1_rad = radians(lat1)
-        lon1_rad = radians(lon1)
-        lat2_rad = radians(lat2)
-        lon2_rad = radians(lon2)
+        lat_rad = np.radians(latitude)
+        lats_rad = np.radians(latitudes)
 
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
+        dlat = lats_rad - lat_rad
+        dlon = np.radians(longitudes) - np.radians(longitude)
 
-        a = sin(dlat / 2) ** 2 + cos(lat1_rad) * cos(lat2_rad) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
+        a = (
+            np.sin(dlat / 2) ** 2
+            + np.cos(lat_rad) * np.cos(lats_rad) * np.sin(dlon / 2) ** 2
+        )
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
 
         return R * c
 
+    @staticmethod
+    def _get_points_in_polygon_mask(
+            latitudes: np.ndarray,
+            longitudes: np.ndarray,
+            rings: List[List[Tuple[float, float]]],
+    ) -> np.ndarray:
+        """
+        Проверка попадания точек в многоугольник методом луча
+        (правило четности, поэтому отверстия учитываются автоматически).
+        Цикл идет по ребрам, точки обрабатываются векторно
+        """
+        inside = np.zeros(len(latitudes), dtype=bool)
+
+        for ring in rings:
+            for (lon1, lat1), (lon2, lat2) in zip(ring, ring[1:]):
+                if lat1 == lat2:
+                    continue
+
+                crosses = (lat1 > latitudes) != (lat2 > latitudes)
+                intersection_lon = (
+                    lon1 + (latitudes - lat1) * (lon2 - lon1) / (lat2 - lat1)
+                )
+                inside ^= crosses & (longitudes < intersection_lon)
+
+        return inside
+
+    @staticmethod
+    def _calculate_route_distances(
+            latitudes: np.ndarray,
+            longitudes: np.ndarray,
+            route: List[Tuple[float, float]],
+    ) -> np.ndarray:
+        """
+        Расстояние (в км) от каждой точки до ближайшего отрезка маршрута.
+        Каждый отрезок проецируется на плоскость, касательную в его
+        середине; цикл идет по отрезкам, точки обрабатываются векторно
+        """
+        km_per_degree = radians(EARTH_RADIUS_KM)
+        distances = np.full(len(latitudes), np.inf)
+
+        for (lon1, lat1), (lon2, lat2) in zip(route, route[1:]):
+            lon_km_per_degree = km_per_degree * cos(radians((lat1 + lat2) / 2))
+
+            segment_x = (lon2 - lon1) * lon_km_per_degree
+            segment_y = (lat2 - lat1) * km_per_degree
+            points_x = (longitudes - lon1) * lon_km_per_degree
+            points_y = (latitudes - lat1) * km_per_degree
+
+            segment_length = segment_x ** 2 + segment_y ** 2
+            if segment_length:
+                t = np.clip(
+                    (points_x * segment_x + points_y * segment_y)
+                    / segment_length,
+                    0.0,
+                    1.0,
+                )
+            else:
+                t = 0.0
+
+            np.minimum(
+                distances,
+                np.hypot(points_x - t * segment_x, points_y - t * segment_y),
+                out=distances,
+            )
+
+        return distances
+
+    @staticmethod
+    def _get_radius_bounds(
+            search: RadiusSearch,
+    ) -> Tuple[float, float, float, float]:
+        """Прямоугольная область, описанная вокруг круга поиска"""
+        lat_degree_per_km = 1 / 111.0
+        lon_degree_per_km = 1 / (111.0 * cos(radians(search.latitude)))
+
+        lat_offset = search.radius_km * lat_degree_per_km
+        lon_offset = search.radius_km * lon_degree_per_km
+
+        return (
+            search.latitude - lat_offset,
+            search.latitude + lat_offset,
+            search.longitude - lon_offset,
+            search.longitude + lon_offset,
+        )
+
     async def search_in_radius(
             self,
             search: RadiusSearch,
+            pagination: PaginationParams,
             options: List[ExecutableOption] = [],
-    ) -> List[Organization]:
+    ) -> Tuple[List[Organization], Optional[str]]:
         """
-        Поиск организаций в радиусе от центральной точки
+        Поиск организаций в радиусе от центральной точки,
+        страница в порядке ID
         """
-        center_lat = search.latitude
-        center_lon = search.longitude
-        radius_km = search.radius_km
+        min_lat, max_lat, min_lon, max_lon = self._get_radius_bounds(search)
 
-        # Быстрая предварительная фильтрация по прямоугольной области
-        lat_degree_per_km = 1 / 111.0
-        lon_degree_per_km = 1 / (111.0 * cos(radians(center_lat)))
+        await self._refresh_building_index()
+        if self._building_index.is_loaded:
+            # Предварительная фильтрация индексом по описанному прямоугольнику
+            # и точная - по расстоянию (один расчет на здание)
+            buildings_in_radius = self._filter_in_radius(
+                self._building_index.search_in_rectangle(
+                    min_lat, max_lat, min_lon, max_lon
+                ),
+                search,
+            )
+            return await self._get_organizations_page_by_building_ids(
+                buildings_in_radius.ids,
+                pagination,
+                options=options,
+            )
+
+        distance = distance_km(
+            self._session.bind.dialect.name,
+            search.latitude,
+            search.longitude,
+            Building.latitude,
+            Building.longitude,
+        )
+        return await self._get_organizations_page(
+            pagination,
+            *self._get_area_conditions(min_lat, max_lat, min_lon, max_lon),
+            distance <= search.radius_km,
+            options=options,
+        )
 
-        lat_offset = radius_km * lat_degree_per_km
-        lon_offset = radius_km * lon_degree_per_km
+    def _filter_in_radius(
+            self,
+            buildings: BuildingPoints,
+            search: RadiusSearch,
+    ) -> BuildingPoints:
+        """Оставляет здания, находящиеся в радиусе поиска"""
+        distances = self._calculate_distances(
+            search.latitude, search.longitude,
+            buildings.latitudes, buildings.longitudes,
+        )
+        return buildings.filter(distances <= search.radius_km)
 
-        min_lat = center_lat - lat_offset
-        max_lat = center_lat + lat_offset
-        min_lon = center_lon - lon_offset
-        max_lon = center_lon + lon_offset
+    async def search_in_radius_cached(
+            self,
+            search: RadiusSearch,
+            pagination: PaginationParams,
+    ) -> Tuple[List[CachedOrganization], Optional[str]]:
+        """
+        Поиск организаций в радиусе через кэш тайлов, страница в порядке ID.
+        Слишком большие для кэша области и чтения сразу после записи
+        клиента ищутся без него
+        """
+        bounds = self._get_radius_bounds(search)
+        if is_primary_pinned() or not self._is_cacheable(*bounds):
+            return await self.search_in_radius(search, pagination)
 
-        # Получаем организации в прямоугольной области
-        statement = select(Organization).join(Building).where(
-            Building.latitude.between(min_lat, max_lat),
-            Building.longitude.between(min_lon, max_lon)
-        ).options(*options)
+        organizations = await self._get_cached_organizations(*bounds)
+        distances = self._calculate_distances(
+            search.latitude, search.longitude,
+            np.fromiter((org.latitude for org in organizations), dtype=float),
+            np.fromiter((org.longitude for org in organizations), dtype=float),
+        )
+
+        return get_id_page(
+            list(itertools.compress(
+                organizations,
+                (distances <= search.radius_km).tolist(),
+            )),
+            pagination,
+        )
+
+    async def search_in_radius_sorted(
+            self,
+            search: RadiusSortedSearch,
+            options: List[ExecutableOption] = [],
+    ) -> List[Tuple[Organization, float]]:
+        """
+        Поиск ближайших организаций в радиусе от центральной точки.
+        Расстояние считается, фильтруется и сортируется в самой БД,
+        поэтому из нее загружается не больше search.limit строк
+        """
+        min_lat, max_lat, min_lon, max_lon = self._get_radius_bounds(search)
+        distance = distance_km(
+            self._session.bind.dialect.name,
+            search.latitude,
+            search.longitude,
+            Building.latitude,
+            Building.longitude,
+        ).label('distance_km')
+
+        statement = (
+            select(Organization, distance)
+            .join(Building)
+            .where(
+                *self._get_area_conditions(min_lat, max_lat, min_lon, max_lon),
+                distance <= search.radius_km,
+            )
+            .order_by(distance, Organization.id)
+            .limit(search.limit)
+            .options(*options)
+        )
 
         result = await self._session.execute(statement)
-        candidates = result.scalars().all()
+        return [tuple(row) for row in result.all()]
+
+    async def search_nearest(
+            self,
+            search: NearestSearch,
+            options: List[ExecutableOption] = [],
+    ) -> List[Tuple[Organization, float]]:
+        """
+        Поиск k ближайших к точке организаций без ограничения радиуса.
+
+        Здания перебираются индексом в порядке удаления от точки
+        и запрашиваются пачками растущего размера, пока не наберется
+        k организаций: все следующие здания не ближе уже найденных
+        """
+        conditions = []
+        if search.activity_id:
+            conditions.append(
+                Organization.activities.any(Activity.id == search.activity_id)
+            )
 
-        # Точная фильтрация по расстоянию
-        organizations_in_radius = []
-        for org in candidates:
-            distance = self._calculate_distance(
-                center_lat, center_lon,
-                org.building.latitude, org.building.longitude
+        await self._refresh_building_index()
+        if not self._building_index.is_loaded:
+            return await self._search_nearest_in_db(
+                search,
+                conditions,
+                options=options,
             )
-            if distance <= radius_km:
-                organizations_in_radius.append(org)
 
-        return organizations_in_radius
+        nearest_buildings = self._building_index.iter_nearest(
+            search.latitude,
+            search.longitude,
+        )
+        batch_size = max(search.k, self.nearest_batch_size)
+        nearest_organizations = []
+
+        while len(nearest_organizations) < search.k:
+            distances = dict(itertools.islice(nearest_buildings, batch_size))
+            if not distances:
+                break
+
+            organizations = await self._get_organizations_by_building_ids(
+                list(distances),
+                *conditions,
+                options=options,
+            )
+            nearest_organizations.extend(sorted(
+                (
+                    (organization, distances[organization.building_id])
+                    for organization in organizations
+                ),
+                key=lambda item: (item[1], item[0].id),
+            ))
+            batch_size *= 2
+
+        return nearest_organizations[:search.k]
+
+    async def _search_nearest_in_db(
+            self,
+            search: NearestSearch,
+            conditions: List,
+            options: List[ExecutableOption] = [],
+    ) -> List[Tuple[Organization, float]]:
+        """Поиск ближайших организаций сортировкой по расстоянию в БД"""
+        distance = distance_km(
+            self._session.bind.dialect.name,
+            search.latitude,
+            search.longitude,
+            Building.latitude,
+            Building.longitude,
+        ).label('distance_km')
+
+        statement = (
+            select(Organization, distance)
+            .join(Building)
+            .where(*conditions)
+            .order_by(distance, Organization.id)
+            .limit(search.k)
+            .options(*options)
+        )
+
+        result = await self._session.execute(statement)
+        return [tuple(row) for row in result.all()]
 
     async def search_in_rectangle(
             self,
             search: RectangleSearch,
+            pagination: PaginationParams,
+            options: List[ExecutableOption] = [],
+    ) -> Tuple[List[Organization], Optional[str]]:
+        """
+        Поиск организаций в прямоугольной области, страница в порядке ID
+        """
+        await self._refresh_building_index()
+        if self._building_index.is_loaded:
+            buildings = self._building_index.search_in_rectangle(
+                search.min_lat, search.max_lat, search.min_lon, search.max_lon
+            )
+            return await self._get_organizations_page_by_building_ids(
+                buildings.ids,
+                pagination,
+                options=options,
+            )
+
+        return await self._get_organizations_page(
+            pagination,
+            *self._get_area_conditions(
+                search.min_lat, search.max_lat, search.min_lon, search.max_lon
+            ),
+            options=options,
+        )
+
+    async def search_in_polygon(
+            self,
+            search: PolygonSearch,
+            pagination: PaginationParams,
+            options: List[ExecutableOption] = [],
+    ) -> Tuple[List[Organization], Optional[str]]:
+        """
+        Поиск организаций в многоугольнике, страница в порядке ID
+        """
+        outer_ring = search.coordinates[0]
+
+        # Предварительная фильтрация по описанному прямоугольнику
+        buildings = await self._get_buildings_in_rectangle(
+            min_lat=min(latitude for _, latitude in outer_ring),
+            max_lat=max(latitude for _, latitude in outer_ring),
+            min_lon=min(longitude for longitude, _ in outer_ring),
+            max_lon=max(longitude for longitude, _ in outer_ring),
+        )
+
+        buildings_in_polygon = buildings.filter(
+            self._get_points_in_polygon_mask(
+                buildings.latitudes,
+                buildings.longitudes,
+                search.coordinates,
+            )
+        )
+
+        return await self._get_organizations_page_by_building_ids(
+            buildings_in_polygon.ids,
+            pagination,
+            options=options,
+        )
+
+    async def search_along_route(
+            self,
+            search: CorridorSearch,
+            pagination: PaginationParams,
+            options: List[ExecutableOption] = [],
+    ) -> Tuple[List[Organization], Optional[str]]:
+        """
+        Поиск организаций на расстоянии не больше buffer_km от маршрута,
+        страница в порядке ID
+        """
+        lat_offset = search.buffer_km / 111.0
+        bounds = []
+
+        # Прямоугольник каждого отрезка, расширенный на ширину буфера
+        for (lon1, lat1), (lon2, lat2) in zip(
+                search.coordinates, search.coordinates[1:]
+        ):
+            max_abs_lat = min(max(abs(lat1), abs(lat2)) + lat_offset, 89.9)
+            lon_offset = search.buffer_km / (111.0 * cos(radians(max_abs_lat)))
+            bounds.append((
+                min(lat1, lat2) - lat_offset,
+                max(lat1, lat2) + lat_offset,
+                min(lon1, lon2) - lon_offset,
+                max(lon1, lon2) + lon_offset,
+            ))
+
+        buildings = await self._get_buildings_in_rectangles(bounds)
+        distances = self._calculate_route_distances(
+            buildings.latitudes,
+            buildings.longitudes,
+            search.coordinates,
+        )
+        buildings_near_route = buildings.filter(distances <= search.buffer_km)
+
+        return await self._get_organizations_page_by_building_ids(
+            buildings_near_route.ids,
+            pagination,
+            options=options,
+        )
+
+    async def search_batch(
+            self,
+            searches: List[Union[RadiusSearch, RectangleSearch]],
+            pagination: List[PaginationParams],
+            options: List[ExecutableOption] = [],
+    ) -> List[Tuple[List[Organization], Optional[str]]]:
+        """
+        Поиск организаций сразу в нескольких областях.
+        Здания всех областей берутся из индекса или загружаются одним
+        запросом по объединению их прямоугольников. Организации каждой
+        области загружаются страницей в порядке ID со своим курсором
+        общим запросом по всем областям, поэтому ответ ограничен
+        limit строк на область
+        """
+        bounds = [self._get_search_bounds(search) for search in searches]
+
+        await self._refresh_building_index()
+        if self._building_index.is_loaded:
+            areas = [
+                self._building_index.search_in_rectangle(*area_bounds)
+                for area_bounds in bounds
+            ]
+        else:
+            buildings = await self._get_buildings_in_rectangles(bounds)
+            areas = [
+                buildings.filter(
+                    (buildings.latitudes >= min_lat)
+                    & (buildings.latitudes <= max_lat)
+                    & (buildings.longitudes >= min_lon)
+                    & (buildings.longitudes <= max_lon)
+                )
+                for min_lat, max_lat, min_lon, max_lon in bounds
+            ]
+
+        building_ids_per_search = [
+            self._filter_in_radius(area, search).ids
+            if isinstance(search, RadiusSearch) else area.ids
+            for area, search in zip(areas, searches)
+        ]
+
+        return await self._get_organizations_pages_by_building_ids(
+            building_ids_per_search,
+            pagination,
+            options=options,
+        )
+
+    async def search_organizations(
+            self,
+            search: OrganizationSearch,
+            pagination: PaginationParams,
+    ) -> Tuple[List[Tuple[uuid.UUID, str, Optional[float]]], Optional[str]]:
+        """
+        Поиск организаций по сочетанию фильтров одним запросом с курсорной
+        пагинацией. Строки упорядочены по (название, ID), а при поиске
+        в радиусе - по (расстояние, ID); курсор хранит ключ последней
+        строки. Возвращает строки (id, название, расстояние) страницы
+        и курсор следующей страницы
+        """
+        conditions, distance = self._get_area_filter_conditions(search)
+        sort_key = Organization.name if distance is None else distance
+        if pagination.cursor is not None:
+            last_value, last_id = decode_cursor(
+                pagination.cursor,
+                str if distance is None else float,
+                uuid.UUID,
+            )
+            conditions.append(or_(
+                sort_key > last_value,
+                and_(sort_key == last_value, Organization.id > last_id),
+            ))
+
+        if search.name_prefix:
+            conditions.append(
+                Organization.name.startswith(search.name_prefix, autoescape=True)
+            )
+
+        if search.activity_id:
+            activity_condition = (
+                get_activity_subtree_condition(search.activity_id)
+                if search.include_subtree
+                else Activity.id == search.activity_id
+            )
+            conditions.append(
+                select(OrganizationActivity.organization_id)
+                .join(Activity, OrganizationActivity.activity_id == Activity.id)
+                .where(
+                    OrganizationActivity.organization_id == Organization.id,
+                    activity_condition,
+                )
+                .exists()
+            )
+
+        statement = select(
+            Organization.id,
+            Organization.name,
+            (distance if distance is not None else null()).label('distance_km'),
+        )
+        if search.rectangle or search.radius:
+            statement = statement.join(Organization.building)
+
+        # Лишняя строка показывает, есть ли следующая страница
+        statement = (
+            statement
+            .where(*conditions)
+            .order_by(sort_key, Organization.id)
+            .limit(pagination.limit + 1)
+        )
+        result = await self._session.execute(statement)
+        rows = [tuple(row) for row in result.all()]
+
+        return get_page(
+            rows,
+            pagination.limit,
+            lambda row: (
+                row[1] if distance is None else row[2],
+                row[0],
+            ),
+        )
+
+    def _get_area_filter_conditions(
+            self,
+            search: AreaFilter,
+    ) -> Tuple[List[ColumnElement[bool]], Optional[ColumnElement[float]]]:
+        """
+        Условия фильтра по зданию и области для запроса с соединением
+        организаций и зданий, а также выражение расстояния до центра
+        при поиске в радиусе
+        """
+        conditions = []
+        distance = None
+
+        if search.building_id:
+            conditions.append(Organization.building_id == search.building_id)
+
+        if search.rectangle:
+            conditions.extend(self._get_area_conditions(
+                *self._get_search_bounds(search.rectangle)
+            ))
+        elif search.radius:
+            distance = distance_km(
+                self._session.bind.dialect.name,
+                search.radius.latitude,
+                search.radius.longitude,
+                Building.latitude,
+                Building.longitude,
+            )
+            conditions.extend(self._get_area_conditions(
+                *self._get_radius_bounds(search.radius)
+            ))
+            conditions.append(distance <= search.radius.radius_km)
+
+        return conditions, distance
+
+    async def get_activity_facets(
+            self,
+            search: ActivityFacetSearch,
+    ) -> List[Tuple[uuid.UUID, str, Optional[uuid.UUID], int]]:
+        """
+        Количество организаций области по деятельностям с учетом
+        вложенных одним запросом с GROUP BY: каждая связь организации
+        с деятельностью засчитывается ее деятельности и всем предкам
+        (префиксам материализованного пути), организация - один раз
+        """
+        conditions, _ = self._get_area_filter_conditions(search)
+        activity = aliased(Activity)
+        ancestor = aliased(Activity)
+
+        statement = (
+            select(
+                ancestor.id,
+                ancestor.name,
+                ancestor.parent_id,
+                func.count(func.distinct(OrganizationActivity.organization_id)),
+            )
+            .select_from(OrganizationActivity)
+            .join(activity, OrganizationActivity.activity_id == activity.id)
+            .join(ancestor, get_path_prefix_condition(activity.path, ancestor.path))
+            .where(*conditions)
+            .group_by(ancestor.id, ancestor.name, ancestor.parent_id)
+            .order_by(ancestor.path)
+        )
+        if search.radius or search.rectangle:
+            statement = (
+                statement
+                .join(
+                    Organization,
+                    OrganizationActivity.organization_id == Organization.id,
+                )
+                .join(Organization.building)
+            )
+        elif search.building_id:
+            statement = statement.join(
+                Organization,
+                OrganizationActivity.organization_id == Organization.id,
+            )
+
+        result = await self._session.execute(statement)
+        return [tuple(row) for row in result.all()]
+
+    async def get_clusters(self, search: ClusterSearch) -> List[Cluster]:
+        """
+        Кластеры организаций в видимой области карты.
+        Берутся из предрасчитанных агрегатов, а если они не загружены -
+        считаются по количеству организаций в зданиях из БД
+        """
+        await self._cluster_index.refresh(
+            self._cache_repository_organization,
+            force=is_primary_pinned(),
+        )
+        if self._cluster_index.is_loaded:
+            return self._cluster_index.get_clusters(
+                search.min_lat, search.max_lat,
+                search.min_lon, search.max_lon,
+                search.zoom,
+            )
+
+        # Запрашиваем ячейки целиком, как и в предрасчитанных агрегатах
+        level = search.zoom + self._cluster_index.grid_subdivision
+        min_x, min_y = get_tile(search.max_lat, search.min_lon, level)
+        max_x, max_y = get_tile(search.min_lat, search.max_lon, level)
+        min_lat, _, min_lon, _ = get_tile_bounds(min_x, max_y, level)
+        _, max_lat, _, max_lon = get_tile_bounds(max_x, min_y, level)
+
+        statement = (
+            select(
+                Building.latitude,
+                Building.longitude,
+                func.count(Organization.id),
+            )
+            .join(Organization.building)
+            .where(
+                *self._get_area_conditions(min_lat, max_lat, min_lon, max_lon)
+            )
+            .group_by(Building.id, Building.latitude, Building.longitude)
+        )
+        result = await self._session.execute(statement)
+
+        cells = {}
+        for latitude, longitude, count in result.all():
+            add_to_cells(cells, latitude, longitude, count, level)
+
+        return OrganizationClusterIndex.get_cells_clusters(
+            cells,
+            search.min_lat, search.max_lat,
+            search.min_lon, search.max_lon,
+            level,
+        )
+
+    def _get_search_bounds(
+            self,
+            search: Union[RadiusSearch, RectangleSearch],
+    ) -> Tuple[float, float, float, float]:
+        if isinstance(search, RadiusSearch):
+            return self._get_radius_bounds(search)
+
+        return search.min_lat, search.max_lat, search.min_lon, search.max_lon
+
+    @staticmethod
+    def _get_area_conditions(
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+    ) -> List[ColumnElement[bool]]:
+        """
+        Условия попадания здания в прямоугольную область.
+        Диапазоны геохеша отбирают здания по индексу,
+        а сравнение координат отсекает лишнее на краях ячеек
+        """
+        geohash_conditions = []
+        for start, end in geohash.get_covering_ranges(
+                min_lat, max_lat, min_lon, max_lon
+        ):
+            condition = Building.geohash >= start
+            if end is not None:
+                condition = and_(condition, Building.geohash < end)
+            geohash_conditions.append(condition)
+
+        return [
+            or_(*geohash_conditions),
+            Building.latitude.between(min_lat, max_lat),
+            Building.longitude.between(min_lon, max_lon),
+        ]
+
+    async def search_in_rectangle_cached(
+            self,
+            search: RectangleSearch,
+            pagination: PaginationParams,
+    ) -> Tuple[List[CachedOrganization], Optional[str]]:
+        """
+        Поиск организаций в прямоугольной области через кэш тайлов,
+        страница в порядке ID. Слишком большие для кэша области
+        и чтения сразу после записи клиента ищутся без него
+        """
+        if is_primary_pinned() or not self._is_cacheable(
+                search.min_lat, search.max_lat, search.min_lon, search.max_lon
+        ):
+            return await self.search_in_rectangle(search, pagination)
+
+        return get_id_page(
+            await self._get_cached_organizations(
+                search.min_lat, search.max_lat, search.min_lon, search.max_lon
+            ),
+            pagination,
+        )
+
+    def _is_cacheable(
+            self,
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+    ) -> bool:
+        """Покрывается ли область не более чем max_tiles_per_search тайлами"""
+        return self._geo_tile_cache.get_tiles_count(
+            min_lat, max_lat, min_lon, max_lon
+        ) <= self._geo_tile_cache.max_tiles_per_search
+
+    async def _get_cached_organizations(
+            self,
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+    ) -> List[CachedOrganization]:
+        """
+        Собирает организации прямоугольной области из тайлов кэша.
+        Недостающие тайлы загружаются вместе и кэшируются,
+        результат обрезается точно по границам области
+        """
+        tiles = self._geo_tile_cache.get_tiles(
+            min_lat, max_lat, min_lon, max_lon
+        )
+
+        organizations = []
+        missing_tiles = []
+        for tile in tiles:
+            cached = self._geo_tile_cache.get(tile)
+            if cached is None:
+                missing_tiles.append(tile)
+            else:
+                organizations.extend(cached)
+
+        if missing_tiles:
+            generation = self._geo_tile_cache.generation
+            fetched_tiles = {tile: [] for tile in missing_tiles}
+
+            for organization in await self._get_organization_rows(
+                    *self._geo_tile_cache.get_tiles_bounds(missing_tiles)
+            ):
+                tile = self._geo_tile_cache.get_tile(
+                    organization.latitude,
+                    organization.longitude,
+                )
+                if tile in fetched_tiles:
+                    fetched_tiles[tile].append(organization)
+
+            self._geo_tile_cache.set_many(fetched_tiles, generation)
+            organizations.extend(itertools.chain(*fetched_tiles.values()))
+
+        return [
+            organization for organization in organizations
+            if min_lat <= organization.latitude <= max_lat
+            and min_lon <= organization.longitude <= max_lon
+        ]
+
+    async def _get_organization_rows(
+            self,
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+    ) -> List[CachedOrganization]:
+        """
+        Загружает организации области вместе с координатами их зданий
+        из основной БД для заполнения кэша тайлов:
+        здания берутся из индекса, а если он не загружен - организации
+        выбираются одним запросом с соединением зданий
+        """
+        await self._refresh_building_index()
+        if self._building_index.is_loaded:
+            buildings = self._building_index.search_in_rectangle(
+                min_lat, max_lat, min_lon, max_lon
+            )
+            coordinates = dict(zip(
+                buildings.ids,
+                zip(buildings.latitudes.tolist(), buildings.longitudes.tolist()),
+            ))
+            rows = []
+            for start in range(0, len(buildings.ids), self.building_ids_chunk_size):
+                statement = select(
+                    Organization.id,
+                    Organization.name,
+                    Organization.building_id,
+                ).where(
+                    Organization.building_id.in_(
+                        buildings.ids[start:start + self.building_ids_chunk_size]
+                    )
+                )
+                result = await self._cache_session.execute(statement)
+                rows.extend(
+                    CachedOrganization(
+                        organization_id,
+                        name,
+                        building_id,
+                        *coordinates[building_id],
+                    )
+                    for organization_id, name, building_id in result.all()
+                )
+
+            return rows
+
+        statement = (
+            select(
+                Organization.id,
+                Organization.name,
+                Organization.building_id,
+                Building.latitude,
+                Building.longitude,
+            )
+            .join(Organization.building)
+            .where(
+                *self._get_area_conditions(min_lat, max_lat, min_lon, max_lon)
+            )
+        )
+        result = await self._cache_session.execute(statement)
+        return [CachedOrganization(*row) for row in result.all()]
+
+    async def _get_buildings_in_rectangle(
+            self,
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+    ) -> BuildingPoints:
+        """
+        Получает координаты зданий в прямоугольной области
+        из индекса, а если он не загружен - из БД
+        """
+        await self._refresh_building_index()
+        if self._building_index.is_loaded:
+            return self._building_index.search_in_rectangle(
+                min_lat, max_lat, min_lon, max_lon
+            )
+
+        return await self._get_buildings_in_rectangles(
+            [(min_lat, max_lat, min_lon, max_lon)]
+        )
+
+    async def _get_buildings_in_rectangles(
+            self,
+            bounds: List[Tuple[float, float, float, float]],
+    ) -> BuildingPoints:
+        """
+        Получает координаты зданий в объединении прямоугольных областей
+        без повторов: из индекса, а если он не загружен - одним запросом к БД
+        """
+        await self._refresh_building_index()
+        if self._building_index.is_loaded:
+            areas = [
+                self._building_index.search_in_rectangle(*area_bounds)
+                for area_bounds in bounds
+            ]
+            buildings = BuildingPoints(
+                ids=list(itertools.chain(*(area.ids for area in areas))),
+                latitudes=np.concatenate([area.latitudes for area in areas]),
+                longitudes=np.concatenate([area.longitudes for area in areas]),
+            )
+            first_positions = {}
+            for position, building_id in enumerate(buildings.ids):
+                first_positions.setdefault(building_id, position)
+
+            unique_mask = np.zeros(len(buildings.ids), dtype=bool)
+            unique_mask[list(first_positions.values())] = True
+            return buildings.filter(unique_mask)
+
+        statement = select(
+            Building.id,
+            Building.latitude,
+            Building.longitude,
+        ).where(
+            or_(*[
+                and_(*self._get_area_conditions(*area_bounds))
+                for area_bounds in bounds
+            ])
+        )
+        result = await self._session.execute(statement)
+        return BuildingPoints.from_rows(result.all())
+
+    async def _get_organizations_by_building_ids(
+            self,
+            building_ids: List[uuid.UUID],
+            *conditions,
+            limit: Optional[int] = None,
             options: List[ExecutableOption] = [],
     ) -> List[Organization]:
         """
-        Поиск организаций в прямоугольной области
+        Загружает организации найденных зданий. С limit из каждой пачки
+        зданий берутся limit организаций с наименьшими ID, а из них -
+        limit общих наименьших
+        """
+        organizations = []
+
+        for start in range(0, len(building_ids), self.building_ids_chunk_size):
+            chunk = building_ids[start:start + self.building_ids_chunk_size]
+            statement = select(Organization).where(
+                Organization.building_id.in_(chunk),
+                *conditions,
+            ).options(*options)
+            if limit is not None:
+                statement = statement.order_by(Organization.id).limit(limit)
+
+            result = await self._session.execute(statement)
+            organizations.extend(result.scalars().all())
+
+        if limit is not None:
+            return heapq.nsmallest(
+                limit,
+                organizations,
+                key=lambda organization: organization.id,
+            )
+
+        return organizations
+
+    async def _get_organizations_page(
+            self,
+            pagination: PaginationParams,
+            *conditions,
+            options: List[ExecutableOption] = [],
+    ) -> Tuple[List[Organization], Optional[str]]:
+        """
+        Страница организаций, здания которых удовлетворяют условиям,
+        в порядке ID: одним запросом с соединением зданий
         """
-        statement = select(Organization).join(Building).where(
-            Building.latitude.between(search.min_lat, search.max_lat),
-            Building.longitude.between(search.min_lon, search.max_lon)
-        ).options(*options)
+        after_id = decode_id_cursor(pagination.cursor)
+        if after_id is not None:
+            conditions += (Organization.id > after_id, )
 
+        statement = (
+            select(Organization)
+            .join(Organization.building)
+            .where(*conditions)
+            .order_by(Organization.id)
+            .limit(pagination.limit + 1)
+            .options(*options)
+        )
         result = await self._session.execute(statement)
-        return result.scalars().all()
\ No newline at end of file
+        return get_page(
+            result.scalars().all(),
+            pagination.limit,
+            lambda organization: (organization.id, ),
+        )
+
+    async def _get_organizations_page_by_building_ids(
+            self,
+            building_ids: List[uuid.UUID],
+            pagination: PaginationParams,
+            options: List[ExecutableOption] = [],
+    ) -> Tuple[List[Organization], Optional[str]]:
+        """Страница организаций найденных зданий в порядке ID"""
+        conditions = []
+        after_id = decode_id_cursor(pagination.cursor)
+        if after_id is not None:
+            conditions.append(Organization.id > after_id)
+
+        organizations = await self._get_organizations_by_building_ids(
+            building_ids,
+            *conditions,
+            limit=pagination.limit + 1,
+            options=options,
+        )
+        return get_page(
+            organizations,
+            pagination.limit,
+            lambda organization: (organization.id, ),
+        )
+
+    async def _get_organizations_pages_by_building_ids(
+            self,
+            building_ids_per_area: List[List[uuid.UUID]],
+            pagination: List[PaginationParams],
+            options: List[ExecutableOption] = [],
+    ) -> List[Tuple[List[Organization], Optional[str]]]:
+        """
+        Страницы организаций зданий нескольких областей в порядке ID
+        одним запросом: пары (область, здание, курсор области) передаются
+        в VALUES, а ROW_NUMBER() по области отбирает limit + 1 организаций
+        каждой области. Пары передаются пачками по building_ids_chunk_size,
+        страницы пачек объединяются в памяти
+        """
+        after_ids = [decode_id_cursor(page.cursor) for page in pagination]
+        pairs = [
+            (area, building_id, after_ids[area])
+            for area, building_ids in enumerate(building_ids_per_area)
+            for building_id in building_ids
+        ]
+
+        area_organizations = [[] for _ in building_ids_per_area]
+        for start in range(0, len(pairs), self.building_ids_chunk_size):
+            areas = values(
+                column('area', Integer),
+                column('building_id', Uuid),
+                column('after_id', Uuid),
+                name='areas',
+            ).data(pairs[start:start + self.building_ids_chunk_size]).cte('areas')
+
+            numbered = (
+                select(
+                    areas.c.area,
+                    Organization.id.label('organization_id'),
+                    func.row_number().over(
+                        partition_by=areas.c.area,
+                        order_by=Organization.id,
+                    ).label('row_number'),
+                )
+                .join(areas, Organization.building_id == areas.c.building_id)
+                .where(or_(
+                    areas.c.after_id.is_(None),
+                    Organization.id > areas.c.after_id,
+                ))
+                .subquery()
+            )
+            statement = (
+                select(numbered.c.area, Organization)
+                .join(numbered, Organization.id == numbered.c.organization_id)
+                .where(numbered.c.row_number <= max(
+                    page.limit + 1 for page in pagination
+                ))
+                .order_by(numbered.c.area, Organization.id)
+                .options(*options)
+            )
+            result = await self._session.execute(statement)
+            for area, organization in result.all():
+                area_organizations[area].append(organization)
+
+        return [
+            get_page(
+                heapq.nsmallest(
+                    page.limit + 1,
+                    organizations,
+                    key=lambda organization: organization.id,
+                ),
+                page.limit,
+                lambda organization: (organization.id, ),
+            )
+            for organizations, page in zip(area_organizations, pagination)
+        ]
@@ -1,6 +1,7 @@
 import math
 import uuid
-from typing import List, Optional
+from functools import partial
+from typing import List, Optional, Tuple
 
 import loguru
 from fastapi import HTTPException
@@ -15,8 +16,15 @@ from app.repositories import (
     RepositoryBuilding,
 )
 from ..db.models import Activity, Building, Organization
+from ..db.routing import is_primary_pinned
 from ..repositories.base import ModelType
 from ..schemas.organization import OrganizationCreateSchema, PhoneCreateSchema
+from ..schemas.pagination import PaginationParams
+from .activity_bitmap import OrganizationActivityIndex
+from .activity_cache import ActivityTreeCache
+from .clustering import OrganizationClusterIndex
+from .geo_cache import GeoTileCache
+from .pagination import decode_id_cursor, get_page
 
 
 class OrganizationService(CRUDBaseService[RepositoryOrganization]):
@@ -28,20 +36,31 @@ class OrganizationService(CRUDBaseService[RepositoryOrganization]):
             repository_phone: RepositoryPhone,
             repository_activity: RepositoryActivity,
             repository_building: RepositoryBuilding,
-
+            cache_repository_organization: RepositoryOrganization,
+            cache_repository_activity: RepositoryActivity,
+            cluster_index: OrganizationClusterIndex,
+            geo_tile_cache: GeoTileCache,
+            activity_cache: ActivityTreeCache,
+            activity_index: OrganizationActivityIndex,
     ):
         super().__init__(repository=repository_organization)
         self._repository_organization = repository_organization
         self._repository_phone = repository_phone
         self._repository_activity = repository_activity
         self._repository_building = repository_building
-
+        # Кэши и индексы сверяются с основной БД, а не с репликой
+        self._cache_repository_organization = cache_repository_organization
+        self._cache_repository_activity = cache_repository_activity
+        self._cluster_index = cluster_index
+        self._geo_tile_cache = geo_tile_cache
+        self._activity_cache = activity_cache
+        self._activity_index = activity_index
 
     async def create(self, obj_in: OrganizationCreateSchema) -> Organization:
         insert_data = await self.validate_object_insertion(obj_in)
 
         activities = await self.validate_activity_ids(obj_in.activity_ids)
-        await self.validate_building_id(obj_in.building_id)
+        building = await self.validate_building_id(obj_in.building_id)
 
         insert_data.pop('activity_ids')
         insert_data.pop('phones')
@@ -62,8 +81,30 @@ class OrganizationService(CRUDBaseService[RepositoryOrganization]):
                 phones=obj_in.phones
             )
 
+        self._repository_organization.run_after_commit(
+            partial(
+                self._on_organization_created,
+                organization.id,
+                list(dict.fromkeys(obj_in.activity_ids)),
+                building.latitude,
+                building.longitude,
+            )
+        )
+
         return organization
 
+    def _on_organization_created(
+            self,
+            organization_id: uuid.UUID,
+            activity_ids: List[uuid.UUID],
+            latitude: float,
+            longitude: float,
+    ) -> None:
+        """Учитывает организацию в индексах и кэше после COMMIT ее создания"""
+        self._activity_index.add(organization_id, activity_ids)
+        self._cluster_index.add(latitude, longitude)
+        self._geo_tile_cache.invalidate(latitude, longitude)
+
     async def validate_activity_ids(
             self,
             activity_ids: List[str | uuid.UUID]
@@ -102,25 +143,81 @@ class OrganizationService(CRUDBaseService[RepositoryOrganization]):
     async def get_organizations_by_activity_id(
             self,
             activity_id: uuid.UUID,
+            pagination: PaginationParams,
             options: List[ExecutableOption] = [],
-            **kwargs,
-    ) -> List[Organization]:
-        return await self._repository_organization.get_organizations_by_activity_id(
-            activity_id=activity_id,
+    ) -> Tuple[List[Organization], Optional[str]]:
+        return await self.get_organizations_by_activity_ids(
+            activity_ids=[activity_id],
+            pagination=pagination,
             options=options,
-            **kwargs
         )
 
     async def get_organizations_by_activity_ids(
             self,
             activity_ids: List[uuid.UUID],
+            pagination: PaginationParams,
             options: List[ExecutableOption] = [],
-            **kwargs,
-    ) -> List[Organization]:
-        return await self._repository_organization.get_organizations_by_activity_ids(
-            activity_ids=activity_ids,
+    ) -> Tuple[List[Organization], Optional[str]]:
+        """
+        Страница организаций деятельностей в порядке ID по объединению
+        битовых карт индекса: из БД загружается только сама страница
+        """
+        # Сразу после записи клиента индекс сверяется без ожидания интервала
+        await self._activity_index.refresh(
+            self._cache_repository_organization,
+            force=is_primary_pinned(),
+        )
+        organization_ids = self._activity_index.get_page_organization_ids(
+            self._activity_index.get_bitmap(activity_ids),
+            limit=pagination.limit + 1,
+            after_id=decode_id_cursor(pagination.cursor),
+        )
+        organizations = await self._repository_organization.get_by_ids(
+            organization_ids,
             options=options,
-            **kwargs
+        )
+        organizations.sort(key=lambda organization: organization.id)
+
+        return get_page(
+            organizations,
+            pagination.limit,
+            lambda organization: (organization.id, ),
+        )
+
+    async def get_organizations_by_activity_tree(
+            self,
+            activity_id: uuid.UUID,
+            pagination: PaginationParams,
+            max_depth: int = 3,
+            options: List[ExecutableOption] = [],
+    ) -> Tuple[List[Organization], Optional[str]]:
+        await self._activity_cache.refresh(
+            self._cache_repository_activity,
+            force=is_primary_pinned(),
+        )
+        subtree_ids = self._activity_cache.get_subtree_ids(
+            activity_id,
+            max_depth=max_depth,
+        )
+        if subtree_ids is not None:
+            return await self.get_organizations_by_activity_ids(
+                activity_ids=list(subtree_ids),
+                pagination=pagination,
+                options=options,
+            )
+
+        # Деятельности нет в кэше: поиск поддерева по пути в БД
+        organizations = await self._repository_organization.get_organizations_by_activity_tree(
+            activity_id=activity_id,
+            max_depth=max_depth,
+            limit=pagination.limit + 1,
+            after_id=decode_id_cursor(pagination.cursor),
+            options=options,
+        )
+        return get_page(
+            organizations,
+            pagination.limit,
+            lambda organization: (organization.id, ),
         )
 
     async def get_organizations_in_area(
@@ -0,0 +1,95 @@
+import base64
+import binascii
+import heapq
+import uuid
+from operator import attrgetter
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+import orjson
+from fastapi import HTTPException
+from starlette import status
+
+from app.schemas.pagination import PaginationParams
+
+ItemType = TypeVar('ItemType')
+
+# Допустимые типы значений курсора в JSON для приводящих функций
+CURSOR_JSON_TYPES = {
+    uuid.UUID: str,
+    str: str,
+    float: (int, float),
+}
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Непрозрачный курсор из значений ключа сортировки последней строки"""
+    return base64.urlsafe_b64encode(orjson.dumps(list(values))).decode()
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> List[Any]:
+    """
+    Значения ключа сортировки из курсора, приведенные к типам types.
+    Поврежденный курсор - ошибка 400
+    """
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError('Invalid cursor length')
+
+        for value_type, value in zip(types, values):
+            if (
+                not isinstance(value, CURSOR_JSON_TYPES[value_type])
+                or isinstance(value, bool)
+            ):
+                raise ValueError('Invalid cursor value type')
+
+        return [value_type(value) for value_type, value in zip(types, values)]
+    except (ValueError, TypeError, binascii.Error, orjson.JSONDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Invalid cursor',
+        )
+
+
+def decode_id_cursor(cursor: Optional[str]) -> Optional[uuid.UUID]:
+    """ID последней строки из курсора пагинации по ID"""
+    if cursor is None:
+        return None
+
+    return decode_cursor(cursor, uuid.UUID)[0]
+
+
+def get_page(
+        items: List[ItemType],
+        limit: int,
+        get_key: Callable[[ItemType], Sequence[Any]],
+) -> Tuple[List[ItemType], Optional[str]]:
+    """
+    Отрезает страницу из limit строк от выборки размером до limit + 1.
+    Лишняя строка означает, что есть следующая страница
+    """
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    return items, encode_cursor(get_key(items[-1]))
+
+
+def get_id_page(
+        items: List[ItemType],
+        pagination: PaginationParams,
+) -> Tuple[List[ItemType], Optional[str]]:
+    """
+    Страница в порядке ID из уже загруженного в память списка объектов:
+    выбираются только limit + 1 наименьших ID после курсора без сортировки
+    всего списка
+    """
+    after_id = decode_id_cursor(pagination.cursor)
+    if after_id is not None:
+        items = [item for item in items if item.id > after_id]
+
+    return get_page(
+        heapq.nsmallest(pagination.limit + 1, items, key=attrgetter('id')),
+        pagination.limit,
+        lambda item: (item.id, ),
+    )
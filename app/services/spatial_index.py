@@ -0,0 +1,364 @@
+import heapq
+import itertools
+import math
+import time
+import uuid
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+from app.db.functions import EARTH_RADIUS_KM
+from app.repositories import RepositoryBuilding
+
+BuildingPoint = Tuple[uuid.UUID, float, float]
+
+
+class BuildingPoints(NamedTuple):
+    """ID зданий и их координаты в виде массивов NumPy"""
+
+    ids: List[uuid.UUID]
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[BuildingPoint]) -> 'BuildingPoints':
+        rows = list(rows)
+        return cls(
+            ids=[row[0] for row in rows],
+            latitudes=np.fromiter((row[1] for row in rows), dtype=float),
+            longitudes=np.fromiter((row[2] for row in rows), dtype=float),
+        )
+
+    def filter(self, mask: np.ndarray) -> 'BuildingPoints':
+        return BuildingPoints(
+            ids=list(itertools.compress(self.ids, mask.tolist())),
+            latitudes=self.latitudes[mask],
+            longitudes=self.longitudes[mask],
+        )
+
+
+class BuildingGridIndex:
+    """
+    Пространственный индекс зданий в памяти процесса.
+
+    Координаты раскладываются по равномерной сетке с шагом
+    cell_size_deg градусов, поэтому поиск в прямоугольнике
+    просматривает только пересекающиеся с ним ячейки.
+    Индекс заполняется при старте приложения и дополняется после
+    COMMIT создания здания, а не чаще раза в check_interval_seconds
+    сверяет версию (количество зданий) с БД и перестраивается
+    при расхождении, чтобы здания из других процессов тоже
+    попадали в индекс.
+    """
+
+    def __init__(
+            self,
+            cell_size_deg: float = 0.01,
+            check_interval_seconds: float = 30.0,
+    ) -> None:
+        self.cell_size_deg = cell_size_deg
+        self.check_interval_seconds = check_interval_seconds
+        self.is_loaded = False
+        self._checked_at = 0.0
+        self._ids: List[uuid.UUID] = []
+        self._latitudes = array('d')
+        self._longitudes = array('d')
+        self._positions: Dict[uuid.UUID, int] = {}
+        self._cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        # Границы непустой области сетки: min_row, max_row, min_col, max_col
+        self._bounds = None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def version(self) -> int:
+        """Версия индекса: количество зданий (здания не удаляются)"""
+        return len(self._positions)
+
+    def _get_cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            math.floor(latitude / self.cell_size_deg),
+            math.floor(longitude / self.cell_size_deg),
+        )
+
+    def clear(self) -> None:
+        # Новые контейнеры вместо очистки на месте: перебор iter_nearest,
+        # начатый до перестроения, дочитывает прежнюю раскладку
+        self.is_loaded = False
+        self._ids = []
+        self._latitudes = array('d')
+        self._longitudes = array('d')
+        self._positions = {}
+        self._cells = defaultdict(list)
+        self._bounds = None
+
+    def add(
+            self,
+            building_id: uuid.UUID,
+            latitude: float,
+            longitude: float,
+    ) -> None:
+        """Добавляет здание в индекс или обновляет его координаты"""
+        position = self._positions.get(building_id)
+
+        if position is not None:
+            old_cell = self._get_cell(
+                self._latitudes[position],
+                self._longitudes[position],
+            )
+            self._cells[old_cell].remove(position)
+            if not self._cells[old_cell]:
+                del self._cells[old_cell]
+
+            self._latitudes[position] = latitude
+            self._longitudes[position] = longitude
+        else:
+            position = len(self._ids)
+            self._ids.append(building_id)
+            self._latitudes.append(latitude)
+            self._longitudes.append(longitude)
+            self._positions[building_id] = position
+
+        row, col = self._get_cell(latitude, longitude)
+        self._cells[(row, col)].append(position)
+
+        if self._bounds is None:
+            self._bounds = (row, row, col, col)
+        else:
+            min_row, max_row, min_col, max_col = self._bounds
+            self._bounds = (
+                min(min_row, row),
+                max(max_row, row),
+                min(min_col, col),
+                max(max_col, col),
+            )
+
+    def load(self, points: Iterable[BuildingPoint]) -> None:
+        """Полностью перестраивает индекс по переданным координатам"""
+        self.clear()
+        for building_id, latitude, longitude in points:
+            self.add(building_id, latitude, longitude)
+
+        self._checked_at = time.monotonic()
+        self.is_loaded = True
+
+    async def rebuild(self, repository: RepositoryBuilding) -> None:
+        self.load(await repository.get_coordinates())
+
+    async def refresh(
+            self,
+            repository: RepositoryBuilding,
+            force: bool = False,
+    ) -> None:
+        """
+        Перестраивает индекс, если версия в БД разошлась с индексом.
+        Версия сверяется не чаще раза в check_interval_seconds, с force -
+        сразу. Не загруженный индекс не загружается: без него поиск идет по БД
+        """
+        if not self.is_loaded or (
+            not force
+            and time.monotonic() - self._checked_at < self.check_interval_seconds
+        ):
+            return
+
+        # Отметка ставится до запроса, чтобы параллельные запросы не сверяли версию повторно
+        self._checked_at = time.monotonic()
+        if await repository.get_version() != self.version:
+            await self.rebuild(repository)
+
+    def search_in_rectangle(
+            self,
+            min_lat: float,
+            max_lat: float,
+            min_lon: float,
+            max_lon: float,
+    ) -> BuildingPoints:
+        """Возвращает здания, попадающие в прямоугольник (включая границы)"""
+        min_row, min_col = self._get_cell(min_lat, min_lon)
+        max_row, max_col = self._get_cell(max_lat, max_lon)
+        cells_count = (max_row - min_row + 1) * (max_col - min_col + 1)
+
+        # Для больших областей дешевле обойти только непустые ячейки
+        if cells_count > len(self._cells):
+            cells = [
+                positions for (row, col), positions in self._cells.items()
+                if min_row <= row <= max_row and min_col <= col <= max_col
+            ]
+        else:
+            cells = [
+                self._cells[(row, col)]
+                for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)
+                if (row, col) in self._cells
+            ]
+
+        positions = np.fromiter(
+            itertools.chain.from_iterable(cells),
+            dtype=np.intp,
+        )
+        latitudes = np.frombuffer(self._latitudes)[positions]
+        longitudes = np.frombuffer(self._longitudes)[positions]
+
+        mask = (
+            (latitudes >= min_lat) & (latitudes <= max_lat)
+            & (longitudes >= min_lon) & (longitudes <= max_lon)
+        )
+        return BuildingPoints(
+            ids=[self._ids[position] for position in positions[mask].tolist()],
+            latitudes=latitudes[mask],
+            longitudes=longitudes[mask],
+        )
+
+    @staticmethod
+    def _get_distances(
+            latitude: float,
+            longitude: float,
+            latitudes: array,
+            longitudes: array,
+            positions: List[int],
+    ) -> List[float]:
+        """Расстояния (в км) от точки до зданий в указанных позициях"""
+        positions = np.asarray(positions, dtype=np.intp)
+        latitudes = np.radians(np.frombuffer(latitudes)[positions])
+        longitudes = np.radians(np.frombuffer(longitudes)[positions])
+        lat_rad = math.radians(latitude)
+
+        a = (
+            np.sin((latitudes - lat_rad) / 2) ** 2
+            + math.cos(lat_rad) * np.cos(latitudes)
+            * np.sin((longitudes - math.radians(longitude)) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(
+            np.sqrt(np.minimum(a, 1.0))
+        )
+        return distances.tolist()
+
+    def _get_outside_distance(
+            self,
+            latitude: float,
+            longitude: float,
+            center_row: int,
+            center_col: int,
+            ring: int,
+    ) -> float:
+        """
+        Нижняя граница расстояния (в км) от точки до любого здания
+        за пределами колец 0..ring вокруг ячейки точки
+        """
+        lat_low = (center_row - ring) * self.cell_size_deg
+        lat_high = (center_row + ring + 1) * self.cell_size_deg
+        lon_low = (center_col - ring) * self.cell_size_deg
+        lon_high = (center_col + ring + 1) * self.cell_size_deg
+
+        dlat = min(latitude - lat_low, lat_high - latitude)
+        dlon = min(longitude - lon_low, lon_high - longitude)
+
+        lat_distance = EARTH_RADIUS_KM * math.radians(dlat)
+
+        # Для точек в полосе широт квадрата: a >= cos(φ1)cos(φ2)sin²(Δλ/2)
+        band_cos = max(0.0, min(
+            math.cos(math.radians(max(-90.0, lat_low))),
+            math.cos(math.radians(min(90.0, lat_high))),
+        ))
+        lon_factor = math.sqrt(
+            max(0.0, math.cos(math.radians(latitude))) * band_cos
+        )
+        lon_distance = 2 * EARTH_RADIUS_KM * math.asin(min(
+            1.0,
+            lon_factor * math.sin(min(math.radians(dlon), math.pi) / 2),
+        ))
+
+        return min(lat_distance, lon_distance)
+
+    def iter_nearest(
+            self,
+            latitude: float,
+            longitude: float,
+    ) -> Iterator[Tuple[uuid.UUID, float]]:
+        """
+        Перебирает здания в порядке возрастания расстояния до точки.
+
+        Сетка просматривается кольцами вокруг ячейки точки. Здание
+        отдается, как только его расстояние не превышает нижней границы
+        расстояния до еще не просмотренных колец, поэтому для первых k
+        результатов читается только их окрестность.
+
+        Генератор читается между await, а индекс тем временем может
+        перестроиться, поэтому структуры индекса берутся один раз
+        при старте и после yield из self не читаются.
+        """
+        ids = self._ids
+        latitudes = self._latitudes
+        longitudes = self._longitudes
+        cells = self._cells
+        bounds = self._bounds
+        if bounds is None:
+            return
+
+        center_row, center_col = self._get_cell(latitude, longitude)
+        min_row, max_row, min_col, max_col = bounds
+        max_ring = max(
+            center_row - min_row,
+            max_row - center_row,
+            center_col - min_col,
+            max_col - center_col,
+            0,
+        )
+
+        heap: List[Tuple[float, int]] = []
+        ring = 0
+
+        while ring <= max_ring:
+            if 8 * ring > len(cells):
+                # Кольцо длиннее, чем число непустых ячеек:
+                # забираем все оставшиеся ячейки разом
+                positions = [
+                    position
+                    for (row, col), cell in list(cells.items())
+                    if max(abs(row - center_row), abs(col - center_col)) >= ring
+                    for position in cell
+                ]
+                ring = max_ring
+            elif ring == 0:
+                positions = list(cells.get((center_row, center_col), []))
+            else:
+                ring_cells = itertools.chain(
+                    (
+                        (center_row + row_offset, center_col + col_offset)
+                        for row_offset in (-ring, ring)
+                        for col_offset in range(-ring, ring + 1)
+                    ),
+                    (
+                        (center_row + row_offset, center_col + col_offset)
+                        for row_offset in range(-ring + 1, ring)
+                        for col_offset in (-ring, ring)
+                    ),
+                )
+                positions = [
+                    position
+                    for cell in ring_cells if cell in cells
+                    for position in cells[cell]
+                ]
+
+            if positions:
+                distances = self._get_distances(
+                    latitude, longitude, latitudes, longitudes, positions
+                )
+                for distance, position in zip(distances, positions):
+                    heapq.heappush(heap, (distance, position))
+
+            outside_distance = self._get_outside_distance(
+                latitude, longitude, center_row, center_col, ring
+            )
+            while heap and heap[0][0] <= outside_distance:
+                distance, position = heapq.heappop(heap)
+                yield ids[position], distance
+
+            ring += 1
+
+        while heap:
+            distance, position = heapq.heappop(heap)
+            yield ids[position], distance
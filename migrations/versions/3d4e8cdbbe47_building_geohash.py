@@ -0,0 +1,88 @@
+"""building geohash
+
+Revision ID: 3d4e8cdbbe47
+Revises: 3bd126d77086
+Create Date: 2026-10-18 12:05:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db import geohash
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d4e8cdbbe47'
+down_revision: Union[str, None] = '3bd126d77086'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'buildings',
+        sa.Column('geohash', sa.String(length=9), nullable=True)
+    )
+
+    # Заполнение геохеша для существующих зданий
+    buildings = sa.table(
+        'buildings',
+        sa.column('id', sa.Uuid()),
+        sa.column('latitude', sa.Float()),
+        sa.column('longitude', sa.Float()),
+        sa.column('geohash', sa.String()),
+    )
+    connection = op.get_bind()
+    statement = (
+        buildings.update()
+        .where(buildings.c.id == sa.bindparam('building_id'))
+        .values(geohash=sa.bindparam('building_geohash'))
+    )
+    # Здания читаются страницами по ID, чтобы не держать в памяти все сразу
+    last_id = None
+    while True:
+        select_statement = (
+            sa.select(buildings.c.id, buildings.c.latitude, buildings.c.longitude)
+            .order_by(buildings.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        )
+        if last_id is not None:
+            select_statement = select_statement.where(buildings.c.id > last_id)
+
+        rows = connection.execute(select_statement).all()
+        if not rows:
+            break
+
+        connection.execute(
+            statement,
+            [
+                {
+                    'building_id': building_id,
+                    'building_geohash': geohash.encode(latitude, longitude),
+                }
+                for building_id, latitude, longitude in rows
+            ]
+        )
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('buildings') as batch_op:
+        batch_op.alter_column(
+            'geohash',
+            existing_type=sa.String(length=9),
+            nullable=False,
+        )
+    op.create_index(
+        op.f('ix_buildings_geohash'), 'buildings', ['geohash'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_buildings_geohash'), table_name='buildings')
+    with op.batch_alter_table('buildings') as batch_op:
+        batch_op.drop_column('geohash')
@@ -0,0 +1,59 @@
+"""activity depth
+
+Revision ID: 5b2f0c7a14d3
+Revises: 9e160391865e
+Create Date: 2026-10-18 14:05:31.208417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2f0c7a14d3'
+down_revision: Union[str, None] = '9e160391865e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Длина сегмента материализованного пути
+PATH_SEGMENT_LENGTH = 33
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'activities',
+        sa.Column('depth', sa.Integer(), nullable=True)
+    )
+
+    # Глубина однозначно определяется длиной материализованного пути
+    activities = sa.table(
+        'activities',
+        sa.column('path', sa.String()),
+        sa.column('depth', sa.Integer()),
+    )
+    op.execute(
+        activities.update().values(
+            depth=sa.func.length(activities.c.path) / PATH_SEGMENT_LENGTH
+        )
+    )
+
+    with op.batch_alter_table('activities') as batch_op:
+        batch_op.alter_column(
+            'depth',
+            existing_type=sa.Integer(),
+            nullable=False,
+        )
+        batch_op.create_check_constraint(
+            'depth',
+            'depth BETWEEN 1 AND 3',
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('activities') as batch_op:
+        batch_op.drop_constraint(op.f('ck_activities_depth'), type_='check')
+        batch_op.drop_column('depth')
@@ -0,0 +1,97 @@
+"""activity path
+
+Revision ID: 9e160391865e
+Revises: 3d4e8cdbbe47
+Create Date: 2026-10-18 12:41:07.562913
+
+"""
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e160391865e'
+down_revision: Union[str, None] = '3d4e8cdbbe47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PathString = sa.String().with_variant(sa.String(collation='C'), 'postgresql')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Заполнение материализованного пути: обход дерева от корней
+    activities = sa.table(
+        'activities',
+        sa.column('id', sa.Uuid()),
+        sa.column('parent_id', sa.Uuid()),
+        sa.column('path', sa.String()),
+    )
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(activities.c.id, activities.c.parent_id)
+    ).all()
+
+    children = {}
+    for activity_id, parent_id in rows:
+        children.setdefault(parent_id, []).append(activity_id)
+
+    paths = {}
+    stack = [(activity_id, '') for activity_id in children.get(None, [])]
+    while stack:
+        activity_id, parent_path = stack.pop()
+        paths[activity_id] = f'{parent_path}{uuid.UUID(str(activity_id)).hex}/'
+        stack.extend(
+            (child_id, paths[activity_id])
+            for child_id in children.get(activity_id, [])
+        )
+
+    # Недостижимые от корней деятельности (родитель не существует
+    # или цикл по parent_id) остались бы без пути, и NOT NULL ниже
+    # упал бы посреди миграции: проверяем до изменения схемы
+    unreachable_ids = [
+        str(activity_id) for activity_id, _ in rows
+        if activity_id not in paths
+    ]
+    if unreachable_ids:
+        raise RuntimeError(
+            f'{len(unreachable_ids)} activities are not reachable from root '
+            f'activities (missing parent or parent_id cycle), e.g. '
+            f'{unreachable_ids[:10]}. Fix their parent_id and run the '
+            f'migration again'
+        )
+
+    op.add_column(
+        'activities',
+        sa.Column('path', PathString, nullable=True)
+    )
+    if paths:
+        connection.execute(
+            activities.update()
+            .where(activities.c.id == sa.bindparam('activity_id'))
+            .values(path=sa.bindparam('activity_path')),
+            [
+                {'activity_id': activity_id, 'activity_path': path}
+                for activity_id, path in paths.items()
+            ]
+        )
+
+    with op.batch_alter_table('activities') as batch_op:
+        batch_op.alter_column(
+            'path',
+            existing_type=PathString,
+            nullable=False,
+        )
+    op.create_index(
+        op.f('ix_activities_path'), 'activities', ['path'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_activities_path'), table_name='activities')
+    with op.batch_alter_table('activities') as batch_op:
+        batch_op.drop_column('path')
@@ -0,0 +1,153 @@
+"""indexes overhaul
+
+Revision ID: c81f4e2a9d06
+Revises: 5b2f0c7a14d3
+Create Date: 2026-10-18 16:22:47.903115
+
+"""
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f4e2a9d06'
+down_revision: Union[str, None] = '5b2f0c7a14d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Индексы по первичным ключам дублируют сами первичные ключи
+REDUNDANT_ID_INDEXES = (
+    ('ix_activities_id', 'activities'),
+    ('ix_buildings_id', 'buildings'),
+    ('ix_organizations_id', 'organizations'),
+    ('ix_phones_id', 'phones'),
+    ('ix_organization_activity_id', 'organization_activity'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for index_name, table_name in REDUNDANT_ID_INDEXES:
+        op.drop_index(op.f(index_name), table_name=table_name)
+
+    op.create_index(
+        'ix_organization_activity_activity_id_organization_id',
+        'organization_activity',
+        ['activity_id', 'organization_id'],
+        unique=False,
+    )
+
+    # Повторяющиеся связи мешают составному первичному ключу,
+    # созданный выше индекс ускоряет их поиск
+    op.execute(
+        'DELETE FROM organization_activity WHERE EXISTS ('
+        'SELECT 1 FROM organization_activity AS duplicate '
+        'WHERE duplicate.organization_id = organization_activity.organization_id '
+        'AND duplicate.activity_id = organization_activity.activity_id '
+        'AND duplicate.id < organization_activity.id)'
+    )
+    with op.batch_alter_table('organization_activity') as batch_op:
+        batch_op.drop_constraint(op.f('pk_organization_activity'), type_='primary')
+        batch_op.drop_column('id')
+        batch_op.create_primary_key(
+            op.f('pk_organization_activity'),
+            ['organization_id', 'activity_id'],
+        )
+
+    op.create_index(
+        op.f('ix_organizations_building_id'),
+        'organizations',
+        ['building_id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_organizations_name_id',
+        'organizations',
+        ['name', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        op.f('ix_phones_organization_id'),
+        'phones',
+        ['organization_id'],
+        unique=False,
+    )
+    op.create_index(
+        op.f('ix_activities_parent_id'),
+        'activities',
+        ['parent_id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_buildings_latitude_longitude',
+        'buildings',
+        ['latitude', 'longitude'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_buildings_latitude_longitude', table_name='buildings')
+    op.drop_index(op.f('ix_activities_parent_id'), table_name='activities')
+    op.drop_index(op.f('ix_phones_organization_id'), table_name='phones')
+    op.drop_index('ix_organizations_name_id', table_name='organizations')
+    op.drop_index(op.f('ix_organizations_building_id'), table_name='organizations')
+    op.drop_index(
+        'ix_organization_activity_activity_id_organization_id',
+        table_name='organization_activity',
+    )
+
+    # Возврат суррогатного ключа: ID генерируются для существующих связей
+    op.add_column(
+        'organization_activity',
+        sa.Column('id', sa.Uuid(), nullable=True)
+    )
+    organization_activity = sa.table(
+        'organization_activity',
+        sa.column('organization_id', sa.Uuid()),
+        sa.column('activity_id', sa.Uuid()),
+        sa.column('id', sa.Uuid()),
+    )
+    connection = op.get_bind()
+    links = connection.execute(
+        sa.select(
+            organization_activity.c.organization_id,
+            organization_activity.c.activity_id,
+        )
+    ).all()
+    if links:
+        connection.execute(
+            organization_activity.update()
+            .where(
+                organization_activity.c.organization_id
+                == sa.bindparam('link_organization_id'),
+                organization_activity.c.activity_id
+                == sa.bindparam('link_activity_id'),
+            )
+            .values(id=sa.bindparam('link_id')),
+            [
+                {
+                    'link_organization_id': organization_id,
+                    'link_activity_id': activity_id,
+                    'link_id': uuid.uuid4(),
+                }
+                for organization_id, activity_id in links
+            ]
+        )
+
+    with op.batch_alter_table('organization_activity') as batch_op:
+        batch_op.drop_constraint(op.f('pk_organization_activity'), type_='primary')
+        batch_op.alter_column('id', existing_type=sa.Uuid(), nullable=False)
+        batch_op.create_primary_key(op.f('pk_organization_activity'), ['id'])
+
+    for index_name, table_name in REDUNDANT_ID_INDEXES:
+        op.create_index(
+            op.f(index_name),
+            table_name,
+            ['id'],
+            unique=False,
+        )